@@ -0,0 +1,301 @@
+# benchmarks/bench_excel_utils.py - core.excel_utils 性能测试
+#
+# 按指定行数生成禅道导出、项目台账、验收测试模板和报告模板 (见 benchmarks.synthetic)，
+# 对以下函数的每种引擎/变体分别测量耗时、峰值内存 (RSS) 和输出文件大小：
+#   find_row_by_fuzzy_column_value   cold: 首次查询 (解析台账并建立索引)；warm: 索引建立后的查询
+#   write_to_target_sheet            向报告模板的验收测试结果工作表写入台账字段 (xlsx / xlsm)
+#   fill_excel_template_acceptance   填写带合并单元格的验收测试模板 (xlsx / xlsm)
+#   consolidate_excel_data_and_insert_chart   各引擎 × 写入模式 (replace / diff)
+# 每次测量在新的子进程中进行，并使用独立的 GENREPORT_HOME，台账索引、模板布局、图片等缓存互不影响；
+# 峰值内存是该子进程的峰值 (xlwings 引擎下 Excel 进程本身的内存不计入)。
+# 结果追加到 JSON 历史文件，与基准运行比较并标记回归。openpyxl 引擎不需要 Excel，可在 Linux 上运行。
+# 用法 (在项目根目录):
+#   python -m benchmarks.bench_excel_utils [--sizes 1000 10000] [--repeat 3] [--cases consolidate ...]
+#       [--engines openpyxl xlwings] [--baseline ID|last] [--set-baseline] [--fail-on-regression]
+
+import os
+import gc
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks import synthetic
+from benchmarks.history import BenchmarkHistory, compare, regressions, format_report
+from config.settings import (
+    ACCEPTANCE_LEDGER_KEY_COLUMN, ACCEPTANCE_LEDGER_CELL_MAPPING, ACCEPTANCE_EXTRA_CELL_MAPPING,
+    FIELD_MAPPING_EXCEL_AND_UI, EXCEL_SHEET_NAME_ACCEPTANCE, CONSOLIDATION_WRITE_MODES
+)
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+CASES = ["find_row", "write_to_target_sheet", "fill_template", "consolidate"]
+WARM_LOOKUPS = 100  # warm 变体中计时的查询次数
+
+
+def _xlwings_available():
+    from core.excel_session import ExcelSession
+    return ExcelSession.available() and sys.platform in ("win32", "darwin")
+
+
+def default_engines():
+    return ["openpyxl"] + (["xlwings"] if _xlwings_available() else [])
+
+
+def case_variants(case, engines):
+    if case == "find_row":
+        return ["cold", "warm"]
+    if case in ("write_to_target_sheet", "fill_template"):
+        return ["xlsx", "xlsm"]
+    return [f"{engine}/{mode}" for engine in engines for mode in CONSOLIDATION_WRITE_MODES]
+
+
+def _as_xlsm(path):
+    """复制一份并加入宏 (与 xlsx 版本内容相同，只多出宏部件)"""
+    xlsm_path = os.path.splitext(path)[0] + ".xlsm"
+    shutil.copyfile(path, xlsm_path)
+    synthetic.add_vba_project(xlsm_path)
+    return xlsm_path
+
+
+def build_inputs(data_dir, size):
+    """生成某一规模的全部输入文件；data_dir 中已有同名文件时直接使用 (--data-dir 可跨次运行复用)"""
+    directory = os.path.join(data_dir, str(size))
+    done_marker = os.path.join(directory, ".complete")
+    with_pictures = synthetic.pictures_supported()
+    inputs = {
+        'size': size,
+        'bugs': os.path.join(directory, "Bug.xlsx"),
+        'stories': os.path.join(directory, "需求.xlsx"),
+        'cases': os.path.join(directory, "用例.xlsx"),
+        'picture': os.path.join(directory, "设备外观图.png"),
+        'ledger': os.path.join(directory, "台账.xlsx"),
+        'acceptance_xlsx': os.path.join(directory, "验收模板.xlsx"),
+        'acceptance_xlsm': os.path.join(directory, "验收模板.xlsm"),
+        'report_xlsx': os.path.join(directory, "报告模板.xlsx"),
+        'report_xlsm': os.path.join(directory, "报告模板.xlsm"),
+    }
+    if os.path.exists(done_marker):
+        return inputs
+
+    os.makedirs(directory, exist_ok=True)
+    print(f"生成 {size} 行的测试数据...", flush=True)
+    start = time.perf_counter()
+    synthetic.generate_bug_export(inputs['bugs'], size)
+    synthetic.generate_story_export(inputs['stories'], size)
+    synthetic.generate_case_export(inputs['cases'], size, story_count=size)
+    synthetic.generate_picture(inputs['picture'])
+    synthetic.generate_ledger(inputs['ledger'], size)
+    picture = inputs['picture'] if with_pictures else None
+    synthetic.generate_acceptance_template(inputs['acceptance_xlsx'], size, picture)
+    _as_xlsm(inputs['acceptance_xlsx'])
+    synthetic.generate_report_template(inputs['report_xlsx'], size, picture)
+    _as_xlsm(inputs['report_xlsx'])
+    open(done_marker, 'w').close()
+    if not with_pictures:
+        print("  提示: 未安装 Pillow，模板中不含图片，设备外观图不会插入报告。")
+    print(f"  完成 ({time.perf_counter() - start:.1f} 秒)")
+    return inputs
+
+
+# --- 用例：返回 (计时调用的函数, 输出文件路径 或 None)；复制文件等准备工作不计时 ---
+
+def _ledger_lookup(inputs, position):
+    from core.excel_utils import find_row_by_fuzzy_column_value
+    return find_row_by_fuzzy_column_value(inputs['ledger'], ACCEPTANCE_LEDGER_KEY_COLUMN,
+                                          synthetic.ledger_key(inputs['size'], position),
+                                          list(ACCEPTANCE_LEDGER_CELL_MAPPING))
+
+
+def _case_find_row(variant, inputs, work_dir):
+    def cold():
+        return _ledger_lookup(inputs, 0.5) is not None
+
+    def warm():
+        return all(_ledger_lookup(inputs, i / WARM_LOOKUPS) is not None for i in range(WARM_LOOKUPS))
+
+    if variant == "warm":
+        _ledger_lookup(inputs, 0.0)  # 建立索引
+        return warm, None
+    return cold, None
+
+
+def _case_write_to_target_sheet(variant, inputs, work_dir):
+    from core.excel_utils import write_to_target_sheet
+    target = os.path.join(work_dir, os.path.basename(inputs[f'report_{variant}']))
+    shutil.copyfile(inputs[f'report_{variant}'], target)
+    row = next(synthetic.ledger_rows(1))
+
+    def call():
+        write_to_target_sheet(target, EXCEL_SHEET_NAME_ACCEPTANCE, ACCEPTANCE_LEDGER_CELL_MAPPING, row)
+        return True
+    return call, target
+
+
+def _case_fill_template(variant, inputs, work_dir, errors):
+    from core.excel_utils import fill_excel_template_acceptance
+    template = os.path.join(work_dir, os.path.basename(inputs[f'acceptance_{variant}']))
+    shutil.copyfile(inputs[f'acceptance_{variant}'], template)
+    data = {name: f"{name}的内容" for name in FIELD_MAPPING_EXCEL_AND_UI}
+    mapping = dict(FIELD_MAPPING_EXCEL_AND_UI)
+    # 台账字段和附加字段也按同样方式填写，覆盖所有合并单元格
+    for name, cell in list(ACCEPTANCE_LEDGER_CELL_MAPPING.items()) + list(ACCEPTANCE_EXTRA_CELL_MAPPING.items()):
+        mapping.setdefault(name, {"excel_cell": cell})
+        data.setdefault(name, f"{name}的内容")
+
+    def call():
+        return fill_excel_template_acceptance(template, data, mapping, EXCEL_SHEET_NAME_ACCEPTANCE,
+                                              log_callback=_error_collector(errors))
+    return call, os.path.join(work_dir, "filled_" + os.path.basename(template))
+
+
+def _case_consolidate(variant, inputs, work_dir, errors):
+    from core.excel_utils import consolidate_excel_data_and_insert_chart
+    engine, write_mode = variant.split("/")
+    target = os.path.join(work_dir, os.path.basename(inputs['report_xlsm']))
+    shutil.copyfile(inputs['report_xlsm'], target)
+    picture = inputs['picture'] if synthetic.pictures_supported() else ""
+
+    def call():
+        return consolidate_excel_data_and_insert_chart(
+            inputs['bugs'], inputs['stories'], inputs['cases'], picture, target,
+            log_callback=_error_collector(errors), engine=engine, write_mode=write_mode)
+    return call, target
+
+
+def _error_collector(errors):
+    def log(message, is_error=False):
+        if is_error:
+            errors.append(str(message).strip().splitlines()[-1] if str(message).strip() else "")
+    return log
+
+
+def _peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if sys.platform == "darwin" else 1)  # macOS 单位为字节，Linux 为 KB
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def measure(case, variant, inputs, work_dir):
+    """在子进程中执行：准备、计时调用、读取峰值内存和输出大小"""
+    errors = []
+    if case == "find_row":
+        call, output = _case_find_row(variant, inputs, work_dir)
+    elif case == "write_to_target_sheet":
+        call, output = _case_write_to_target_sheet(variant, inputs, work_dir)
+    elif case == "fill_template":
+        call, output = _case_fill_template(variant, inputs, work_dir, errors)
+    else:
+        call, output = _case_consolidate(variant, inputs, work_dir, errors)
+    gc.collect()
+    start = time.perf_counter()
+    try:
+        success = call()
+    except Exception as e:
+        success = False
+        errors.append(f"{type(e).__name__}: {e}")
+    seconds = time.perf_counter() - start
+    result = {
+        'seconds': round(seconds, 4),
+        'peak_rss_mb': _peak_rss_mb(),
+        'output_kb': round(os.path.getsize(output) / 1024, 1) if output and os.path.exists(output) else None,
+        'status': 'ok' if success else 'failed',
+    }
+    if not success:
+        result['error'] = errors[-1] if errors else "返回失败"
+    return result
+
+
+def run_isolated(case, variant, inputs, tmp_dir):
+    """在新的子进程中测量一次；子进程使用新的 GENREPORT_HOME，各种缓存都是空的"""
+    work_dir = tempfile.mkdtemp(prefix=f"{case}-", dir=tmp_dir)
+    previous_home = os.environ.get("GENREPORT_HOME")
+    os.environ["GENREPORT_HOME"] = os.path.join(work_dir, "home")  # 子进程启动时继承
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return pool.submit(measure, case, variant, inputs, work_dir).result()
+    finally:
+        if previous_home is None:
+            os.environ.pop("GENREPORT_HOME", None)
+        else:
+            os.environ["GENREPORT_HOME"] = previous_home
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run(sizes, repeat, cases, engines, data_dir):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="genreport-bench-") as tmp_dir:
+        for size in sizes:
+            inputs = build_inputs(data_dir or tmp_dir, size)
+            for case in cases:
+                for variant in case_variants(case, engines):
+                    print(f"  {case} [{variant}] {size} 行...", end="", flush=True)
+                    attempts = [run_isolated(case, variant, inputs, tmp_dir) for _ in range(repeat)]
+                    ok = [attempt for attempt in attempts if attempt['status'] == 'ok']
+                    # 取最快的一次；内存和输出大小取同一次的值
+                    best = min(ok, key=lambda attempt: attempt['seconds']) if ok else attempts[-1]
+                    best = dict(best, case=case, variant=variant, size=size, repeat=repeat)
+                    results.append(best)
+                    print(f" {best['seconds']:.3f} s" if best['status'] == 'ok' else f" 失败: {best.get('error')}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="core.excel_utils 性能测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="数据行数 (可指定多个)")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量次数，取最快的一次")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--engines", nargs="+", choices=["openpyxl", "xlwings"], default=None,
+                        help="汇总引擎 (默认 openpyxl，本机可用 Excel 时加上 xlwings)")
+    parser.add_argument("--data-dir", help="测试数据目录；指定时生成的数据保留并在之后的运行中复用")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="结果历史 JSON 文件")
+    parser.add_argument("--label", default="", help="本次运行的说明")
+    parser.add_argument("--baseline", help="与指定运行编号比较 ('last' 为上一次运行)，默认使用已设置的基准")
+    parser.add_argument("--set-baseline", action="store_true", help="把本次运行设为基准")
+    parser.add_argument("--no-save", action="store_true", help="不写入历史文件")
+    parser.add_argument("--fail-on-regression", action="store_true", help="有回归时以退出码 1 结束")
+    args = parser.parse_args(argv)
+
+    engines = args.engines or default_engines()
+    if "xlwings" in engines and not _xlwings_available():
+        print("警告: 本机无法使用 xlwings (需要 Microsoft Excel)，跳过 xlwings 引擎。")
+        engines = [engine for engine in engines if engine != "xlwings"]
+
+    results = run(args.sizes, args.repeat, args.cases, engines, args.data_dir)
+    history = BenchmarkHistory(args.history)
+    current = history.add_run(results, label=args.label)
+    baseline = history.find_run(args.baseline) if args.baseline else history.baseline()
+    if args.baseline and baseline is None:
+        print(f"警告: 历史中没有运行记录 '{args.baseline}'。")
+    comparisons = compare(current, baseline)
+    print()
+    print(format_report(comparisons, baseline))
+
+    if args.set_baseline:
+        history.set_baseline(current)
+        print(f"\n已将本次运行 {current['id']} 设为基准。")
+    if not args.no_save:
+        history.save()
+        print(f"结果已写入 {args.history}")
+
+    found = regressions(comparisons)
+    if found:
+        print(f"\n发现 {len(found)} 项回归。")
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# benchmarks/bench_xlsx_readers.py - xlsx 读取后端性能对比
+#
+# 先检查各后端读取各种单元格类型 (含 t="d" 的 ISO 日期) 的结果与 openpyxl 一致，
+# 再生成 1k/10k/100k 行的禅道 Bug 导出样式文件，分别用每个可用的读取后端读取并计时。
+# 用法 (在项目根目录):
+#   python -m benchmarks.bench_xlsx_readers [--sizes 1000 10000 100000] [--repeat 3]
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from core.xlsx_readers import available_backends, read_rows
+from benchmarks.synthetic import generate_bug_export, generate_mixed_types
+
+
+def check_parity(tmp_dir, backends):
+    """各后端的读取结果与参照后端 (openpyxl，不可用时为第一个后端) 比较；返回是否全部一致"""
+    reference = "openpyxl" if "openpyxl" in backends else backends[0]
+    consistent = True
+    for iso_dates in (False, True):
+        path = os.path.join(tmp_dir, f"mixed_{'iso' if iso_dates else 'serial'}.xlsx")
+        generate_mixed_types(path, iso_dates=iso_dates)
+        expected = read_rows(path, backend=reference)
+        for backend in backends:
+            if backend == reference:
+                continue
+            try:
+                rows = read_rows(path, backend=backend)
+            except Exception as e:
+                rows = f"{type(e).__name__}: {e}"
+            if rows != expected:
+                consistent = False
+                print(f"  不一致: {backend} 读取 {os.path.basename(path)}\n"
+                      f"    {reference}: {expected}\n    {backend}: {rows}")
+    print(f"结果一致性检查 (参照 {reference}): {'通过' if consistent else '失败'}")
+    return consistent
+
+
+def run(sizes, repeat):
+    backends = available_backends()
+    print(f"可用后端: {', '.join(backends)}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        consistent = check_parity(tmp_dir, backends)
+        for size in sizes:
+            path = os.path.join(tmp_dir, f"bugs_{size}.xlsx")
+            generate_bug_export(path, size)
+            print(f"\n{size} 行 ({os.path.getsize(path) / 1024:.0f} KB):")
+            baseline = None
+            for backend in backends:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    rows = read_rows(path, backend=backend)
+                    timings.append(time.perf_counter() - start)
+                best = min(timings)
+                if baseline is None:
+                    baseline = best
+                print(f"  {backend:<10} {best:8.3f} s  {len(rows) / best:12,.0f} 行/秒  "
+                      f"({best / baseline:.1f}x)  读取 {len(rows)} 行")
+    return consistent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="xlsx 读取后端性能对比")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    return 0 if run(args.sizes, args.repeat) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# benchmarks/history.py - 性能测试结果历史
+#
+# 每次运行的结果 (耗时、峰值内存、输出文件大小) 追加到一个 JSON 文件中，并可把某次运行设为基准。
+# 与基准比较时超过容差的指标标记为回归；耗时和内存另有绝对值下限，避免小用例的测量抖动被误判。
+
+import os
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime
+
+from core.file_utils import atomic_write_bytes
+
+HISTORY_VERSION = 1
+HISTORY_MAX_RUNS = 200  # 保留的运行记录数 (基准运行始终保留)
+
+# 指标 -> (显示名称, 单位, 相对容差, 绝对下限)
+METRICS = {
+    'seconds': ("耗时", "s", 0.20, 0.05),
+    'peak_rss_mb': ("峰值内存", "MB", 0.15, 10.0),
+    'output_kb': ("输出大小", "KB", 0.05, 1.0),
+}
+
+
+def result_key(result):
+    return result['case'], result['variant'], result['size']
+
+
+def environment_info():
+    """记录运行环境，换了机器或 Python 版本后的结果不宜直接与基准比较"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'machine': platform.node(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+class BenchmarkHistory:
+    def __init__(self, path):
+        self.path = path
+        self.data = {'version': HISTORY_VERSION, 'baseline': None, 'runs': []}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    @property
+    def runs(self):
+        return self.data['runs']
+
+    def add_run(self, results, label=""):
+        run = dict(environment_info(), id=datetime.now().strftime("%Y%m%d-%H%M%S"),
+                   time=datetime.now().isoformat(timespec='seconds'), label=label, results=results)
+        self.runs.append(run)
+        return run
+
+    def find_run(self, run_id):
+        """按编号查找运行记录；'last' 表示上一次运行 (不含最新追加的一次)"""
+        if run_id == 'last':
+            return self.runs[-2] if len(self.runs) >= 2 else None
+        for run in self.runs:
+            if run['id'] == run_id:
+                return run
+        return None
+
+    def baseline(self):
+        return self.find_run(self.data.get('baseline')) if self.data.get('baseline') else None
+
+    def set_baseline(self, run):
+        self.data['baseline'] = run['id']
+
+    def save(self):
+        baseline_id = self.data.get('baseline')
+        excess = len(self.runs) - HISTORY_MAX_RUNS
+        if excess > 0:
+            self.data['runs'] = [run for index, run in enumerate(self.runs)
+                                 if index >= excess or run['id'] == baseline_id]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        atomic_write_bytes(self.path, json.dumps(self.data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def compare(run, baseline):
+    """
+    返回 [(结果, {指标: (基准值, 当前值, 相对变化, 是否回归)}), ...]，顺序与 run 的结果相同；
+    基准中没有的用例对应空字典。
+    """
+    base_results = {result_key(result): result for result in baseline['results']} if baseline else {}
+    comparisons = []
+    for result in run['results']:
+        base = base_results.get(result_key(result))
+        changes = {}
+        if base and result.get('status') != 'ok' and base.get('status') == 'ok':
+            changes['status'] = (None, None, 0.0, True)  # 基准中成功的用例现在失败
+        elif base and result.get('status') == 'ok' and base.get('status') == 'ok':
+            for metric, (_, _, tolerance, floor) in METRICS.items():
+                old, new = base.get(metric), result.get(metric)
+                if old is None or new is None:
+                    continue
+                ratio = (new - old) / old if old else 0.0
+                regressed = new > old * (1 + tolerance) and new - old > floor
+                changes[metric] = (old, new, ratio, regressed)
+        comparisons.append((result, changes))
+    return comparisons
+
+
+def regressions(comparisons):
+    return [(result, metric) for result, changes in comparisons
+            for metric, (_, _, _, regressed) in changes.items() if regressed]
+
+
+def format_report(comparisons, baseline):
+    lines = []
+    if baseline:
+        lines.append(f"基准: {baseline['id']} (提交 {baseline.get('commit') or '未知'}，{baseline.get('machine', '')})")
+    else:
+        lines.append("未设置基准，只记录本次结果 (使用 --set-baseline 设为基准)。")
+    lines.append(f"{'用例':<30}{'变体':<20}{'行数':>8}{'耗时':>12}{'峰值内存':>14}{'输出':>12}  对比基准")
+    for result, changes in comparisons:
+        name = f"{result['case']:<30}{result['variant']:<20}{result['size']:>8}"
+        if result.get('status') != 'ok':
+            regressed = " (回归! 基准中成功)" if 'status' in changes else ""
+            lines.append(f"{name}  失败: {result.get('error', '')}{regressed}")
+            continue
+        rss, output_kb = result.get('peak_rss_mb'), result.get('output_kb')
+        cells = (f"{result['seconds']:10.3f} s" + (f"{rss:11.1f} MB" if rss is not None else f"{'-':>14}")
+                 + (f"{output_kb:9.0f} KB" if output_kb is not None else f"{'-':>12}"))
+        notes = []
+        for metric, (_, _, ratio, regressed) in changes.items():
+            label = METRICS[metric][0]
+            if regressed:
+                notes.append(f"回归! {label} {ratio:+.0%}")
+            elif abs(ratio) >= METRICS[metric][2]:
+                notes.append(f"{label} {ratio:+.0%}")
+        lines.append(f"{name}{cells}  {'，'.join(notes) if notes else ('持平' if changes else '(无基准)')}")
+    return "\n".join(lines)
@@ -0,0 +1,284 @@
+# benchmarks/synthetic.py - 性能测试用的合成数据
+#
+# 生成与禅道导出结构相同的 Bug / 需求 / 用例文件、项目台账、验收测试模板和报告模板。
+# 模板包含合并单元格、图片 (需要 Pillow) 和宏 (.xlsm 中加入 vbaProject.bin)，规模随行数增长；
+# 同一 seed 生成的内容完全相同，便于不同版本之间比较。
+
+import os
+import zlib
+import struct
+import random
+import zipfile
+from datetime import date, datetime, timedelta
+
+from openpyxl import Workbook
+
+from config.settings import (
+    REPORT_SOURCE_SHEETS, REPORT_PICTURE_SHEET, REPORT_DATA_START_ROW, EXCEL_SHEET_NAME_ACCEPTANCE,
+    ACCEPTANCE_LEDGER_KEY_COLUMN, ACCEPTANCE_LEDGER_CELL_MAPPING, ACCEPTANCE_EXTRA_CELL_MAPPING
+)
+
+BUG_COLUMNS = ["Bug编号", "所属产品", "所属模块", "Bug标题", "严重程度", "优先级", "Bug类型", "重现步骤",
+               "Bug状态", "由谁创建", "创建日期", "指派给", "解决方案", "解决日期", "最后修改日期"]
+STORY_COLUMNS = ["编号", "所属产品", "所属模块", "需求名称", "优先级", "预计工时", "状态", "阶段", "由谁创建",
+                 "创建日期", "用例数"]
+CASE_COLUMNS = ["用例编号", "所属产品", "所属模块", "相关研发需求", "用例标题", "前置条件", "步骤", "预期",
+                "用例类型", "结果", "执行人", "执行时间"]
+
+# 验收测试结果工作表中各单元格所在的合并区域 (与实际模板的版式一致)
+ACCEPTANCE_MERGED_RANGES = ["A1:X1", "D2:F2", "H2:M2", "O2:S2", "U2:X2", "D3:F3", "H3:S3", "U3:X3",
+                            "D4:F4", "H4:M4", "O4:S4", "U4:X4", "E6:X6", "E7:X7"]
+VBA_PROJECT_KB = 64  # 合成宏的大小，与常见的带按钮宏的模板相当
+PICTURE_SIZE = (1600, 1200)  # 设备外观图的像素尺寸 (相机原图缩小后的常见尺寸)
+
+_START = datetime(2024, 1, 1)
+_PRODUCT = "2600F 窗口式照相机"
+
+
+def _users(rnd):
+    return f"user{rnd.randint(0, 29)}"
+
+
+def _module(rnd):
+    return f"/模块{rnd.randint(0, 19)}"
+
+
+def _time_text(rnd):
+    return (_START + timedelta(minutes=rnd.randint(0, 500000))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def bug_rows(rows, seed=0):
+    rnd = random.Random(seed)
+    statuses = ["激活", "已解决", "已关闭"]
+    for i in range(rows):
+        opened = _time_text(rnd)
+        yield [
+            i + 1, _PRODUCT, _module(rnd),
+            f"[2600F] 第{i}号问题：拍照后图片偶现花屏 model-{rnd.randint(100, 999)}",
+            rnd.randint(1, 4), rnd.randint(1, 4), "代码错误",
+            "[步骤]\n1. 打开相机\n2. 连续拍照\n[结果]\n图片花屏\n[期望]\n图片正常",
+            rnd.choice(statuses), _users(rnd), opened, _users(rnd), "", "", opened,
+        ]
+
+
+def story_rows(rows, seed=0):
+    rnd = random.Random(seed)
+    for i in range(rows):
+        yield [i + 1, _PRODUCT, _module(rnd), f"支持第{i}种拍摄模式的参数配置", rnd.randint(1, 4),
+               rnd.randint(1, 16), rnd.choice(["激活", "已关闭"]), rnd.choice(["研发中", "测试完毕", "已发布"]),
+               _users(rnd), _time_text(rnd), rnd.randint(0, 5)]
+
+
+def case_rows(rows, story_count, seed=0):
+    rnd = random.Random(seed)
+    for i in range(rows):
+        story = rnd.randint(1, max(1, story_count))
+        yield [i + 1, _PRODUCT, _module(rnd), f"支持第{story - 1}种拍摄模式的参数配置 (#{story})",
+               f"验证第{i}项功能", "设备已上电", "1. 进入设置\n2. 修改参数", "参数生效", "功能测试",
+               rnd.choice(["通过", "通过", "通过", "失败", "阻塞", ""]), _users(rnd), _time_text(rnd)]
+
+
+def ledger_rows(rows, seed=0):
+    """项目台账：关键列为“项目_产品”，取值形如 'P0012_XD-0012 工业相机'"""
+    rnd = random.Random(seed)
+    for i in range(rows):
+        values = {
+            ACCEPTANCE_LEDGER_KEY_COLUMN: f"P{i:05d}_XD-{i:05d} 工业相机",
+            '项目编号': f"P{i:05d}", '项目名称': f"第{i}号相机项目", '项目经理': _users(rnd),
+            '内部型号': f"XD-{i:05d}", '产品名称': f"XD-{i:05d} 工业相机", '产品经理': _users(rnd),
+            '负责人': _users(rnd),
+        }
+        yield values
+
+
+def ledger_key(rows, position=0.5):
+    """台账中位于指定位置 (0-1) 的项目的查询关键词 (内部型号)"""
+    return f"XD-{int((rows - 1) * position):05d}"
+
+
+def write_table(path, headers, rows, sheet_name="Sheet1"):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def generate_bug_export(path, rows, seed=0):
+    """生成与禅道 Bug 导出结构相同的 xlsx 文件"""
+    return write_table(path, BUG_COLUMNS, bug_rows(rows, seed), "Bug")
+
+
+def generate_story_export(path, rows, seed=0):
+    return write_table(path, STORY_COLUMNS, story_rows(rows, seed), "需求")
+
+
+def generate_case_export(path, rows, story_count=None, seed=0):
+    return write_table(path, CASE_COLUMNS, case_rows(rows, story_count or rows, seed), "用例")
+
+
+def generate_ledger(path, rows, seed=0):
+    headers = [ACCEPTANCE_LEDGER_KEY_COLUMN] + [name for name in ACCEPTANCE_LEDGER_CELL_MAPPING]
+    return write_table(path, headers, ([row[name] for name in headers] for row in ledger_rows(rows, seed)), "台账")
+
+
+def generate_mixed_types(path, iso_dates=False):
+    """
+    包含各种单元格类型的小文件，用于检查读取后端的结果是否一致：整数、小数、文本、布尔、空单元格、
+    中间的空行、日期时间 (iso_dates=True 时以 t="d" 的 ISO 8601 文本保存，否则为带日期格式的序列号)
+    """
+    wb = Workbook(iso_dates=iso_dates)
+    ws = wb.active
+    ws.title = "Bug"
+    ws.append(["编号", "数值", "标题", "已确认", "空", "创建日期", "解决日期"])
+    ws.append([1, 1.5, "拍照后图片偶现花屏", True, None, datetime(2025, 7, 14, 10, 20), date(2025, 7, 14)])
+    ws.append([2, -3, "", False, None, datetime(2024, 2, 29, 23, 59, 59), None])
+    ws.append([])
+    ws.append([3, 1e-7, "多行\n文本", None, None, None, date(2000, 1, 1)])
+    ws.cell(row=7, column=3, value="稀疏行")
+    return _save(wb, path)
+
+
+def png_bytes(width, height, seed=0):
+    """不依赖 Pillow 生成 PNG：横向渐变叠加噪声，压缩率与照片接近"""
+    rnd = random.Random(seed)
+    gradient = bytes(int(255 * x / max(1, width - 1)) for x in range(width)) * 3
+    raw = bytearray()
+    for _ in range(height):
+        noise = rnd.randbytes(width * 3)
+        raw.append(0)  # 每行的过滤类型: None
+        raw.extend((g ^ (n & 0x3f)) for g, n in zip(gradient, noise))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(raw), 6))
+            + chunk(b"IEND", b""))
+
+
+def generate_picture(path, size=PICTURE_SIZE, seed=0):
+    with open(path, "wb") as f:
+        f.write(png_bytes(size[0], size[1], seed))
+    return path
+
+
+def pictures_supported():
+    """openpyxl 读写图片需要 Pillow"""
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _add_picture(ws, picture_path, anchor, width=320, height=240):
+    from openpyxl.drawing.image import Image
+    img = Image(picture_path)
+    img.width, img.height = width, height
+    ws.add_image(img, anchor)
+
+
+def _fill_acceptance_sheet(ws, picture_path=None):
+    for cell_range in ACCEPTANCE_MERGED_RANGES:
+        ws.merge_cells(cell_range)
+    ws["A1"] = "验收测试结果"
+    for name, cell in list(ACCEPTANCE_LEDGER_CELL_MAPPING.items()) + list(ACCEPTANCE_EXTRA_CELL_MAPPING.items()):
+        column, row = cell[0], int(cell[1:])
+        ws[f"{chr(ord(column) - 1)}{row}"] = name  # 标签在目标单元格左侧
+    if picture_path:
+        _add_picture(ws, picture_path, "Z1", 120, 60)  # 公司标志
+
+
+def _fill_detail_sheet(ws, rows):
+    """规模随行数增长的明细表，每行有一个合并区域 (测试项说明跨三列)"""
+    ws.append(["序号", "测试项", None, None, "结果", "备注"])
+    ws.merge_cells("B1:D1")
+    for i in range(rows):
+        ws.append([i + 1, f"第{i}项验收测试", None, None, "通过", ""])
+        ws.merge_cells(f"B{i + 2}:D{i + 2}")
+
+
+def generate_acceptance_template(path, detail_rows, picture_path=None):
+    """验收测试模板：验收测试结果工作表 (合并单元格、标志图片) 和 detail_rows 行的明细表"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = EXCEL_SHEET_NAME_ACCEPTANCE
+    _fill_acceptance_sheet(ws, picture_path)
+    _fill_detail_sheet(wb.create_sheet("测试明细"), detail_rows)
+    return _save(wb, path)
+
+
+def _prefill_rows(rows, change_ratio, seed):
+    """报告中上一次汇总留下的数据：与源数据相同，只有 change_ratio 比例的行不同 (用于 diff 写入模式)"""
+    rnd = random.Random(seed)
+    for row in rows:
+        if rnd.random() < change_ratio:
+            row = list(row)
+            row[3] = f"{row[3]} (旧)"
+        yield row
+
+
+def generate_report_template(path, rows, picture_path=None, change_ratio=0.1, seed=0):
+    """
+    报告模板：三个数据工作表 (第1行合并标题，第2行表头，已有上一次汇总的 rows 行数据)、
+    设备外观图工作表 (已有一张旧图片) 和验收测试结果工作表。
+    """
+    wb = Workbook()
+    wb.remove(wb.active)
+    sources = [
+        (BUG_COLUMNS, bug_rows(rows, seed)),
+        (STORY_COLUMNS, story_rows(rows, seed)),
+        (CASE_COLUMNS, case_rows(rows, rows, seed)),
+    ]
+    for sheet_name, (headers, data) in zip(REPORT_SOURCE_SHEETS, sources):
+        ws = wb.create_sheet(sheet_name)
+        ws.cell(row=1, column=1, value=sheet_name)
+        ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=len(headers))
+        for column, header in enumerate(headers, start=1):
+            ws.cell(row=2, column=column, value=header)
+        for offset, row in enumerate(_prefill_rows(data, change_ratio, seed + 1)):
+            for column, value in enumerate(row, start=1):
+                ws.cell(row=REPORT_DATA_START_ROW + offset, column=column, value=value)
+    pic_ws = wb.create_sheet(REPORT_PICTURE_SHEET)
+    pic_ws["A1"] = REPORT_PICTURE_SHEET
+    if picture_path:
+        _add_picture(pic_ws, picture_path, "A2")
+    _fill_acceptance_sheet(wb.create_sheet(EXCEL_SHEET_NAME_ACCEPTANCE), picture_path)
+    return _save(wb, path)
+
+
+def _save(wb, path):
+    wb.save(path)
+    if path.lower().endswith(".xlsm"):
+        add_vba_project(path)
+    return path
+
+
+def add_vba_project(path, size_kb=VBA_PROJECT_KB, seed=0):
+    """
+    把 openpyxl 保存的工作簿改为启用宏的工作簿：加入 vbaProject.bin 及其关系和内容类型。
+    宏内容是随机字节，不能在 Excel 中运行，只用于测试 keep_vba 读写宏部件的开销。
+    """
+    payload = random.Random(seed).randbytes(size_kb * 1024)
+    tmp_path = path + ".tmp"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == "[Content_Types].xml":
+                text = data.decode("utf-8")
+                text = text.replace("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml",
+                                    "application/vnd.ms-excel.sheet.macroEnabled.main+xml")
+                text = text.replace("</Types>", '<Default Extension="bin" '
+                                                'ContentType="application/vnd.ms-office.vbaProject"/></Types>')
+                data = text.encode("utf-8")
+            elif item.filename == "xl/_rels/workbook.xml.rels":
+                data = data.decode("utf-8").replace(
+                    "</Relationships>",
+                    '<Relationship Id="rIdVba" Type="http://schemas.microsoft.com/office/2006/relationships/vbaProject"'
+                    ' Target="vbaProject.bin"/></Relationships>').encode("utf-8")
+            dst.writestr(item, data)
+        dst.writestr("xl/vbaProject.bin", payload)
+    os.replace(tmp_path, path)
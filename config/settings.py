@@ -9,6 +9,22 @@ class ManagerAccountConfig:
         self.password = ""
         self.is_configured = False
 
+
+def _default_app_data_dir():
+    """用户级的程序数据目录：Windows 为 %APPDATA%\\GenReport，其他系统为 ~/.config/GenReport"""
+    if os.name == 'nt' and os.environ.get('APPDATA'):
+        return os.path.join(os.environ['APPDATA'], "GenReport")
+    base = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "GenReport")
+
+
+# 程序数据目录 (设置、缓存、日志)，与启动程序时的当前目录无关；可用环境变量 GENREPORT_HOME 指定
+APP_DATA_DIR = os.environ.get('GENREPORT_HOME') or _default_app_data_dir()
+
+# 所有页面的设置保存在同一个文件中：启动时读取一次，修改后延迟 SETTINGS_SAVE_DELAY 秒合并写入
+SETTINGS_FILE = os.path.join(APP_DATA_DIR, "settings.json")
+SETTINGS_SAVE_DELAY = 1.0
+
 # 定义默认下载目录为程序运行目录下的 'raw_data'
 # 确保在 main.py 中将当前工作目录设置为脚本所在目录，以保证相对路径正确
 DOWNLOAD_DIR = os.path.join(os.getcwd(), "raw_data")
@@ -16,6 +32,11 @@ DOWNLOAD_DIR = os.path.join(os.getcwd(), "raw_data")
 # 禅道URL基地址
 ZEN_TAO_BASE_URL = "http://10.200.10.220/zentao" # **请务必根据您的实际禅道URL修改此项**
 
+# 禅道会话保活间隔 (秒)：空闲会话按此间隔访问轻量页面，避免登录过期
+ZENTAO_SESSION_PING_INTERVAL = 300
+# 禅道会话空闲超时 (秒)：超过此时间未被使用的浏览器会话将被关闭
+ZENTAO_SESSION_IDLE_TIMEOUT = 1800
+
 # Edge WebDriver 的路径
 # 请将 msedgedriver.exe 放在项目根目录，或者在此处指定其完整路径
 # 确保 msedgedriver 的版本与您的 Edge 浏览器版本兼容
@@ -36,6 +57,94 @@ FIELD_MAPPING_EXCEL_AND_UI = {
 
 EXCEL_SHEET_NAME_ACCEPTANCE = "验收测试结果"
 
+# 项目台账写入工具：台账查询列、从台账读取的字段及其在“验收测试结果”工作表中的单元格
+ACCEPTANCE_LEDGER_KEY_COLUMN = '项目_产品'
+ACCEPTANCE_LEDGER_CELL_MAPPING = {
+    '项目编号': 'D2',
+    '项目名称': 'H2',
+    '项目经理': 'U2',
+    '内部型号': 'D3',
+    '产品名称': 'H3',
+    '产品经理': 'U3',
+    '负责人': 'U4'
+}
+# 用户填写的附加字段及其单元格 (只写入已填写的字段)
+ACCEPTANCE_EXTRA_CELL_MAPPING = {
+    '测试单号': 'O2',
+    '申请理由': 'D4',
+    '开始时间': 'H4',
+    '结束时间': 'O4',
+    '测试依据': 'E6',
+    '测试范围': 'E7'
+}
+# 批量填写清单中关键词所在的列名
+ACCEPTANCE_BATCH_KEYWORD_COLUMN = '关键词'
+
+# 数据汇总：源文档 (Doc1-Doc3) 对应的目标工作表，以及设备外观图 (Doc4) 所在工作表
+REPORT_SOURCE_SHEETS = ['遗留缺陷列表', '产品需求列表', '验收测试用例']
+REPORT_PICTURE_SHEET = '设备外观图'
+REPORT_DATA_START_ROW = 3  # 数据从目标工作表第3行开始写入
+REPORT_PICTURE_SIZE_CM = (23.66, 13.31)  # 设备外观图显示尺寸 (宽, 高)，单位厘米
+REPORT_PICTURE_DPI = 150  # 插入前把设备外观图缩小到显示尺寸在此 DPI 下的像素数
+REPORT_PICTURE_JPEG_QUALITY = 85
+
+# 报告数据汇总页：由三份源文档计算的统计表及 Excel 原生图表写入此工作表；设为 None 则不生成
+REPORT_SUMMARY_SHEET = '数据汇总'
+REPORT_SUMMARY_TOP_N = 10  # 缺陷按模块、指派人统计时只列出数量最多的前 N 项，其余合计为“其他”
+# 在禅道导出文件的表头中查找统计所需列时依次尝试的列名
+REPORT_SUMMARY_COLUMNS = {
+    'bug_severity': ['严重程度'],
+    'bug_status': ['Bug状态', '状态'],
+    'bug_module': ['所属模块', '模块'],
+    'bug_assignee': ['指派给'],
+    'story_id': ['编号', 'ID', '需求编号'],
+    'story_case_count': ['用例数'],
+    'case_story': ['相关研发需求', '相关需求', '需求'],
+    'case_result': ['结果', '执行结果', '最后执行结果'],
+}
+
+# 本地缓存目录 (处理后的图片等)
+CACHE_DIR = os.path.join(APP_DATA_DIR, "cache")
+
+# 日志：所有页面和后台任务的日志经队列写入内存环形缓冲区和滚动日志文件，界面按固定间隔批量刷新
+LOG_DIR = os.path.join(APP_DATA_DIR, "logs")
+LOG_FILE_NAME = "genreport.log"
+LOG_FILE_MAX_MB = 5  # 单个日志文件大小上限，超出后滚动
+LOG_FILE_BACKUPS = 5  # 保留的历史日志文件数
+LOG_FILE_LEVEL = "DEBUG"  # 写入日志文件的最低级别
+LOG_RING_SIZE = 20000  # 内存环形缓冲区保留的记录条数
+LOG_VIEW_FLUSH_MS = 100  # 日志视图的刷新间隔 (毫秒)
+LOG_VIEW_MAX_LINES = 5000  # 每个日志视图最多显示的行数，超出时丢弃最早的行
+
+# 数据汇总引擎：xlwings 需要本机安装 Microsoft Excel；openpyxl 为纯 Python 实现，可在 Linux 上运行
+CONSOLIDATION_ENGINES = ["xlwings", "openpyxl"]
+CONSOLIDATION_ENGINE_DEFAULT = "xlwings"
+
+# 数据写入模式：replace 清除后整表重写；diff 与现有内容比较，只写入变化的行
+CONSOLIDATION_WRITE_MODES = ["replace", "diff"]
+CONSOLIDATION_WRITE_MODE_DEFAULT = "replace"
+# 写入报告时每批写入的行数：源数据按批流式读取 (iterparse / openpyxl 后端) 和写入，内存占用与数据总行数无关
+CONSOLIDATION_CHUNK_ROWS = 5000
+
+# 批量汇总：文件夹中的清单文件名，以及按文件名关键字识别文档的约定 (按顺序匹配，先匹配目标报告)
+BATCH_MANIFEST_NAMES = ["manifest.json", "manifest.csv"]
+BATCH_FILE_KEYWORDS = {
+    "target_report_path": ["报告"],
+    "doc1_path": ["Bug", "缺陷"],
+    "doc2_path": ["需求"],
+    "doc3_path": ["测试单", "用例"],
+}
+BATCH_MAX_WRITERS_DEFAULT = 2  # 默认并行写入进程数 (xlwings 引擎下即同时运行的 Excel 实例数)
+
+# 后台任务调度 (core/job_scheduler.py)：各类资源同时占用的上限，超出时任务排队；
+# 任务列表中保留的已结束任务数
+JOB_RESOURCE_LIMITS = {
+    'browser': 2,  # 同时驱动的浏览器 (同一账号的会话另由会话代理保证独占)
+    'excel': max(BATCH_MAX_WRITERS_DEFAULT, 2),  # 同时运行的 Excel 实例
+    'cpu': max(1, (os.cpu_count() or 2) - 1),  # 解析、汇总等占用 CPU 的进程
+}
+JOB_HISTORY_SIZE = 50
+
 
 MANAGER_CONFIG = ManagerAccountConfig()
 
@@ -48,3 +157,75 @@ BUG_SEVERITY_OPTIONS = [
     "1", "2", "3", "4"  # 1-严重，2-主要，3-次要，4-建议
 ]
 
+# BUG查询结果缓存：相同查询条件在 TTL (秒) 内直接使用缓存结果；超过 TTL 时先显示缓存结果，
+# 同时在后台重新查询，数据有变化才刷新表格。磁盘上最多保留的条目数和总大小，超出时淘汰最久未使用的条目
+BUG_QUERY_CACHE_TTL = 600
+BUG_QUERY_CACHE_MAX_ENTRIES = 50
+BUG_QUERY_CACHE_MAX_MB = 200
+
+# BUG查询按禅道搜索条件分页取回结果：每页条数，以及最多读取的页数
+BUG_QUERY_PAGE_SIZE = 500
+BUG_QUERY_MAX_PAGES = 200
+
+# BUG详情：按 BUG ID 缓存在本地，列表中没有最后编辑时间时，缓存在 TTL (秒) 内视为最新；
+# 选中表格中的某一行后，在后台预取前后若干行的详情，每次请求一批
+BUG_DETAIL_CACHE_TTL = 1800
+BUG_DETAIL_CACHE_MAX_ENTRIES = 5000
+BUG_DETAIL_PREFETCH_RADIUS = 5
+BUG_DETAIL_BATCH_SIZE = 8
+
+
+# 关键词排序匹配 (台账项目、禅道产品)：返回的候选数量，以及前两名得分差小于此值时提示用户选择
+FUZZY_MATCH_TOP_K = 5
+FUZZY_MATCH_AMBIGUITY_MARGIN = 0.1
+
+# xlsx 读取后端："auto" 自动选择最快的可用后端 (分块写入报告时选择最快的流式后端)，
+# 也可指定 "calamine" / "iterparse" / "openpyxl" / "pandas"
+XLSX_READER_BACKEND = "auto"
+
+# 性能分析 (core/profiling.py)：设置环境变量 GENREPORT_PROFILE=1，或在设置文件的 "profiling" 节中把 enabled
+# 设为 true 后，每次后台任务和命令行批处理都用 cProfile 和 tracemalloc 记录，结果写入 PROFILE_DIR 下按次运行的文件夹
+PROFILE_ENV_VAR = "GENREPORT_PROFILE"
+PROFILE_DIR = os.path.join(APP_DATA_DIR, "profiles")
+PROFILE_MAX_RUNS = 50  # 保留的运行记录数，超出时删除最早的
+PROFILE_TOP_FUNCTIONS = 40  # 每次运行记录的最耗时函数数
+PROFILE_TOP_ALLOCATIONS = 30  # 每次运行记录的最大内存分配位置数
+PROFILE_TRACEMALLOC_FRAMES = 5  # 每个内存分配记录的调用栈深度
+
+# 各页面设置的默认值 (见 core/settings_store.py)：读取时补全缺少的键，类型不符的值使用默认值
+SETTINGS_SCHEMA = {
+    "zentao_export": {
+        "account": "",
+        "password": "",
+        "product_name": "",
+        "test_report_id": TEST_REPORT_ID_DEFAULT,
+        "download_dir": DOWNLOAD_DIR,
+        "headless_mode": HEADLESS_MODE_DEFAULT,
+    },
+    "data_chart": {
+        "doc1_path": "",
+        "doc2_path": "",
+        "doc3_path": "",
+        "doc4_path": "",
+        "target_report_path": "",
+        "engine": CONSOLIDATION_ENGINE_DEFAULT,
+        "max_writers": BATCH_MAX_WRITERS_DEFAULT,
+        "write_mode": CONSOLIDATION_WRITE_MODE_DEFAULT,
+    },
+    "bug_query": {
+        "manager_account": "",
+        "manager_password": "",
+        "product_name": "",
+        "status_index": 0,
+        "severity_index": 0,
+        "include_resolved": True,
+        "include_closed": False,
+    },
+    "acceptance_filling": {
+        "excel_template_path": "",
+        "input_data": {},
+    },
+    "profiling": {
+        "enabled": False,
+    },
+}
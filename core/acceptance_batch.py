@@ -0,0 +1,220 @@
+# core/acceptance_batch.py - 批量填写验收测试结果
+#
+# 清单 (CSV 或 xlsx 第一个工作表) 每行一个项目：“关键词”列用于在台账中查找项目，
+# 其余列名与 ACCEPTANCE_EXTRA_CELL_MAPPING 中的附加字段 (测试单号、开始时间等) 对应。
+# 台账只解析一次并在主进程中完成全部查询；每个项目的输出工作簿在进程池中生成，
+# 输出文件名保证不覆盖已有文件。
+#
+# 命令行用法:
+#   python -m core.acceptance_batch <台账.xlsx> <模板.xlsm> <清单.csv> [--output-dir 目录] [--workers 4]
+
+import os
+import re
+import csv
+import sys
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from openpyxl import load_workbook
+
+from core.ledger_index import get_ledger_index
+from core.fuzzy_match import is_ambiguous
+from core.xlsx_readers import iter_rows
+from core.template_layout import get_template_layout
+from core.file_utils import atomic_save_workbook
+from core.profiling import profile_run
+from config.settings import (
+    EXCEL_SHEET_NAME_ACCEPTANCE, ACCEPTANCE_LEDGER_KEY_COLUMN, ACCEPTANCE_LEDGER_CELL_MAPPING,
+    ACCEPTANCE_EXTRA_CELL_MAPPING, ACCEPTANCE_BATCH_KEYWORD_COLUMN
+)
+
+_INVALID_FILENAME_RE = re.compile(r'[\\/:*?"<>|\r\n\t]+')
+_TARGET_CELLS = list(ACCEPTANCE_LEDGER_CELL_MAPPING.values()) + list(ACCEPTANCE_EXTRA_CELL_MAPPING.values())
+
+
+def fill_acceptance_workbook(template_path, output_path, ledger_row, extra_data, progress_callback=None):
+    """
+    把台账数据和已填写的附加字段写入模板的“验收测试结果”工作表，保存到 output_path
+    (可以与 template_path 相同，即原地写入；保存是原子的，中途失败不会损坏原文件)。.xlsm 模板保留宏。
+    progress_callback(percent) 在加载、写入、保存后调用。
+    """
+    wb = load_workbook(template_path, keep_vba=template_path.lower().endswith(".xlsm"))
+    if progress_callback: progress_callback(40)
+    if EXCEL_SHEET_NAME_ACCEPTANCE not in wb.sheetnames:
+        raise ValueError(f"写入模板缺少工作表：{EXCEL_SHEET_NAME_ACCEPTANCE}")
+    sheet = wb[EXCEL_SHEET_NAME_ACCEPTANCE]
+    layout = get_template_layout(template_path, wb, targets={EXCEL_SHEET_NAME_ACCEPTANCE: _TARGET_CELLS})
+    ledger_cells = layout.resolve_mapping(EXCEL_SHEET_NAME_ACCEPTANCE, ACCEPTANCE_LEDGER_CELL_MAPPING)
+    extra_cells = layout.resolve_mapping(EXCEL_SHEET_NAME_ACCEPTANCE, ACCEPTANCE_EXTRA_CELL_MAPPING)
+
+    # 主数据写入
+    for key, cell in ledger_cells.items():
+        sheet[cell] = ledger_row.get(key, "")
+
+    # 附加字段写入（仅填写的才写）
+    for key, cell in extra_cells.items():
+        if extra_data.get(key):
+            sheet[cell] = extra_data[key]
+
+    if progress_callback: progress_callback(60)
+    atomic_save_workbook(wb, output_path)
+    if progress_callback: progress_callback(100)
+
+
+def _read_csv(path):
+    for encoding in ('utf-8-sig', 'gbk'):
+        try:
+            with open(path, 'r', encoding=encoding, newline='') as f:
+                return list(csv.DictReader(f))
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"无法识别清单文件编码: {os.path.basename(path)}")
+
+
+def _read_sheet(path):
+    rows = iter_rows(path, skip_rows=0)
+    headers = next(rows, None) or []
+    headers = ["" if header is None else str(header).strip() for header in headers]
+    return [{header: row[i] if i < len(row) else None for i, header in enumerate(headers) if header}
+            for row in rows]
+
+
+def load_batch_entries(list_path):
+    """读取批量清单，返回 [{'keyword': 关键词, 'extra': {附加字段: 值}}, ...]，跳过关键词为空的行"""
+    if list_path.lower().endswith('.csv'):
+        records = _read_csv(list_path)
+    else:
+        records = _read_sheet(list_path)
+    if records and ACCEPTANCE_BATCH_KEYWORD_COLUMN not in records[0]:
+        raise ValueError(f"清单中缺少列：{ACCEPTANCE_BATCH_KEYWORD_COLUMN}")
+
+    entries = []
+    for record in records:
+        keyword = str(record.get(ACCEPTANCE_BATCH_KEYWORD_COLUMN) or '').strip()
+        if not keyword:
+            continue
+        extra = {}
+        for field in ACCEPTANCE_EXTRA_CELL_MAPPING:
+            value = record.get(field)
+            if value is not None and str(value).strip():
+                extra[field] = value.strip() if isinstance(value, str) else value
+        entries.append({'keyword': keyword, 'extra': extra})
+    return entries
+
+
+def unique_output_path(output_dir, base_name, ext, reserved):
+    """返回不与已有文件及本批次已分配路径 (reserved) 重复的输出路径，并将其加入 reserved"""
+    base_name = _INVALID_FILENAME_RE.sub('_', base_name).strip(' .') or "output"
+    candidate = os.path.join(output_dir, base_name + ext)
+    counter = 2
+    while os.path.exists(candidate) or os.path.normcase(candidate) in reserved:
+        candidate = os.path.join(output_dir, f"{base_name} ({counter}){ext}")
+        counter += 1
+    reserved.add(os.path.normcase(candidate))
+    return candidate
+
+
+def _render_job(template_path, output_path, ledger_row, extra_data):
+    """工作进程：生成一个项目的输出工作簿"""
+    start_time = time.time()
+    try:
+        fill_acceptance_workbook(template_path, output_path, ledger_row, extra_data)
+        return True, "", round(time.time() - start_time, 2)
+    except Exception as e:
+        return False, f"{e}\n{traceback.format_exc()}", round(time.time() - start_time, 2)
+
+
+def run_acceptance_batch(ledger_path, template_path, entries, output_dir=None, max_workers=None,
+                         log_callback=None, on_result=None):
+    """
+    批量生成验收测试结果。返回按清单顺序排列的结果列表，每项包含
+    keyword / output_path / success / message / elapsed。on_result(index, result) 在每个项目完成时调用。
+    """
+    def log(message, is_error=False):
+        if log_callback:
+            log_callback(message, is_error)
+
+    output_dir = output_dir or os.path.dirname(os.path.abspath(template_path))
+    os.makedirs(output_dir, exist_ok=True)
+    template_base, template_ext = os.path.splitext(os.path.basename(template_path))
+
+    index = get_ledger_index(ledger_path, log_callback)
+    # 主进程中先分析模板布局并写入磁盘缓存，工作进程直接读取缓存
+    get_template_layout(template_path, targets={EXCEL_SHEET_NAME_ACCEPTANCE: _TARGET_CELLS}, log_callback=log_callback)
+    target_columns = list(ACCEPTANCE_LEDGER_CELL_MAPPING)
+
+    results = [None] * len(entries)
+    pending = []  # (序号, 输出路径, 台账行, 附加字段)
+    reserved = set()
+    for i, entry in enumerate(entries):
+        keyword = entry['keyword']
+        candidates = index.search(ACCEPTANCE_LEDGER_KEY_COLUMN, keyword, target_columns, require_substring=True)
+        if not candidates:
+            results[i] = {'keyword': keyword, 'output_path': '', 'success': False,
+                          'message': "台账中未找到匹配行", 'elapsed': 0}
+            log(f"'{keyword}': 台账中未找到匹配行。", True)
+            if on_result:
+                on_result(i, results[i])
+            continue
+        if is_ambiguous([match for match, _ in candidates]):
+            log(f"提示: '{keyword}' 匹配到多个项目，已选择 '{candidates[0][0].text}'。其他候选: "
+                + ", ".join(match.text for match, _ in candidates[1:]), False)
+        output_path = unique_output_path(output_dir, f"{template_base}_{keyword}", template_ext, reserved)
+        pending.append((i, output_path, candidates[0][1], entry['extra']))
+
+    if pending:
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(pending)))
+        log(f"使用 {max_workers} 个进程生成 {len(pending)} 份工作簿...", False)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_render_job, template_path, output_path, ledger_row, extra): (i, output_path)
+                       for i, output_path, ledger_row, extra in pending}
+            for future in as_completed(futures):
+                i, output_path = futures[future]
+                try:
+                    success, message, elapsed = future.result()
+                except Exception as e:
+                    success, message, elapsed = False, f"工作进程异常: {e}", 0
+                results[i] = {'keyword': entries[i]['keyword'], 'output_path': output_path,
+                              'success': success, 'message': message, 'elapsed': elapsed}
+                if success:
+                    log(f"'{entries[i]['keyword']}' -> {os.path.basename(output_path)}", False)
+                else:
+                    log(f"'{entries[i]['keyword']}' 生成失败: {message}", True)
+                if on_result:
+                    on_result(i, results[i])
+    return results
+
+
+def format_summary(results):
+    succeeded = sum(1 for result in results if result['success'])
+    return f"共 {len(results)} 个项目，成功 {succeeded}，失败 {len(results) - succeeded}。"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量填写验收测试结果")
+    parser.add_argument("ledger", help="项目台账 (.xlsx)")
+    parser.add_argument("template", help="写入模板 (.xlsx/.xlsm)")
+    parser.add_argument("list", help="批量清单 (.csv/.xlsx)，包含“关键词”列及附加字段列")
+    parser.add_argument("--output-dir", default=None, help="输出目录，默认与模板相同")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="记录性能分析 (见 core.profiling，默认按环境变量或设置决定)")
+    args = parser.parse_args(argv)
+
+    entries = load_batch_entries(args.list)
+    if not entries:
+        print("清单中没有任何项目。", file=sys.stderr)
+        return 1
+    log_callback = lambda msg, is_err=False: print(msg, file=sys.stderr if is_err else sys.stdout)
+    with profile_run("acceptance_batch", enabled=args.profile, log_callback=log_callback):
+        results = run_acceptance_batch(
+            args.ledger, args.template, entries, output_dir=args.output_dir, max_workers=args.workers,
+            log_callback=log_callback)
+    print(format_summary(results))
+    return 0 if all(result['success'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
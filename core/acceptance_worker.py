@@ -0,0 +1,130 @@
+# core/acceptance_worker.py
+from PyQt5.QtCore import QThread, pyqtSignal
+import traceback
+from core.acceptance_batch import run_acceptance_batch, format_summary, fill_acceptance_workbook
+from core.excel_utils import search_ledger_candidates, fill_excel_template_acceptance
+from core.profiling import profiled
+from config.settings import ACCEPTANCE_LEDGER_KEY_COLUMN, ACCEPTANCE_LEDGER_CELL_MAPPING
+
+
+class LedgerSearchWorker(QThread):
+    """在台账中查找关键词的候选项目 (首次使用台账时需要解析文件)"""
+    log_signal = pyqtSignal(str, bool)  # message, is_error
+    candidates_signal = pyqtSignal(object)  # [(FuzzyMatch, 台账行), ...]
+    finished_signal = pyqtSignal(bool, str)  # success, message
+
+    def __init__(self, ledger_path, keyword):
+        super().__init__()
+        self.ledger_path = ledger_path
+        self.keyword = keyword
+
+    @profiled()
+    def run(self):
+        try:
+            candidates = search_ledger_candidates(
+                file_path=self.ledger_path,
+                key_column=ACCEPTANCE_LEDGER_KEY_COLUMN,
+                key_value=self.keyword,
+                target_columns=list(ACCEPTANCE_LEDGER_CELL_MAPPING)
+            )
+            self.candidates_signal.emit(candidates)
+            self.finished_signal.emit(True, f"找到 {len(candidates)} 个候选项目")
+        except Exception as e:
+            self.log_signal.emit(traceback.format_exc(), True)
+            self.finished_signal.emit(False, f"读取台账失败：{e}")
+
+
+class AcceptanceFillWorker(QThread):
+    """把一个项目的台账数据和附加字段写入模板 (原子保存)"""
+    log_signal = pyqtSignal(str, bool)  # message, is_error
+    progress_signal = pyqtSignal(int)  # 0-100
+    finished_signal = pyqtSignal(bool, str)  # success, message
+
+    def __init__(self, template_path, output_path, ledger_row, extra_data):
+        super().__init__()
+        self.template_path = template_path
+        self.output_path = output_path
+        self.ledger_row = ledger_row
+        self.extra_data = extra_data
+
+    @profiled()
+    def run(self):
+        try:
+            self.progress_signal.emit(10)
+            fill_acceptance_workbook(self.template_path, self.output_path, self.ledger_row, self.extra_data,
+                                     progress_callback=self.progress_signal.emit)
+            self.finished_signal.emit(True, "数据已成功写入 Excel 模板！")
+        except PermissionError:
+            self.finished_signal.emit(False, "无法保存文件：权限被拒绝，请确保 Excel 文件已关闭且您有写入权限。")
+        except Exception as e:
+            self.log_signal.emit(traceback.format_exc(), True)
+            self.finished_signal.emit(False, f"发生错误：\n{str(e)}")
+
+
+class TemplateFillWorker(QThread):
+    """验收测试填写页：按字段映射填写模板并另存为 filled_ 文件"""
+    log_signal = pyqtSignal(str, bool)  # message, is_error
+    progress_signal = pyqtSignal(int)  # 0-100
+    finished_signal = pyqtSignal(bool, str)  # success, message
+
+    def __init__(self, template_path, data, field_mapping, sheet_name):
+        super().__init__()
+        self.template_path = template_path
+        self.data = data
+        self.field_mapping = field_mapping
+        self.sheet_name = sheet_name
+
+    @profiled()
+    def run(self):
+        try:
+            self.progress_signal.emit(10)
+            success = fill_excel_template_acceptance(
+                self.template_path, self.data, self.field_mapping, self.sheet_name,
+                log_callback=lambda msg, is_error=False: self.log_signal.emit(msg, is_error),
+                progress_callback=self.progress_signal.emit
+            )
+            if success:
+                self.finished_signal.emit(True, "Excel 填充完成。")
+            else:
+                self.finished_signal.emit(False, "填充 Excel 失败，请查看日志获取详情。")
+        except Exception as e:
+            self.log_signal.emit(traceback.format_exc(), True)
+            self.finished_signal.emit(False, f"填充 Excel 异常: {e}")
+
+
+class AcceptanceBatchWorker(QThread):
+    """批量填写验收测试结果：台账解析一次，每个项目的工作簿在进程池中生成"""
+    log_signal = pyqtSignal(str, bool)  # message, is_error
+    job_finished_signal = pyqtSignal(int, object)  # entry index, result dict
+    finished_signal = pyqtSignal(bool, str)  # success, message
+
+    def __init__(self, ledger_path, template_path, entries, output_dir=None, max_workers=None):
+        super().__init__()
+        self.ledger_path = ledger_path
+        self.template_path = template_path
+        self.entries = list(entries)
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.results = []
+
+    @profiled()
+    def run(self):
+        try:
+            self.log_signal.emit(f"开始批量填写，共 {len(self.entries)} 个项目...", False)
+            self.results = run_acceptance_batch(
+                self.ledger_path, self.template_path, self.entries,
+                output_dir=self.output_dir, max_workers=self.max_workers,
+                log_callback=lambda msg, is_err=False: self.log_signal.emit(msg, is_err),
+                on_result=lambda index, result: self.job_finished_signal.emit(index, result)
+            )
+            summary = format_summary(self.results)
+            self.log_signal.emit(summary, False)
+            failed = [r for r in self.results if not r['success']]
+            if failed:
+                self.finished_signal.emit(False, f"批量填写完成，{len(failed)}/{len(self.results)} 个项目失败，请查看日志。")
+            else:
+                self.finished_signal.emit(True, f"批量填写完成，{summary}")
+        except Exception as e:
+            self.log_signal.emit(f"批量填写任务异常: {e}", True)
+            self.log_signal.emit(traceback.format_exc(), True)
+            self.finished_signal.emit(False, f"批量填写任务异常: {e}")
@@ -0,0 +1,259 @@
+# core/batch_consolidation.py - 多报告并行汇总
+#
+# 一次处理整个版本的多份报告：
+#   1. 任务来自清单文件 (manifest.json / manifest.csv) 或文件夹约定 (每个子文件夹一份报告)；
+#   2. 目标报告相同的任务会互相覆盖，整组拒绝；
+#   3. 工作簿写入分配给数量受限的写入进程，每个写入进程复用一个 Excel 会话 (或使用 openpyxl 引擎)，
+#      源文档由写入进程分块流式读取，主进程不持有数据行，内存占用不随批量大小增长；
+#   4. 返回每个任务的结果汇总。
+#
+# 命令行用法 (可在没有 Excel 的 Linux 构建机上配合 openpyxl 引擎运行):
+#   python -m core.batch_consolidation <文件夹或清单> --engine openpyxl --writers 4
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import util as mp_util
+
+from core.excel_utils import consolidate_excel_data_and_insert_chart
+from core.profiling import profile_run
+from config.settings import (
+    CONSOLIDATION_ENGINE_DEFAULT, CONSOLIDATION_WRITE_MODE_DEFAULT, BATCH_MANIFEST_NAMES, BATCH_FILE_KEYWORDS
+)
+
+JOB_FIELDS = ['doc1_path', 'doc2_path', 'doc3_path', 'doc4_path', 'target_report_path']
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+
+def load_jobs_from_manifest(manifest_path):
+    """
+    从清单读取任务。JSON 清单为任务字典列表；CSV 清单的列名为 JOB_FIELDS。
+    相对路径以清单所在目录为基准。
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    if manifest_path.lower().endswith('.json'):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    else:
+        with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+            entries = list(csv.DictReader(f))
+
+    jobs = []
+    for entry in entries:
+        job = {}
+        for field in JOB_FIELDS:
+            value = (entry.get(field) or '').strip()
+            if value and not os.path.isabs(value):
+                value = os.path.join(base_dir, value)
+            job[field] = value
+        if job['target_report_path']:
+            jobs.append(job)
+    return jobs
+
+
+def _match_folder(folder):
+    """按文件名关键字在单个文件夹中识别一份报告的源文档和目标报告"""
+    job = {field: '' for field in JOB_FIELDS}
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not os.path.isfile(path) or name.startswith('~$'):
+            continue
+        lower = name.lower()
+        if lower.endswith(IMAGE_EXTENSIONS):
+            job['doc4_path'] = job['doc4_path'] or path
+            continue
+        if not lower.endswith(('.xlsx', '.xlsm')):
+            continue
+        for field, keywords in BATCH_FILE_KEYWORDS.items():
+            if not job[field] and any(keyword.lower() in lower for keyword in keywords):
+                job[field] = path
+                break
+    return job if job['target_report_path'] else None
+
+
+def discover_jobs(folder):
+    """
+    文件夹约定：folder 下每个子文件夹为一份报告 (也可以直接是单份报告的文件夹)，
+    文件名包含 BATCH_FILE_KEYWORDS 中的关键字即视为对应文档，图片文件作为设备外观图。
+    文件夹中存在清单文件时优先使用清单。
+    """
+    for manifest_name in BATCH_MANIFEST_NAMES:
+        manifest_path = os.path.join(folder, manifest_name)
+        if os.path.exists(manifest_path):
+            return load_jobs_from_manifest(manifest_path)
+
+    jobs = []
+    job = _match_folder(folder)
+    if job:
+        jobs.append(job)
+    for name in sorted(os.listdir(folder)):
+        sub_folder = os.path.join(folder, name)
+        if os.path.isdir(sub_folder):
+            job = _match_folder(sub_folder)
+            if job:
+                jobs.append(job)
+    return jobs
+
+
+def duplicate_targets(jobs):
+    """返回被多个任务使用的目标报告 (规范化路径) 集合；这些任务并行写入同一工作簿会互相覆盖"""
+    seen = set()
+    duplicates = set()
+    for job in jobs:
+        target = os.path.normcase(os.path.abspath(job['target_report_path']))
+        if target in seen:
+            duplicates.add(target)
+        seen.add(target)
+    return duplicates
+
+
+# --- 写入进程 ---
+_writer_engine = None
+_writer_write_mode = CONSOLIDATION_WRITE_MODE_DEFAULT
+_writer_session = None
+
+
+def _init_writer(engine, write_mode=CONSOLIDATION_WRITE_MODE_DEFAULT):
+    global _writer_engine, _writer_write_mode
+    _writer_engine = engine
+    _writer_write_mode = write_mode
+
+
+def _close_writer_session():
+    global _writer_session
+    if _writer_session is not None:
+        _writer_session.close()
+        _writer_session = None
+
+
+def _write_job(job):
+    """写入进程：处理一份报告。xlwings 引擎下同一进程内的任务复用一个 Excel 会话。"""
+    global _writer_session
+    logs = []
+    log_callback = lambda msg, is_err=False: logs.append((msg, is_err))
+    start_time = time.time()
+    try:
+        if _writer_engine == "xlwings":
+            if _writer_session is None:
+                from core.excel_session import ExcelSession
+                _writer_session = ExcelSession(write_mode=_writer_write_mode)
+                # 进程退出时恢复 Excel 设置并退出 Excel
+                mp_util.Finalize(None, _close_writer_session, exitpriority=10)
+            _writer_session.log_callback = log_callback
+            success = _writer_session.run_job(job)
+        else:
+            success = consolidate_excel_data_and_insert_chart(
+                job['doc1_path'], job['doc2_path'], job['doc3_path'], job['doc4_path'],
+                job['target_report_path'], log_callback=log_callback, engine=_writer_engine,
+                write_mode=_writer_write_mode
+            )
+    except Exception as e:
+        logs.append((f"Excel 处理任务异常: {e}", True))
+        logs.append((traceback.format_exc(), True))
+        success = False
+    return {
+        'target_report_path': job['target_report_path'],
+        'success': success,
+        'elapsed': round(time.time() - start_time, 2),
+        'logs': logs,
+    }
+
+
+def _failed_result(job, message):
+    return {'target_report_path': job['target_report_path'], 'success': False, 'elapsed': 0,
+            'logs': [(message, True)]}
+
+
+def run_batch(jobs, engine=CONSOLIDATION_ENGINE_DEFAULT, max_writers=2,
+              log_callback=None, on_result=None, write_mode=CONSOLIDATION_WRITE_MODE_DEFAULT):
+    """
+    并行处理多个汇总任务，返回按任务顺序排列的结果列表。
+    max_writers 限制同时写入工作簿的进程数 (xlwings 引擎下即同时运行的 Excel 实例数)。
+    目标报告相同的任务全部判为失败，不会执行。on_result(index, result) 在每个任务完成时调用。
+    """
+    def log(message, is_error=False):
+        if log_callback:
+            log_callback(message, is_error)
+
+    def report(index, result):
+        log(f"\n=== {os.path.basename(result['target_report_path'])} ===", False)
+        for message, is_error in result.pop('logs'):
+            log(message, is_error)
+        results[index] = result
+        if on_result:
+            on_result(index, result)
+
+    results = [None] * len(jobs)
+    duplicates = duplicate_targets(jobs)
+    runnable = []
+    for index, job in enumerate(jobs):
+        if os.path.normcase(os.path.abspath(job['target_report_path'])) in duplicates:
+            report(index, _failed_result(job, "错误: 多个任务使用同一份目标报告，并行写入会互相覆盖，"
+                                              "请检查清单后重新运行这些任务。"))
+        else:
+            runnable.append(index)
+    if duplicates:
+        log(f"警告: {len(duplicates)} 份目标报告被多个任务使用，已跳过相关任务。", True)
+    if not runnable:
+        return results
+
+    max_writers = max(1, min(max_writers, len(runnable)))
+    log(f"使用 {max_writers} 个写入进程 (引擎: {engine}) 处理 {len(runnable)} 份报告...", False)
+    with ProcessPoolExecutor(max_workers=max_writers, initializer=_init_writer,
+                             initargs=(engine, write_mode)) as pool:
+        futures = {pool.submit(_write_job, jobs[index]): index for index in runnable}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # 写入进程意外退出 (例如 Excel 崩溃导致进程终止)
+                result = _failed_result(jobs[index], f"写入进程异常: {e}")
+            report(index, result)
+    return results
+
+
+def format_summary(results):
+    """生成任务结果汇总文本"""
+    lines = ["报告 | 结果 | 耗时(秒)"]
+    for result in results:
+        lines.append(f"{os.path.basename(result['target_report_path'])} | "
+                     f"{'成功' if result['success'] else '失败'} | {result['elapsed']}")
+    succeeded = sum(1 for result in results if result['success'])
+    lines.append(f"共 {len(results)} 份报告，成功 {succeeded}，失败 {len(results) - succeeded}。")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量汇总禅道导出数据到验收报告")
+    parser.add_argument("source", help="任务文件夹或清单文件 (.json/.csv)")
+    parser.add_argument("--engine", default=CONSOLIDATION_ENGINE_DEFAULT, choices=["xlwings", "openpyxl"])
+    parser.add_argument("--writers", type=int, default=2, help="并行写入进程数")
+    parser.add_argument("--write-mode", default=CONSOLIDATION_WRITE_MODE_DEFAULT, choices=["replace", "diff"])
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="记录性能分析 (见 core.profiling，默认按环境变量或设置决定)")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.source):
+        jobs = discover_jobs(args.source)
+    else:
+        jobs = load_jobs_from_manifest(args.source)
+    if not jobs:
+        print("未找到任何汇总任务。", file=sys.stderr)
+        return 1
+
+    log_callback = lambda msg, is_err=False: print(msg, file=sys.stderr if is_err else sys.stdout)
+    with profile_run("batch_consolidation", enabled=args.profile, log_callback=log_callback):
+        results = run_batch(jobs, engine=args.engine, max_writers=args.writers, write_mode=args.write_mode,
+                            log_callback=log_callback)
+    print(format_summary(results))
+    return 0 if all(result['success'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+# core/bug_detail.py - BUG 详情的获取、解析和本地缓存
+#
+# 获取方式 (在已登录的浏览器会话中):
+#   1. JSON 接口 bug-view-<id>.json - 在页面内用 fetch 并发请求一批 BUG，不渲染页面
+#   2. 详情页 bug-view-<id>.html    - JSON 不可用时逐个打开页面，一次脚本调用取出所需内容
+# 详情按 BUG ID 缓存在 CACHE_DIR/bug_details 中，在 TTL 内视为新鲜；过期的缓存先显示，再在后台重新获取。
+# (BUG 列表中没有最后编辑时间，无法据此提前判断缓存失效。)
+
+import os
+import re
+import json
+import time
+import pickle
+import html as html_lib
+
+from core.file_utils import atomic_write_bytes
+from config.settings import CACHE_DIR, BUG_DETAIL_CACHE_TTL, BUG_DETAIL_CACHE_MAX_ENTRIES
+
+DETAIL_CACHE_DIR = os.path.join(CACHE_DIR, "bug_details")
+# 详情格式变化时递增，使旧的缓存失效
+CACHE_VERSION = 1
+
+# 并发请求一批 JSON 详情；返回与 ids 对应的 [HTTP 状态码, 响应文本] 列表 (网络错误为 [0, null])
+_FETCH_JSON_SCRIPT = """
+var ids = arguments[0], base = arguments[1], done = arguments[arguments.length - 1];
+Promise.all(ids.map(function (id) {
+    return fetch(base + '/bug-view-' + id + '.json', {credentials: 'same-origin'})
+        .then(function (r) { return r.text().then(function (t) { return [r.status, t]; }); })
+        .catch(function () { return [0, null]; });
+})).then(done);
+"""
+
+# 这些状态码说明服务器没有 JSON 视图 (而不是临时故障)
+_JSON_UNSUPPORTED_STATUSES = (404, 405, 501)
+
+# 从详情页取出各部分内容 (兼容禅道新旧版本的页面结构)
+_EXTRACT_PAGE_SCRIPT = """
+function text(sel) { var e = document.querySelector(sel); return e ? e.textContent.trim() : ''; }
+var steps = document.querySelector('.detail-content.article-content, #stepsBox, .steps-content');
+var files = Array.from(document.querySelectorAll('.files-list a[href*="file-"], .file-list a[href*="file-"]'))
+    .map(function (a) { return [a.textContent.trim(), a.href]; });
+var history = Array.from(document.querySelectorAll('#actionbox li, .histories-list > li'))
+    .map(function (li) {
+        var comment = li.querySelector('.comment-content, .article-content');
+        return [li.firstChild ? li.firstChild.textContent.trim() : li.textContent.trim(),
+                comment ? comment.textContent.trim() : ''];
+    });
+var fields = {};
+document.querySelectorAll('.detail table tr, #legendBasicInfo tr').forEach(function (tr) {
+    var th = tr.querySelector('th'), td = tr.querySelector('td');
+    if (th && td) { fields[th.textContent.trim()] = td.textContent.trim(); }
+});
+return {title: text('.page-title .text, #mainMenu .page-title'), steps: steps ? steps.innerHTML : '',
+        files: files, history: history, fields: fields};
+"""
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_BR_RE = re.compile(r'<\s*(br|/p|/div|/li)\s*/?>', re.IGNORECASE)
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def html_to_text(value):
+    """把重现步骤等富文本转为纯文本 (用于搜索和无法显示 HTML 的场合)"""
+    text = _TAG_RE.sub('', _BR_RE.sub('\n', value or ''))
+    lines = [line.strip() for line in html_lib.unescape(text).splitlines()]
+    return '\n'.join(line for line in lines if line)
+
+
+def _user(users, account):
+    return users.get(account) or account or ''
+
+
+def parse_detail_json(text, base_url):
+    """解析 bug-view-<id>.json 的响应；不是有效的详情 (未登录、无权限、接口不存在) 时返回 None"""
+    if not text:
+        return None
+    try:
+        outer = json.loads(text)
+        if outer.get('status') != 'success':
+            return None
+        data = outer.get('data')
+        if isinstance(data, str):
+            data = json.loads(data)
+    except (ValueError, AttributeError):
+        return None
+    bug = (data or {}).get('bug')
+    if not isinstance(bug, dict) or not bug.get('id'):
+        return None
+    users = data.get('users') or {}
+    if not isinstance(users, dict):
+        users = {}
+
+    history = []
+    actions = data.get('actions') or {}
+    for action in (actions.values() if isinstance(actions, dict) else actions):
+        changes = [(change.get('field', ''), _text(change.get('old')), _text(change.get('new')))
+                   for change in action.get('history') or []]
+        history.append({
+            'date': _text(action.get('date')),
+            'actor': _user(users, action.get('actor')),
+            'action': _text(action.get('action')),
+            'comment': html_to_text(action.get('comment')),
+            'changes': changes,
+        })
+    history.sort(key=lambda item: item['date'])
+
+    files = []
+    bug_files = bug.get('files') or {}
+    for file in (bug_files.values() if isinstance(bug_files, dict) else bug_files):
+        file_id = file.get('id')
+        files.append({
+            'title': _text(file.get('title')),
+            'size': int(file.get('size') or 0),
+            'url': f"{base_url}/file-download-{file_id}.html" if file_id else '',
+        })
+
+    return {
+        'id': str(bug.get('id')),
+        'title': _text(bug.get('title')),
+        'status': _text(bug.get('status')),
+        'severity': _text(bug.get('severity')),
+        'pri': _text(bug.get('pri')),
+        'opened_by': _user(users, bug.get('openedBy')),
+        'opened_date': _text(bug.get('openedDate')),
+        'assigned_to': _user(users, bug.get('assignedTo')),
+        'resolution': _text(bug.get('resolution')),
+        'last_edited_date': _text(bug.get('lastEditedDate')),
+        'steps_html': bug.get('steps') or '',
+        'history': history,
+        'files': files,
+        'source': 'json',
+    }
+
+
+def _is_json(text):
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def json_view_unsupported(status, text):
+    """
+    响应是否说明 JSON 接口本身不可用 (旧版本禅道或已关闭 JSON 视图)：接口不存在，或成功响应不是 JSON (返回了普通页面)。
+    网络错误、服务器错误以及 JSON 格式的失败响应 (未登录、无权限) 都不算。
+    """
+    if status in _JSON_UNSUPPORTED_STATUSES:
+        return True
+    return 200 <= status < 300 and bool(text) and not _is_json(text)
+
+
+def fetch_details_json(driver, base_url, bug_ids):
+    """
+    在浏览器中并发请求一批详情，返回 ({BUG ID: 详情}, 接口是否不可用)；未能获取的 ID 不在结果中。
+    只有每个响应都说明接口不可用时才返回 True，临时故障或无权查看的 BUG 不影响之后的批次。
+    """
+    responses = driver.execute_async_script(_FETCH_JSON_SCRIPT, list(bug_ids), base_url) or []
+    details = {}
+    for bug_id, (status, text) in zip(bug_ids, responses):
+        detail = parse_detail_json(text, base_url)
+        if detail:
+            details[bug_id] = detail
+    unsupported = bool(responses) and not details and all(json_view_unsupported(status, text)
+                                                          for status, text in responses)
+    return details, unsupported
+
+
+def fetch_detail_page(driver, base_url, bug_id):
+    """JSON 接口不可用时，打开详情页并提取内容"""
+    driver.get(f"{base_url}/bug-view-{bug_id}.html")
+    page = driver.execute_script(_EXTRACT_PAGE_SCRIPT) or {}
+    fields = page.get('fields') or {}
+    history = []
+    for line, comment in page.get('history') or []:
+        # 形如 "2025-07-14 10:20:00, 由 张三 创建。"
+        match = re.match(r'(\d{4}-\d{2}-\d{2}[\d: ]*)[,，]?\s*(.*)', line)
+        date, action = (match.group(1).strip(), match.group(2)) if match else ('', line)
+        history.append({'date': date, 'actor': '', 'action': action, 'comment': comment, 'changes': []})
+    return {
+        'id': str(bug_id),
+        'title': page.get('title') or '',
+        'status': fields.get('Bug状态', ''),
+        'severity': fields.get('严重程度', ''),
+        'pri': fields.get('优先级', ''),
+        'opened_by': fields.get('由谁创建', ''),
+        'opened_date': '',
+        'assigned_to': fields.get('当前指派', ''),
+        'resolution': fields.get('解决方案', ''),
+        'last_edited_date': history[-1]['date'] if history else '',
+        'steps_html': page.get('steps') or '',
+        'history': history,
+        'files': [{'title': title, 'size': 0, 'url': url} for title, url in page.get('files') or []],
+        'source': 'html',
+    }
+
+
+class CachedDetail:
+    def __init__(self, detail, fetched, ttl):
+        self.detail = detail
+        self.fetched = fetched
+        self.ttl = ttl
+
+    @property
+    def is_fresh(self):
+        return time.time() - self.fetched < self.ttl
+
+
+class BugDetailCache:
+    """每个 BUG 一个缓存文件；超出条目数上限时删除最久未使用的条目"""
+
+    def __init__(self, cache_dir=DETAIL_CACHE_DIR, ttl=BUG_DETAIL_CACHE_TTL, max_entries=BUG_DETAIL_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._puts = 0
+
+    def _path(self, bug_id):
+        return os.path.join(self.cache_dir, f"{re.sub(r'[^0-9A-Za-z_-]', '_', str(bug_id))}.pkl")
+
+    def get(self, bug_id):
+        """返回 CachedDetail，没有缓存时返回 None"""
+        path = self._path(bug_id)
+        try:
+            with open(path, 'rb') as f:
+                version, stored_id, fetched, detail = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+        if version != CACHE_VERSION or stored_id != str(bug_id):
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # 记录最近使用时间，供 LRU 淘汰
+        except OSError:
+            pass
+        return CachedDetail(detail, fetched, self.ttl)
+
+    def put(self, detail):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data = pickle.dumps((CACHE_VERSION, detail['id'], time.time(), detail), protocol=pickle.HIGHEST_PROTOCOL)
+            atomic_write_bytes(self._path(detail['id']), data)
+            self._puts += 1
+            if self._puts % 50 == 0:  # 批量预取时不必每次都扫描目录
+                self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.stat(path).st_mtime, path))
+                except OSError:
+                    continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,123 @@
+# core/bug_detail_worker.py
+from PyQt5.QtCore import QThread, pyqtSignal
+import threading
+import traceback
+from collections import OrderedDict
+
+from core.session_broker import SESSION_BROKER
+from core.bug_detail import fetch_details_json, fetch_detail_page
+from config.settings import ZEN_TAO_BASE_URL, BUG_DETAIL_BATCH_SIZE
+
+
+class BugDetailWorker(QThread):
+    """
+    常驻的 BUG 详情获取线程：用户打开的详情优先，剩余名额用于预取选中行附近的 BUG，
+    每批在管理员会话中并发请求，结果写入缓存后逐条发出。
+    """
+    log_signal = pyqtSignal(str, bool)
+    detail_signal = pyqtSignal(str, dict)  # bug_id, detail
+    failed_signal = pyqtSignal(str, str)  # bug_id, message (只针对用户打开的详情)
+
+    def __init__(self, manager_account, manager_password, cache, batch_size=BUG_DETAIL_BATCH_SIZE):
+        super().__init__()
+        self.base_url = ZEN_TAO_BASE_URL
+        self.manager_account = manager_account
+        self.manager_password = manager_password
+        self.cache = cache
+        self.batch_size = batch_size
+        self._condition = threading.Condition()
+        self._wanted = OrderedDict()  # 用户打开的详情，按请求顺序
+        self._prefetch = []
+        self._stopped = False
+        self._json_available = True
+
+    def request(self, bug_id):
+        with self._condition:
+            self._wanted[bug_id] = None
+            self._condition.notify()
+
+    def prefetch(self, bug_ids):
+        """替换待预取的列表 (选中行变化后，之前未处理的预取不再需要)"""
+        with self._condition:
+            self._prefetch = [bug_id for bug_id in bug_ids if bug_id not in self._wanted]
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._stopped and not self._wanted and not self._prefetch:
+                self._condition.wait()
+            if self._stopped:
+                return None, None
+            wanted = []
+            while self._wanted and len(wanted) < self.batch_size:
+                wanted.append(self._wanted.popitem(last=False)[0])
+            room = self.batch_size - len(wanted)
+            prefetch = [bug_id for bug_id in self._prefetch[:room] if bug_id not in wanted]
+            self._prefetch = self._prefetch[room:]
+        # 排队期间可能已被缓存
+        prefetch = [bug_id for bug_id in prefetch if not self._cached_fresh(bug_id)]
+        if not self._json_available:
+            prefetch = []  # 逐页打开太慢，且会长时间占用会话，不预取
+        return wanted, prefetch
+
+    def _cached_fresh(self, bug_id):
+        cached = self.cache.get(bug_id)
+        return cached is not None and cached.is_fresh
+
+    def run(self):
+        while True:
+            wanted, prefetch = self._next_batch()
+            if wanted is None:
+                break
+            bug_ids = wanted + prefetch
+            if not bug_ids:
+                continue
+            try:
+                with SESSION_BROKER.session(self.manager_account, self.manager_password, headless=True,
+                                            base_url=self.base_url,
+                                            log_callback=lambda msg, is_err=False: self.log_signal.emit(msg, is_err)
+                                            ) as session:
+                    details = self._fetch(session.driver, bug_ids, wanted)
+            except Exception as e:
+                self.log_signal.emit(f"获取BUG详情失败: {e}", True)
+                for bug_id in wanted:
+                    self.failed_signal.emit(bug_id, str(e))
+                continue
+
+            for bug_id in bug_ids:
+                detail = details.get(bug_id)
+                if detail:
+                    self.cache.put(detail)
+                    self.detail_signal.emit(bug_id, detail)
+                elif bug_id in wanted:
+                    self.failed_signal.emit(bug_id, "未能获取详情，BUG 可能不存在或管理员账号无权查看。")
+            if prefetch:
+                self.log_signal.emit(f"  已预取 {len([i for i in prefetch if i in details])} 条BUG详情", False)
+
+    def _fetch(self, driver, bug_ids, wanted):
+        details = {}
+        if self._json_available:
+            if not (driver.current_url or '').startswith(self.base_url):
+                driver.get(f"{self.base_url}/misc-ping.html")  # fetch 需要在禅道页面中执行才会带上会话
+            driver.set_script_timeout(30)
+            details, unsupported = fetch_details_json(driver, self.base_url, bug_ids)
+            if unsupported:
+                # 接口不存在或返回的不是 JSON (旧版本禅道或已关闭 JSON 视图)，之后改为读取详情页；
+                # 网络错误或无权查看导致的整批失败只影响本批，下一批仍使用 JSON 接口
+                self._json_available = False
+                self.log_signal.emit("BUG详情 JSON 接口不可用，改为读取详情页。", False)
+        for bug_id in wanted:
+            if bug_id not in details:
+                try:
+                    detail = fetch_detail_page(driver, self.base_url, bug_id)
+                    if detail['title'] or detail['steps_html']:  # 否则是错误页或无权限页
+                        details[bug_id] = detail
+                except Exception as e:
+                    self.log_signal.emit(f"读取BUG {bug_id} 详情页失败: {e}", True)
+                    self.log_signal.emit(traceback.format_exc(), True)
+        return details
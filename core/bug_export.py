@@ -0,0 +1,92 @@
+# core/bug_export.py - BUG 查询结果流式导出
+#
+# 逐行写出数据源中的 BUG，不先构造 DataFrame：
+#   .xlsx 使用 openpyxl 的 write_only 模式，每行写入后即序列化到临时文件，内存占用与行数无关；
+#   .csv  直接用 csv 模块逐行写入 (utf-8-sig，Excel 可直接打开)，速度最快。
+# 输出先写到同目录的临时文件，完成后原子替换目标文件 (见 core.file_utils)。
+
+import csv
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from core.file_utils import atomic_write_path
+
+BUG_EXPORT_SHEET = 'BUG查询结果'
+QUERY_INFO_SHEET = '查询信息'
+# (导出列名, BUG 字典中的键)
+BUG_EXPORT_COLUMNS = [
+    ('BUG ID', 'id'),
+    ('标题', 'title'),
+    ('状态', 'status'),
+    ('创建人', 'opened_by'),
+    ('创建时间', 'opened_date'),
+    ('严重程度', 'severity'),
+    ('指派给', 'assigned_to'),
+]
+# 每写入这么多行报告一次进度
+PROGRESS_EVERY_ROWS = 2000
+
+
+def bug_rows(bugs):
+    """把 BUG 字典逐个转换为导出行 (生成器，不复制整个数据源)"""
+    keys = [key for _, key in BUG_EXPORT_COLUMNS]
+    for bug in bugs:
+        yield [bug.get(key, '') for key in keys]
+
+
+def _xlsx_value(value):
+    # xlsx 不允许控制字符，openpyxl 遇到时会抛出 IllegalCharacterError
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    return value
+
+
+def _write_xlsx(path, rows, query_info, report):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(BUG_EXPORT_SHEET)
+    ws.append([name for name, _ in BUG_EXPORT_COLUMNS])
+    for row in rows:
+        ws.append([_xlsx_value(value) for value in row])
+        report()
+    if query_info:
+        info_ws = wb.create_sheet(QUERY_INFO_SHEET)
+        info_ws.append(list(query_info))
+        info_ws.append([_xlsx_value(value) for value in query_info.values()])
+    wb.save(path)
+
+
+def _write_csv(path, rows, report):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in BUG_EXPORT_COLUMNS])
+        for row in rows:
+            writer.writerow(row)
+            report()
+
+
+def export_bugs(path, bugs, query_info=None, progress_callback=None, total=None):
+    """
+    把 bugs (BUG 字典的任意可迭代对象) 导出到 path，按扩展名选择 .csv 或 .xlsx。
+    query_info ({字段: 值}) 写入 xlsx 的“查询信息”工作表，csv 格式不包含。
+    progress_callback(已写入行数, 总行数) 每 PROGRESS_EVERY_ROWS 行及结束时调用；
+    total 未指定时取 len(bugs) (不支持 len 时为 None)。返回写入的行数。
+    """
+    if total is None and hasattr(bugs, '__len__'):
+        total = len(bugs)
+    written = 0
+
+    def report():
+        nonlocal written
+        written += 1
+        if progress_callback and written % PROGRESS_EVERY_ROWS == 0:
+            progress_callback(written, total)
+
+    with atomic_write_path(path) as tmp_path:
+        if path.lower().endswith('.csv'):
+            _write_csv(tmp_path, bug_rows(bugs), report)
+        else:
+            _write_xlsx(tmp_path, bug_rows(bugs), query_info, report)
+    if progress_callback:
+        progress_callback(written, total)
+    return written
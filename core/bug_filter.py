@@ -0,0 +1,182 @@
+# core/bug_filter.py - 已加载 BUG 的本地筛选、排序和搜索
+#
+# 查询结果加载后一次性建立索引，之后修改筛选条件不再访问禅道：
+#   状态 / 严重程度 / 指派人 - 类别编号及每个类别的行号列表
+#   创建日期                 - 按日期排序的行号数组，日期范围用二分查找截取
+#   标题                     - 规范化后的小写文本；新关键词包含上一次的关键词时只在上次的结果中查找
+# 排序时每列预先计算各行的名次，对任意子集排序只需比较整数。
+
+import re
+import bisect
+import unicodedata
+from array import array
+from collections import OrderedDict
+from datetime import date
+
+CATEGORICAL_KEYS = ('status', 'severity', 'assigned_to')
+DATE_KEY = 'opened_date'
+TITLE_KEY = 'title'
+# 保留最近若干个标题搜索结果，删除字符时可直接复用
+_TEXT_CACHE_SIZE = 32
+
+_FULL_DATE_RE = re.compile(r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})')
+_SHORT_DATE_RE = re.compile(r'^(\d{1,2})[-/](\d{1,2})(?:\s|$)')
+_NUMBER_RE = re.compile(r'^\d+(\.\d+)?$')
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def normalize_title(text):
+    return unicodedata.normalize('NFKC', _text(text)).lower()
+
+
+def date_key(text, year=None):
+    """把列表中的日期 ('2025-07-14 10:20' 或省略年份的 '07-14 10:20') 规范为 'YYYY-MM-DD'，无法识别时为 ''"""
+    text = _text(text)
+    if len(text) >= 10 and text[4] == '-' and text[7] == '-' and text[:4].isdigit():
+        return text[:10]  # 常见的完整格式，不经过正则
+    match = _FULL_DATE_RE.search(text)
+    if match:
+        y, m, d = match.groups()
+    else:
+        match = _SHORT_DATE_RE.match(text)
+        if not match:
+            return ''
+        y = year or date.today().year
+        m, d = match.groups()
+    return f"{int(y):04d}-{int(m):02d}-{int(d):02d}"
+
+
+def _sort_value(text):
+    # 数字按数值排序，排在文本之前；空值排在最后
+    if not text:
+        return (2, 0, '')
+    if _NUMBER_RE.match(text):
+        return (0, float(text), text)
+    return (1, 0, text)
+
+
+class BugQueryIndex:
+    """BUG 列表 (字典列表) 的本地查询索引；行号即在原列表中的位置"""
+
+    def __init__(self, bugs):
+        self.row_count = len(bugs)
+        self._columns = {}  # 键 -> 每行的文本，按需生成
+        self._bugs = bugs
+
+        self.categories = {}  # 键 -> 排序后的类别值
+        self.codes = {}  # 键 -> 每行的类别编号
+        self._postings = {}  # 键 -> {类别值: 行号列表 (升序)}
+        for key in CATEGORICAL_KEYS:
+            values = self.column(key)
+            categories = sorted(set(values), key=_sort_value)
+            code_of = {value: code for code, value in enumerate(categories)}
+            codes = array('i', [code_of[value] for value in values])
+            postings = {value: [] for value in categories}
+            for row, value in enumerate(values):
+                postings[value].append(row)
+            self.categories[key] = categories
+            self.codes[key] = codes
+            self._postings[key] = postings
+
+        self.date_keys = [date_key(value) for value in self.column(DATE_KEY)]
+        self._date_order = sorted(range(self.row_count), key=self.date_keys.__getitem__)
+        self._sorted_dates = [self.date_keys[row] for row in self._date_order]
+
+        self._titles = None  # 第一次搜索标题时生成
+        self._text_cache = OrderedDict()  # 关键词 -> 行号列表 (升序)
+        self._ranks = {}  # 键 -> 每行的名次
+
+    def column(self, key):
+        values = self._columns.get(key)
+        if values is None:
+            values = [bug.get(key) for bug in self._bugs]
+            # 页面解析出的值大多已是去掉首尾空白的字符串
+            values = self._columns[key] = [value if value.__class__ is str else _text(value) for value in values]
+        return values
+
+    # --- 筛选 ---
+
+    def date_rows(self, date_from=None, date_to=None):
+        """创建日期在 [date_from, date_to] ('YYYY-MM-DD') 内的行号 (无法识别日期的行不包含在内)"""
+        lo = bisect.bisect_left(self._sorted_dates, date_from) if date_from else \
+            bisect.bisect_right(self._sorted_dates, '')
+        hi = bisect.bisect_right(self._sorted_dates, date_to) if date_to else len(self._sorted_dates)
+        return self._date_order[lo:hi]
+
+    def text_rows(self, text):
+        """标题包含 text (不区分大小写和全半角) 的行号"""
+        query = normalize_title(text)
+        if not query:
+            return None
+        rows = self._text_cache.get(query)
+        if rows is not None:
+            self._text_cache.move_to_end(query)
+            return rows
+        # 已缓存的关键词是新关键词的子串时，结果必然是其子集：选最小的一个作为候选
+        candidates = None
+        for cached_query, cached_rows in self._text_cache.items():
+            if cached_query in query and (candidates is None or len(cached_rows) < len(candidates)):
+                candidates = cached_rows
+        if self._titles is None:
+            self._titles = [normalize_title(title) for title in self.column(TITLE_KEY)]
+        titles = self._titles
+        if candidates is None:
+            rows = [row for row, title in enumerate(titles) if query in title]
+        else:
+            rows = [row for row in candidates if query in titles[row]]
+        self._text_cache[query] = rows
+        if len(self._text_cache) > _TEXT_CACHE_SIZE:
+            self._text_cache.popitem(last=False)
+        return rows
+
+    def filter(self, status=None, severity=None, assigned_to=None, date_from=None, date_to=None, text=None):
+        """返回满足全部条件的行号 (升序)；条件为 None 或空时不限制"""
+        row_lists = []
+        for key, value in (('status', status), ('severity', severity), ('assigned_to', assigned_to)):
+            if value is not None:
+                row_lists.append(self._postings[key].get(value, []))
+        if date_from or date_to:
+            row_lists.append(self.date_rows(date_from, date_to))
+        text_rows = self.text_rows(text) if text else None
+        if text_rows is not None:
+            row_lists.append(text_rows)
+        if not row_lists:
+            return list(range(self.row_count))
+
+        # 从最短的列表开始，依次与其他条件求交集
+        row_lists.sort(key=len)
+        rows = row_lists[0]
+        for other in row_lists[1:]:
+            if not rows:
+                break
+            other_set = set(other)
+            rows = [row for row in rows if row in other_set]
+        return sorted(rows)
+
+    # --- 排序 ---
+
+    def _rank(self, key):
+        rank = self._ranks.get(key)
+        if rank is None:
+            if key in self.codes:
+                rank = self.codes[key]  # 类别已按值排序，编号即名次
+            else:
+                if key == DATE_KEY:
+                    # 同一天内按原始文本 (含时间) 排序
+                    dates, raw = self.date_keys, self.column(key)
+                    order = sorted(range(self.row_count), key=lambda row: (dates[row], raw[row]))
+                else:
+                    sort_values = [_sort_value(value) for value in self.column(key)]
+                    order = sorted(range(self.row_count), key=sort_values.__getitem__)
+                rank = array('i', bytes(4 * self.row_count))
+                for position, row in enumerate(order):
+                    rank[row] = position
+            self._ranks[key] = rank
+        return rank
+
+    def sort_rows(self, rows, key, descending=False):
+        """按 key 列对行号列表排序 (稳定排序，值相同时保持原顺序)"""
+        return sorted(rows, key=self._rank(key).__getitem__, reverse=descending)
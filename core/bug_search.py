@@ -0,0 +1,144 @@
+# core/bug_search.py - 历史BUG查询条件下推到禅道
+#
+# 查询条件转换为禅道的高级搜索表单 (search-buildQuery)，由服务端按完整日期范围筛选，
+# 然后按 bySearch 方式分页浏览结果；每页只用一次脚本调用取回表格显示的列。
+# 搜索表单不可用时退回浏览全部 BUG，并在本地按同样的条件筛选。
+
+from urllib.parse import urlencode
+
+from core.bug_filter import date_key
+from config.settings import BUG_QUERY_PAGE_SIZE
+
+# 搜索表单分两组，每组 3 个条件
+SEARCH_FIELDS_PER_GROUP = 3
+SEARCH_MAX_CONDITIONS = SEARCH_FIELDS_PER_GROUP * 2
+
+# 列表中显示的状态文字 (本地筛选时使用)
+STATUS_LABELS = {
+    'active': ('active', '激活'),
+    'resolved': ('resolved', '已解决'),
+    'closed': ('closed', '已关闭'),
+}
+
+# 表格字段 -> 禅道列表中列的标识 (th 的 data-id 或 c-xxx 样式)；找不到表头时按旧版列表的位置取值
+DISPLAY_COLUMNS = [
+    ('id', 'id', 0),
+    ('title', 'title', 2),
+    ('status', 'status', 3),
+    ('opened_by', 'openedBy', 4),
+    ('opened_date', 'openedDate', 5),
+    ('severity', 'severity', 6),
+    ('assigned_to', 'assignedTo', 7),
+]
+
+# 在浏览器中提交搜索表单，返回 HTTP 状态码
+_POST_FORM_SCRIPT = """
+var url = arguments[0], body = arguments[1], done = arguments[arguments.length - 1];
+fetch(url, {method: 'POST', credentials: 'same-origin', body: body,
+            headers: {'Content-Type': 'application/x-www-form-urlencoded', 'X-Requested-With': 'XMLHttpRequest'}})
+    .then(function (r) { done(r.status); })
+    .catch(function () { done(0); });
+"""
+
+# 一次取回当前页所有行的指定列，以及分页信息中的记录总数
+_EXTRACT_ROWS_SCRIPT = """
+var columns = arguments[0];
+var table = document.querySelector('#bugList, table.datatable, .main-table table, table');
+if (!table) { return {rows: [], total: null}; }
+var positions = {};
+Array.from(table.querySelectorAll('thead th')).forEach(function (th, index) {
+    var key = th.getAttribute('data-id') || ((th.className.match(/\\bc-(\\w+)/) || [])[1]);
+    if (key && !(key in positions)) { positions[key] = index; }
+});
+var indexes = columns.map(function (c) { return c[0] in positions ? positions[c[0]] : c[1]; });
+var rows = [];
+table.querySelectorAll('tbody tr').forEach(function (tr) {
+    var cells = tr.children;
+    if (cells.length <= Math.max.apply(null, indexes)) { return; }
+    rows.push(indexes.map(function (i) {
+        var cell = cells[i], text = cell.textContent.trim();
+        if (!text) {  // 严重程度等列只显示图标，值在 title / data-* 属性中
+            var marked = cell.querySelector('[title], [data-severity]');
+            text = marked ? (marked.getAttribute('data-severity') || marked.getAttribute('title') || '') : '';
+        }
+        return text;
+    }));
+});
+var pager = document.querySelector('[data-rec-total]');
+return {rows: rows, total: pager ? parseInt(pager.getAttribute('data-rec-total'), 10) : null};
+"""
+
+
+def search_conditions(query_params):
+    """
+    把页面的查询参数转换为搜索条件 [(字段, 运算符, 值), ...]。
+    指定了状态时只按该状态查询；选择“全部”时根据“包含已解决/已关闭”排除相应状态。
+    """
+    conditions = []
+    status = query_params.get('status')
+    if status and status != 'all':
+        conditions.append(('status', '=', status))
+    else:
+        if not query_params.get('include_resolved', True):
+            conditions.append(('status', '!=', 'resolved'))
+        if not query_params.get('include_closed', True):
+            conditions.append(('status', '!=', 'closed'))
+    if query_params.get('severity'):
+        conditions.append(('severity', '=', str(query_params['severity'])))
+    if query_params.get('date_from'):
+        conditions.append(('openedDate', '>=', query_params['date_from']))
+    if query_params.get('date_to'):
+        conditions.append(('openedDate', '<=', query_params['date_to']))
+    return conditions
+
+
+def search_form_data(conditions, action_url):
+    """生成 search-buildQuery 的表单字段；条件依次填入两组，组内、组间均为“并且”"""
+    if len(conditions) > SEARCH_MAX_CONDITIONS:
+        raise ValueError(f"搜索条件过多 ({len(conditions)} 个)，禅道搜索表单最多支持 {SEARCH_MAX_CONDITIONS} 个")
+    form = {'module': 'bug', 'actionURL': action_url, 'groupAndOr': 'and', 'groupItems': SEARCH_FIELDS_PER_GROUP}
+    for number in range(1, SEARCH_MAX_CONDITIONS + 1):
+        field, operator, value = conditions[number - 1] if number <= len(conditions) else ('title', 'include', '')
+        form.update({f'andOr{number}': 'and', f'field{number}': field,
+                     f'operator{number}': operator, f'value{number}': value})
+    return form
+
+
+def browse_url(base_url, product_id, browse_type, page, page_size=BUG_QUERY_PAGE_SIZE):
+    """bug-browse 分页地址；bySearch 时使用刚提交的搜索条件 (myQueryID)"""
+    param = 'myQueryID' if browse_type == 'bySearch' else '0'
+    return f"{base_url}/bug-browse-{product_id or 0}-0-{browse_type}-{param}-id_desc-0-{page_size}-{page}.html"
+
+
+def post_search(driver, base_url, product_id, conditions):
+    """提交搜索表单，成功时返回 True"""
+    action_url = browse_url(base_url, product_id, 'bySearch', 1)
+    body = urlencode(search_form_data(conditions, action_url))
+    status = driver.execute_async_script(_POST_FORM_SCRIPT, f"{base_url}/search-buildQuery.html", body)
+    return status == 200
+
+
+def extract_rows(driver):
+    """返回 (当前页的 BUG 字典列表, 记录总数 或 None)"""
+    result = driver.execute_script(_EXTRACT_ROWS_SCRIPT, [[key, position] for _, key, position in DISPLAY_COLUMNS])
+    result = result or {}
+    keys = [name for name, _, _ in DISPLAY_COLUMNS]
+    bugs = [dict(zip(keys, row)) for row in result.get('rows') or [] if row and row[0]]
+    return bugs, result.get('total')
+
+
+def matches_locally(bug, conditions):
+    """搜索表单不可用时，在本地按同样的条件筛选浏览到的 BUG"""
+    for field, operator, value in conditions:
+        if field == 'openedDate':
+            opened = date_key(bug.get('opened_date'))
+            if not opened or not (opened >= value if operator == '>=' else opened <= value):
+                return False
+            continue
+        if field == 'status':
+            equal = bug.get('status', '') in STATUS_LABELS.get(value, (value,))
+        else:  # severity
+            equal = bug.get('severity', '').startswith(value)
+        if equal != (operator == '='):
+            return False
+    return True
@@ -0,0 +1,150 @@
+# core/excel_session.py - 可复用的 Excel 应用会话
+#
+# 批量生成报告时，所有汇总任务共用一个 Excel 实例，而不是每份报告都启动/退出一次 Excel。
+# 会话期间关闭屏幕刷新、事件和自动计算，结束后恢复原设置；Excel 崩溃时自动重启并重试当前任务。
+
+import os
+import traceback
+
+try:
+    import xlwings as xw
+except ImportError:
+    xw = None
+
+from core.excel_utils import _consolidate_with_xlwings
+from config.settings import CONSOLIDATION_WRITE_MODE_DEFAULT
+
+
+class ExcelSession:
+    """
+    在单个 Excel 实例中依次处理汇总任务。任务为字典:
+        {'doc1_path': ..., 'doc2_path': ..., 'doc3_path': ..., 'doc4_path': ..., 'target_report_path': ...}
+    用法:
+        with ExcelSession(log_callback) as session:
+            for job in jobs:
+                success = session.run_job(job)
+    """
+
+    def __init__(self, log_callback=None, max_restarts=3, write_mode=CONSOLIDATION_WRITE_MODE_DEFAULT):
+        self.log_callback = log_callback
+        self.write_mode = write_mode
+        self.max_restarts = max_restarts
+        self.app = None
+        self.restart_count = 0
+        self._saved_state = None
+
+    @staticmethod
+    def available():
+        return xw is not None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def _log(self, message, is_error=False):
+        if self.log_callback:
+            self.log_callback(message, is_error)
+
+    def start(self):
+        """启动 Excel 并切换到批处理模式"""
+        if xw is None:
+            raise RuntimeError("未安装 xlwings，无法启动 Excel 会话。")
+        if self.app is not None:
+            return
+        self.app = xw.App(visible=False, add_book=False)
+        # 部分 Excel 版本在没有打开工作簿时无法读取/设置 calculation，借助临时空白工作簿完成设置
+        placeholder = self.app.books.add()
+        self._apply_batch_mode()
+        placeholder.close()
+        self._log("Excel 会话已启动。", False)
+
+    def _apply_batch_mode(self):
+        """记录并关闭屏幕刷新、事件、提示框和自动计算"""
+        app = self.app
+        state = {}
+        for name, value in (('screen_updating', False), ('enable_events', False),
+                            ('display_alerts', False), ('calculation', 'manual')):
+            try:
+                state[name] = getattr(app, name)
+                setattr(app, name, value)
+            except Exception as e:
+                self._log(f"警告: 无法设置 Excel 属性 {name}: {e}", False)
+        self._saved_state = state
+
+    def _restore_state(self):
+        if not self.app or not self._saved_state:
+            return
+        for name, value in self._saved_state.items():
+            try:
+                setattr(self.app, name, value)
+            except Exception:
+                pass
+        self._saved_state = None
+
+    def is_alive(self):
+        """Excel 进程是否仍然响应"""
+        if self.app is None:
+            return False
+        try:
+            _ = self.app.books.count
+            return True
+        except Exception:
+            return False
+
+    def restart(self):
+        """Excel 崩溃或无响应时强制结束并重新启动"""
+        self.restart_count += 1
+        self._log(f"Excel 无响应，正在重启 (第 {self.restart_count} 次)...", True)
+        if self.app is not None:
+            try:
+                self.app.kill()
+            except Exception:
+                pass
+        self.app = None
+        self._saved_state = None
+        self.start()
+
+    def run_job(self, job):
+        """处理单个汇总任务；Excel 崩溃时重启后重试一次"""
+        self.start()
+
+        for attempt in range(2):
+            try:
+                success = _consolidate_with_xlwings(
+                    job.get('doc1_path'), job.get('doc2_path'), job.get('doc3_path'), job.get('doc4_path'),
+                    job.get('target_report_path'), log_callback=self.log_callback, app=self.app,
+                    write_mode=self.write_mode
+                )
+            except Exception as e:
+                self._log(f"Excel 任务异常: {e}", True)
+                self._log(traceback.format_exc(), True)
+                success = False
+            if success or self.is_alive():
+                return success
+            if self.restart_count >= self.max_restarts or attempt == 1:
+                break
+            self.restart()
+            self._log(f"重试任务: {os.path.basename(job.get('target_report_path') or '')}", False)
+        if not self.is_alive() and self.restart_count < self.max_restarts:
+            # 为后续任务准备好可用的 Excel
+            self.restart()
+        return False
+
+    def close(self):
+        """恢复 Excel 设置并退出"""
+        if self.app is None:
+            return
+        self._restore_state()
+        try:
+            self.app.quit()
+        except Exception:
+            try:
+                self.app.kill()
+            except Exception:
+                pass
+        self.app = None
+        self._log("xlwings 应用程序已关闭。", False)
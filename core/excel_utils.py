@@ -1,31 +1,47 @@
 import os
 import sys
+import time
+import itertools
+import traceback
 from openpyxl import load_workbook
-from openpyxl.utils import range_boundaries
-import xlwings as xw
-import pandas as pd
+
+try:
+    import xlwings as xw
+except ImportError:  # Linux 等没有 Excel 的环境只能使用 openpyxl 引擎
+    xw = None
+
+from config.settings import (
+    REPORT_SOURCE_SHEETS, REPORT_PICTURE_SHEET, REPORT_DATA_START_ROW, REPORT_PICTURE_SIZE_CM,
+    CONSOLIDATION_ENGINE_DEFAULT, CONSOLIDATION_WRITE_MODE_DEFAULT, CONSOLIDATION_CHUNK_ROWS, FUZZY_MATCH_TOP_K
+)
+from core.xlsx_readers import iter_rows, chunk_rows
+from core.sheet_diff import diff_write_chunks, format_diff_summary
+from core.image_pipeline import prepare_report_picture
+from core.ledger_index import get_ledger_index
+from core.template_layout import get_template_layout
+from core.file_utils import atomic_save_workbook
+from core.report_summary import SummarySources, add_report_summary, write_summary_xlwings
 
 
 
 
 def find_row_by_fuzzy_column_value(file_path, key_column, key_value, target_columns):
-    wb = load_workbook(file_path, data_only=True)
-    sheet = wb.active
+    """
+    Returns the target columns of the best-ranked ledger row whose key_column contains key_value, or None
+    (an exact or whole-model-number match beats a longer name that merely contains it, see core.fuzzy_match).
+    The ledger is parsed once and cached (see core.ledger_index) until the file changes.
+    """
+    return get_ledger_index(file_path).lookup(key_column, key_value, target_columns)
+
 
-    headers = [cell.value for cell in next(sheet.iter_rows(min_row=1, max_row=1))]
-    header_index = {header: idx for idx, header in enumerate(headers)}
+def find_rows_by_fuzzy_column_values(file_path, key_column, key_values, target_columns):
+    """Batch form of find_row_by_fuzzy_column_value: returns {key_value: row dict or None}."""
+    return get_ledger_index(file_path).lookup_many(key_column, key_values, target_columns)
 
-    if key_column not in header_index:
-        raise ValueError(f"找不到列标题: {key_column}")
-    for col in target_columns:
-        if col not in header_index:
-            raise ValueError(f"找不到目标列标题: {col}")
 
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        cell_value = str(row[header_index[key_column]])
-        if key_value in cell_value:
-            return {col: row[header_index[col]] for col in target_columns}
-    return None
+def search_ledger_candidates(file_path, key_column, key_value, target_columns, k=FUZZY_MATCH_TOP_K):
+    """Returns the top k ledger rows for key_value as [(FuzzyMatch, row dict), ...], best first."""
+    return get_ledger_index(file_path).search(key_column, key_value, target_columns, k=k)
 
 
 def write_to_target_sheet(file_path, sheet_name, cell_map, data_dict):
@@ -35,14 +51,16 @@ def write_to_target_sheet(file_path, sheet_name, cell_map, data_dict):
     sheet = wb[sheet_name]
     for key, cell in cell_map.items():
         sheet[cell] = data_dict.get(key, "")
-    wb.save(file_path)
+    atomic_save_workbook(wb, file_path)
 
 
 
-def fill_excel_template_acceptance(template_path: str, data: dict, field_mapping: dict, sheet_name: str, log_callback=None):
+def fill_excel_template_acceptance(template_path: str, data: dict, field_mapping: dict, sheet_name: str, log_callback=None,
+                                   progress_callback=None):
     """
     Fills an Excel template with user input data, handles merged cells.
     Used for the acceptance test filling page.
+    progress_callback(percent) is called after loading, writing and saving the workbook.
     """
     if not os.path.exists(template_path):
         if log_callback: log_callback(f"错误: Excel 模板文件未找到于 '{template_path}'", is_error=True)
@@ -52,7 +70,8 @@ def fill_excel_template_acceptance(template_path: str, data: dict, field_mapping
         return False
 
     try:
-        wb = load_workbook(template_path)
+        wb = load_workbook(template_path, keep_vba=template_path.lower().endswith(".xlsm"))
+        if progress_callback: progress_callback(40)
         if sheet_name in wb.sheetnames:
             ws = wb[sheet_name]
             if log_callback: log_callback(f"已成功加载工作表: '{sheet_name}'。")
@@ -63,14 +82,11 @@ def fill_excel_template_acceptance(template_path: str, data: dict, field_mapping
         if log_callback: log_callback(f"错误: 无法加载 Excel 工作簿或获取指定工作表 '{template_path}'。原因: {e}", is_error=True)
         return False
 
-    merged_cells_map = {}
-    for merged_range in ws.merged_cells.ranges:
-        min_col, min_row, max_col, max_row = range_boundaries(str(merged_range))
-        top_left_coord = ws.cell(row=min_row, column=min_col).coordinate
-        for row in range(min_row, max_row + 1):
-            for col in range(min_col, max_col + 1):
-                coord = ws.cell(row=row, column=col).coordinate
-                merged_cells_map[coord] = top_left_coord
+    # 合并单元格的解析结果按模板结构缓存，同一模板再次填写时不再分析 (见 core.template_layout)
+    layout = get_template_layout(template_path, wb,
+                                 targets={sheet_name: [config["excel_cell"] for config in field_mapping.values()]},
+                                 log_callback=log_callback)
+    resolved_cells = layout.resolve_mapping(sheet_name, field_mapping)
 
     output_file_name = "filled_" + os.path.basename(template_path)
     output_path = os.path.join(os.path.dirname(template_path), output_file_name)
@@ -83,7 +99,7 @@ def fill_excel_template_acceptance(template_path: str, data: dict, field_mapping
         value = data.get(field_name, "")
 
         if excel_cell_coord:
-            actual_cell_coord = merged_cells_map.get(excel_cell_coord, excel_cell_coord)
+            actual_cell_coord = resolved_cells[field_name]
             try:
                 if value:
                     ws[actual_cell_coord] = value
@@ -97,8 +113,10 @@ def fill_excel_template_acceptance(template_path: str, data: dict, field_mapping
             if log_callback: log_callback(f"  警告: 字段 '{field_name}' 在配置中未指定 Excel 单元格，跳过写入。", is_error=True)
             all_fields_processed_successfully = False
 
+    if progress_callback: progress_callback(60)
     try:
-        wb.save(output_path)
+        atomic_save_workbook(wb, output_path)
+        if progress_callback: progress_callback(100)
         if all_fields_processed_successfully:
             if log_callback: log_callback(f"\n--- 成功填充！文件保存为: '{output_path}' ---", is_error=False)
         else:
@@ -114,20 +132,123 @@ def fill_excel_template_acceptance(template_path: str, data: dict, field_mapping
 
 
 def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3_path: str, doc4_path: str,
-                                            target_report_path: str, log_callback=None):
+                                            target_report_path: str, log_callback=None,
+                                            engine: str = CONSOLIDATION_ENGINE_DEFAULT,
+                                            write_mode: str = CONSOLIDATION_WRITE_MODE_DEFAULT):
+    """
+    Copies three data tables (starting from the second row) to the third row of corresponding sheets
+    in the target report and inserts the device appearance image into the '设备外观图' sheet.
+    A summary sheet with bug, requirement-coverage and test-result statistics and native charts
+    is then generated from the same sources (see core.report_summary).
+    engine selects the implementation: 'xlwings' drives a local Microsoft Excel,
+    'openpyxl' edits the workbook in pure Python and does not need Excel.
+    write_mode 'replace' clears and rewrites every data row; 'diff' only writes rows that changed.
+    """
+    if engine == "openpyxl":
+        from core.openpyxl_engine import consolidate_with_openpyxl
+        return consolidate_with_openpyxl(doc1_path, doc2_path, doc3_path, doc4_path, target_report_path,
+                                         log_callback=log_callback,
+                                         write_mode=write_mode)
+    if engine != "xlwings":
+        if log_callback: log_callback(f"错误: 未知的汇总引擎 '{engine}'。", True)
+        return False
+    if xw is None:
+        if log_callback: log_callback("错误: 未安装 xlwings，无法使用 Excel 引擎，请改用 openpyxl 引擎。", True)
+        return False
+    return _consolidate_with_xlwings(doc1_path, doc2_path, doc3_path, doc4_path, target_report_path, log_callback,
+                                     write_mode=write_mode)
+
+
+def open_source_chunks(src_path: str, log_callback=None, chunk_size=CONSOLIDATION_CHUNK_ROWS,
+                       backend=None, summary_sources=None):
+    """
+    Returns an iterator over the data rows of a ZenTao export in blocks of at most chunk_size rows,
+    streamed from a streaming reader backend (iterparse or openpyxl, see core.xlsx_readers.chunk_rows)
+    so memory does not grow with the file size.
+    The first block is read eagerly so unreadable files are reported before the target sheet is touched.
+    If summary_sources (see core.report_summary.SummarySources) is given, the summary columns are
+    collected from the blocks as they are written, so the summary sheet does not parse the file again.
+    Returns None if the file cannot be read.
+    """
+    try:
+        rows = iter_rows(src_path, skip_rows=0, backend=backend, streaming=True)
+        header_row = next(rows, None)  # Header row of the ZenTao export, not written to the report
+        chunks = chunk_rows(rows, chunk_size)
+        first_chunk = next(chunks, None)
+    except Exception as e:
+        if log_callback: log_callback(f"错误: 读取源文件 '{os.path.basename(src_path)}' 失败。原因: {e}", True)
+        if log_callback: log_callback(traceback.format_exc(), True)
+        return None
+    if first_chunk is None:
+        if log_callback: log_callback(f"警告：源文件 '{os.path.basename(src_path)}' 为空或无数据。", False)
+        chunks = iter(())
+    else:
+        chunks = itertools.chain([first_chunk], chunks)
+    if summary_sources is not None:
+        chunks = summary_sources.watch(src_path, header_row, chunks)
+    return chunks
+
+
+def write_progress_logger(sheet_name: str, log_callback=None):
+    """Returns a progress(rows_done) callback that logs the write rate after each block."""
+    start_time = time.perf_counter()
+
+    def progress(rows_done):
+        elapsed = time.perf_counter() - start_time
+        rate = rows_done / elapsed if elapsed > 0 else 0
+        if log_callback: log_callback(f"  '{sheet_name}' 已写入 {rows_done} 行 ({rate:,.0f} 行/秒)", False)
+    return progress
+
+
+def _write_chunks_xlwings(sht, chunks, start_row, sheet_name, log_callback=None):
+    """Writes each block with one COM call; returns the number of rows written."""
+    progress = write_progress_logger(sheet_name, log_callback)
+    offset = 0
+    for chunk in chunks:
+        sht.range((start_row + offset, 1)).value = chunk
+        offset += len(chunk)
+        progress(offset)
+    return offset
+
+
+def _diff_write_xlwings(sht, chunks, start_row, last_row, last_col, sheet_name, log_callback=None):
+    """Compares each block with the rows currently in the sheet and writes only the changed rows."""
+    def read_old(offset, count, width):
+        first = start_row + offset
+        return sht.range((first, 1), (first + count - 1, width)).options(ndim=2).value or []
+
+    def write_rows(offset, rows):
+        sht.range((start_row + offset, 1)).value = rows
+
+    old_row_count = max(0, last_row - start_row + 1)
+    total, summary, block_count, rows_written = diff_write_chunks(
+        chunks, last_col, old_row_count, read_old, write_rows, write_progress_logger(sheet_name, log_callback))
+    if total < old_row_count:
+        sht.range((start_row + total, 1), (last_row, last_col)).clear_contents()
+    if log_callback: log_callback(format_diff_summary(sheet_name, summary, block_count, rows_written), False)
+
+
+def _consolidate_with_xlwings(doc1_path: str, doc2_path: str, doc3_path: str, doc4_path: str,
+                              target_report_path: str, log_callback=None, app=None,
+                              write_mode: str = CONSOLIDATION_WRITE_MODE_DEFAULT):
     """
     Core data consolidation logic using xlwings: copies three data tables (starting from the second row)
     to the third row of corresponding sheets in the target report, preserving format and sheet order.
-    Also inserts the device appearance image into the '设备外观图' sheet.
+    Also inserts the device appearance image into the '设备外观图' sheet and writes the summary sheet.
     This version allows individual source documents (Doc1-Doc4) to be optional.
+    If app is given (see core.excel_session.ExcelSession), the workbook is processed in that
+    Excel instance and the instance is left running; otherwise a private instance is started and quit.
+    write_mode 'diff' writes only rows that differ from the sheet's current contents.
+    Source rows are streamed and written in blocks of CONSOLIDATION_CHUNK_ROWS rows.
     """
     source_info = [
-        {'path': doc1_path, 'sheet_name': '遗留缺陷列表'},
-        {'path': doc2_path, 'sheet_name': '产品需求列表'},
-        {'path': doc3_path, 'sheet_name': '验收测试用例'}
+        {'path': path, 'sheet_name': sheet_name}
+        for path, sheet_name in zip((doc1_path, doc2_path, doc3_path), REPORT_SOURCE_SHEETS)
     ]
+    summary_sources = SummarySources(doc1_path, doc2_path, doc3_path)
 
-    app = None
+    owns_app = app is None
+    wb = None
     try:
         # Check target report path first as it's mandatory
         if not target_report_path or not os.path.exists(target_report_path):
@@ -137,7 +258,8 @@ def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3
                 True)
             return False
 
-        app = xw.App(visible=False, add_book=False)
+        if owns_app:
+            app = xw.App(visible=False, add_book=False)
         wb = app.books.open(target_report_path, update_links=False)
         # FIXED: Always pass is_error
         if log_callback: log_callback(f"已打开目标报告：{os.path.basename(target_report_path)}", False)
@@ -157,18 +279,8 @@ def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3
             if log_callback: log_callback(
                 f"\n正在处理源文件 '{os.path.basename(src_path)}' -> 工作表 '{target_sheet_name}'", False)
 
-            try:
-                df = pd.read_excel(src_path, header=None)
-                if df.empty:
-                    # FIXED: Always pass is_error
-                    if log_callback: log_callback(f"警告：源文件 '{os.path.basename(src_path)}' 为空或无数据。", False)
-                    data = []
-                else:
-                    data = df.iloc[1:].values.tolist()  # Skip the first row (header in ZenTao exports)
-            except Exception as e:
-                # FIXED: Always pass is_error
-                if log_callback: log_callback(f"错误: 读取源文件 '{os.path.basename(src_path)}' 失败。原因: {e}", True)
-                if log_callback: log_callback(traceback.format_exc(), True)
+            chunks = open_source_chunks(src_path, log_callback, summary_sources=summary_sources)
+            if chunks is None:
                 continue  # Skip to the next source file
 
             if target_sheet_name in [s.name for s in wb.sheets]:
@@ -188,15 +300,19 @@ def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3
                     sht = None  # Ensure sht is None if creation failed
 
             if sht:  # Only proceed if sheet exists or was created
-                start_row_excel = 3
+                start_row_excel = REPORT_DATA_START_ROW
                 used_range = sht.used_range
                 last_row_to_clear = used_range.last_cell.row if not used_range.api is None else start_row_excel
-                last_col_to_clear = used_range.last_cell.column if not used_range.api is None else (
-                    df.shape[1] if not df.empty else 1)
+                last_col_to_clear = used_range.last_cell.column if not used_range.api is None else 1
 
-                if data:
-                    max_cols_in_data = max(len(row) for row in data)
-                    last_col_to_clear = max(last_col_to_clear, max_cols_in_data)
+                if write_mode == "diff":
+                    try:
+                        _diff_write_xlwings(sht, chunks, start_row_excel, last_row_to_clear, last_col_to_clear,
+                                            target_sheet_name, log_callback)
+                    except Exception as e:
+                        if log_callback: log_callback(f"错误: 差异写入工作表 '{target_sheet_name}' 失败。原因: {e}", True)
+                        if log_callback: log_callback(traceback.format_exc(), True)
+                    continue
 
                 if last_row_to_clear >= start_row_excel:
                     # FIXED: Always pass is_error
@@ -215,23 +331,23 @@ def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3
                     # FIXED: Always pass is_error
                     if log_callback: log_callback(f"工作表 '{target_sheet_name}' 已经足够干净，无需清除旧数据。", False)
 
-                if data:
+                if log_callback: log_callback(f"粘贴新数据到 '{target_sheet_name}' (每批 {CONSOLIDATION_CHUNK_ROWS} 行)...", False)
+                try:
+                    rows_written = _write_chunks_xlwings(sht, chunks, start_row_excel, target_sheet_name, log_callback)
+                except Exception as e:
                     # FIXED: Always pass is_error
-                    if log_callback: log_callback(f"粘贴新数据到 '{target_sheet_name}'，共 {len(data)} 行。", False)
-                    try:
-                        sht.range((start_row_excel, 1)).value = data
-                    except Exception as e:
-                        # FIXED: Always pass is_error
-                        if log_callback: log_callback(f"错误: 粘贴数据到工作表 '{target_sheet_name}' 失败。原因: {e}",
-                                                      True)
-                        if log_callback: log_callback(traceback.format_exc(), True)
-                        continue
+                    if log_callback: log_callback(f"错误: 粘贴数据到工作表 '{target_sheet_name}' 失败。原因: {e}",
+                                                  True)
+                    if log_callback: log_callback(traceback.format_exc(), True)
+                    continue
+                if rows_written:
+                    if log_callback: log_callback(f"已粘贴 {rows_written} 行到 '{target_sheet_name}'。", False)
                 else:
                     # FIXED: Always pass is_error
                     if log_callback: log_callback(f"没有数据需要粘贴到 '{target_sheet_name}'。", False)
 
         # Handle image insertion (Doc4)
-        pic_sheet_name = '设备外观图'
+        pic_sheet_name = REPORT_PICTURE_SHEET
         if doc4_path and os.path.exists(doc4_path):
             # FIXED: Always pass is_error
             if log_callback: log_callback(f"\n正在处理图片文件 '{os.path.basename(doc4_path)}'", False)
@@ -264,14 +380,15 @@ def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3
                     # FIXED: Always pass is_error
                     if log_callback: log_callback(f"已清除 {pictures_deleted_count} 张图片。", False)
 
-                    width_pt = 23.66 * 28.3465
-                    height_pt = 13.31 * 28.3465
+                    width_pt = REPORT_PICTURE_SIZE_CM[0] * 28.3465
+                    height_pt = REPORT_PICTURE_SIZE_CM[1] * 28.3465
                     top_left_cell = pic_sht.range('A2')
 
                     normalized_doc4_path = os.path.normpath(doc4_path)
                     # FIXED: Always pass is_error
                     if log_callback: log_callback(
                         f"准备插入图片。原始路径: '{doc4_path}', 规范化路径: '{normalized_doc4_path}'", False)
+                    normalized_doc4_path = prepare_report_picture(normalized_doc4_path, log_callback=log_callback)
                     # FIXED: Always pass is_error
                     if log_callback: log_callback(
                         f"正在插入图片 '{os.path.basename(normalized_doc4_path)}' 到 '{pic_sheet_name}' 的 '{top_left_cell.address}'...",
@@ -293,8 +410,15 @@ def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3
                 f"警告：图片文件 '{os.path.basename(doc4_path) if doc4_path else '未指定'}' 未选择或不存在，跳过图片插入。",
                 False)
 
+        add_report_summary(wb, write_summary_xlwings, doc1_path, doc2_path, doc3_path, log_callback,
+                           sources=summary_sources)
+
+        if app.calculation == 'manual':
+            # 共享会话中关闭了自动计算，保存前手动计算一次，避免公式结果过期
+            app.calculate()
         wb.save()
         wb.close()
+        wb = None
         # FIXED: Always pass is_error
         if log_callback: log_callback("\n✅ 所有数据及图片已成功汇总到目标文件。", False)
         return True
@@ -317,7 +441,13 @@ def consolidate_excel_data_and_insert_chart(doc1_path: str, doc2_path: str, doc3
         if log_callback: log_callback(f"详细错误信息: {traceback.format_exc()}", True)
         return False
     finally:
-        if app:
+        if owns_app and app:
             app.quit()
             # FIXED: Always pass is_error
             if log_callback: log_callback("xlwings 应用程序已关闭。", False)
+        elif wb is not None:
+            # 共享 Excel 实例中不保留失败任务打开的工作簿
+            try:
+                wb.close()
+            except Exception:
+                pass
@@ -2,30 +2,55 @@
 from PyQt5.QtCore import QThread, pyqtSignal
 import traceback
 from core.excel_utils import consolidate_excel_data_and_insert_chart
+from core.excel_session import ExcelSession
+from core.batch_consolidation import run_batch, format_summary
+from core.profiling import profiled
+from config.settings import CONSOLIDATION_ENGINE_DEFAULT, CONSOLIDATION_WRITE_MODE_DEFAULT, BATCH_MAX_WRITERS_DEFAULT
 
 class ExcelWorker(QThread):
     log_signal = pyqtSignal(str, bool)  # message, is_error
     finished_signal = pyqtSignal(bool, str) # success, message
 
-    def __init__(self, doc1_path, doc2_path, doc3_path, doc4_path, target_report_path):
+    def __init__(self, doc1_path, doc2_path, doc3_path, doc4_path, target_report_path,
+                 engine=CONSOLIDATION_ENGINE_DEFAULT, write_mode=CONSOLIDATION_WRITE_MODE_DEFAULT):
         super().__init__()
         self.doc1_path = doc1_path
         self.doc2_path = doc2_path
         self.doc3_path = doc3_path
         self.doc4_path = doc4_path
         self.target_report_path = target_report_path
+        self.engine = engine
+        self.write_mode = write_mode
 
+    def _job(self):
+        return {
+            'doc1_path': self.doc1_path,
+            'doc2_path': self.doc2_path,
+            'doc3_path': self.doc3_path,
+            'doc4_path': self.doc4_path,
+            'target_report_path': self.target_report_path,
+        }
+
+    @profiled()
     def run(self):
         try:
-            self.log_signal.emit("开始 Excel 数据汇总及图片插入...", False)
-            success = consolidate_excel_data_and_insert_chart(
-                self.doc1_path,
-                self.doc2_path,
-                self.doc3_path,
-                self.doc4_path,
-                self.target_report_path,
-                log_callback=lambda msg, is_err=False: self.log_signal.emit(msg, is_err)
-            )
+            self.log_signal.emit(f"开始 Excel 数据汇总及图片插入 (引擎: {self.engine})...", False)
+            log_callback = lambda msg, is_err=False: self.log_signal.emit(msg, is_err)
+            if self.engine == "xlwings" and ExcelSession.available():
+                # 使用批处理模式的 Excel 会话 (关闭屏幕刷新/事件/自动计算，崩溃时自动重启)
+                with ExcelSession(log_callback, write_mode=self.write_mode) as session:
+                    success = session.run_job(self._job())
+            else:
+                success = consolidate_excel_data_and_insert_chart(
+                    self.doc1_path,
+                    self.doc2_path,
+                    self.doc3_path,
+                    self.doc4_path,
+                    self.target_report_path,
+                    log_callback=log_callback,
+                    engine=self.engine,
+                    write_mode=self.write_mode
+                )
             if success:
                 self.finished_signal.emit(True, "数据汇总和图片插入成功！")
             else:
@@ -34,3 +59,39 @@ class ExcelWorker(QThread):
             self.log_signal.emit(f"Excel 处理任务异常: {e}", True)
             self.log_signal.emit(traceback.format_exc(), True)
             self.finished_signal.emit(False, f"Excel 处理任务异常: {e}")
+
+
+class ExcelBatchWorker(QThread):
+    """批量汇总：源文档在进程池中并行解析，报告由多个写入进程并行生成"""
+    log_signal = pyqtSignal(str, bool)  # message, is_error
+    job_finished_signal = pyqtSignal(int, object)  # job index, result dict
+    finished_signal = pyqtSignal(bool, str)  # success, message
+
+    def __init__(self, jobs, engine=CONSOLIDATION_ENGINE_DEFAULT, max_writers=BATCH_MAX_WRITERS_DEFAULT,
+                 write_mode=CONSOLIDATION_WRITE_MODE_DEFAULT):
+        super().__init__()
+        self.jobs = list(jobs)
+        self.engine = engine
+        self.max_writers = max_writers
+        self.write_mode = write_mode
+        self.results = []
+
+    @profiled()
+    def run(self):
+        try:
+            self.log_signal.emit(f"开始批量汇总，共 {len(self.jobs)} 份报告...", False)
+            self.results = run_batch(
+                self.jobs, engine=self.engine, max_writers=self.max_writers, write_mode=self.write_mode,
+                log_callback=lambda msg, is_err=False: self.log_signal.emit(msg, is_err),
+                on_result=lambda index, result: self.job_finished_signal.emit(index, result)
+            )
+            self.log_signal.emit("\n" + format_summary(self.results), False)
+            failed = [r for r in self.results if not r['success']]
+            if failed:
+                self.finished_signal.emit(False, f"批量汇总完成，{len(failed)}/{len(self.results)} 份报告失败，请查看日志。")
+            else:
+                self.finished_signal.emit(True, f"批量汇总完成，共 {len(self.results)} 份报告全部成功！")
+        except Exception as e:
+            self.log_signal.emit(f"Excel 批量任务异常: {e}", True)
+            self.log_signal.emit(traceback.format_exc(), True)
+            self.finished_signal.emit(False, f"Excel 批量任务异常: {e}")
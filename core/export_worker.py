@@ -0,0 +1,39 @@
+# core/export_worker.py
+from PyQt5.QtCore import QThread, pyqtSignal
+import os
+import time
+import traceback
+from core.bug_export import export_bugs
+from core.profiling import profiled
+
+
+class BugExportWorker(QThread):
+    """在后台把 BUG 查询结果流式导出为 .xlsx 或 .csv"""
+    log_signal = pyqtSignal(str, bool)  # message, is_error
+    progress_signal = pyqtSignal(int)  # 0-100
+    finished_signal = pyqtSignal(bool, str)  # success, message
+
+    def __init__(self, file_path, bugs, query_info=None):
+        super().__init__()
+        self.file_path = file_path
+        self.bugs = bugs
+        self.query_info = query_info
+
+    def _progress(self, written, total):
+        if total:
+            self.progress_signal.emit(min(100, written * 100 // total))
+
+    @profiled()
+    def run(self):
+        try:
+            start_time = time.perf_counter()
+            self.log_signal.emit(f"开始导出到 {os.path.basename(self.file_path)}...", False)
+            written = export_bugs(self.file_path, self.bugs, self.query_info, progress_callback=self._progress)
+            elapsed = time.perf_counter() - start_time
+            self.log_signal.emit(f"已导出 {written} 条记录，用时 {elapsed:.1f} 秒。", False)
+            self.finished_signal.emit(True, f"数据已导出到: {self.file_path}")
+        except PermissionError:
+            self.finished_signal.emit(False, "无法保存文件：权限被拒绝，请确保文件已关闭且您有写入权限。")
+        except Exception as e:
+            self.log_signal.emit(traceback.format_exc(), True)
+            self.finished_signal.emit(False, f"导出过程中发生错误: {e}")
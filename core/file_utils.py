@@ -0,0 +1,67 @@
+# core/file_utils.py - 文件写入工具
+#
+# 原地保存工作簿时如果程序在写入中途崩溃，目标文件会被截断损坏。
+# 这里先写入同目录下的临时文件并刷新到磁盘，再用 os.replace 原子替换目标文件：
+# 任何时刻目标文件要么是旧内容，要么是完整的新内容。
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write_path(target_path):
+    """
+    产生一个与 target_path 同目录的临时文件路径；with 块正常结束后把临时文件原子替换为目标文件，
+    出现异常时删除临时文件，目标文件保持不变。
+    """
+    target_path = os.path.abspath(target_path)
+    directory, name = os.path.split(target_path)
+    _, ext = os.path.splitext(name)
+    # 保留扩展名：openpyxl 等按扩展名决定保存格式
+    fd, tmp_path = tempfile.mkstemp(prefix=f".~{name}.", suffix=ext, dir=directory)
+    os.close(fd)
+    try:
+        if os.path.exists(target_path):
+            os.chmod(tmp_path, os.stat(target_path).st_mode & 0o7777)  # 保持原文件权限
+        yield tmp_path
+        _fsync_file(tmp_path)
+        os.replace(tmp_path, target_path)
+        _fsync_dir(directory)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _fsync_file(path):
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(directory):
+    # Windows 不支持打开目录，替换操作本身已由文件系统保证原子性
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_save_workbook(wb, target_path):
+    """以原子替换的方式保存 openpyxl 工作簿"""
+    with atomic_write_path(target_path) as tmp_path:
+        wb.save(tmp_path)
+
+
+def atomic_write_bytes(target_path, data):
+    with atomic_write_path(target_path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
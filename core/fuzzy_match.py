@@ -0,0 +1,137 @@
+# core/fuzzy_match.py - 关键词排序匹配
+#
+# 台账和禅道产品列表中的名称是中文与型号混排的字符串 (如 "2600E2 窗口式照相机")。
+# 简单的“包含即命中”会让 "2600" 这样的短关键词命中错误的项目。
+# 这里对规范化后的文本建立字符二元组倒排索引，按以下得分返回前 k 个候选：
+#   0.5 * 二元组 Dice 系数 + 0.3 (型号/数字片段完全一致) + 0.2 (文本包含关键词)，完全相同为 1.0
+
+import re
+import heapq
+import unicodedata
+from collections import Counter
+
+from config.settings import FUZZY_MATCH_TOP_K, FUZZY_MATCH_AMBIGUITY_MARGIN
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+_ALNUM_TOKEN_RE = re.compile(r"[0-9a-z]+")
+# 按命中的二元组数量预筛选后，最多对这么多倍于 k 的候选计算完整得分
+_CANDIDATE_FACTOR = 50
+# 出现在超过此比例文本中的二元组不用于生成候选
+_COMMON_GRAM_RATIO = 0.05
+
+
+def normalize_text(text):
+    """全角转半角、转小写、去掉空白和标点"""
+    if text is None:
+        return ""
+    return _NON_WORD_RE.sub("", unicodedata.normalize("NFKC", str(text)).lower())
+
+
+def alnum_tokens(text):
+    """型号、编号等字母数字片段，如 '2600E2 相机-V1' -> {'2600e2', 'v1'}"""
+    if text is None:
+        return set()
+    return set(_ALNUM_TOKEN_RE.findall(unicodedata.normalize("NFKC", str(text)).lower()))
+
+
+def char_grams(normalized):
+    if len(normalized) < 2:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + 2] for i in range(len(normalized) - 1)}
+
+
+class FuzzyMatch:
+    """一个候选：index 为原列表中的位置"""
+
+    def __init__(self, index, text, score, contains):
+        self.index = index
+        self.text = text
+        self.score = score
+        self.contains = contains
+
+    def __repr__(self):
+        return f"FuzzyMatch({self.index}, {self.text!r}, {self.score:.2f})"
+
+
+class FuzzyIndex:
+    """文本列表的二元组倒排索引"""
+
+    def __init__(self, texts):
+        self.texts = ["" if text is None else str(text) for text in texts]
+        self._normalized = [normalize_text(text) for text in self.texts]
+        self._grams = [char_grams(normalized) for normalized in self._normalized]
+        self._tokens = [None] * len(self.texts)  # 型号片段，计算得分时按需生成
+        self._postings = {}
+        for index, grams in enumerate(self._grams):
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(index)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _score(self, index, query_normalized, query_grams, query_tokens):
+        normalized = self._normalized[index]
+        contains = query_normalized in normalized
+        if normalized == query_normalized:
+            return 1.0, contains
+        grams = self._grams[index]
+        dice = 2 * len(query_grams & grams) / (len(query_grams) + len(grams)) if grams else 0.0
+        if self._tokens[index] is None:
+            self._tokens[index] = alnum_tokens(self.texts[index])
+        token_match = bool(query_tokens) and query_tokens <= self._tokens[index]
+        return 0.5 * dice + 0.3 * token_match + 0.2 * contains, contains
+
+    def search(self, query, k=FUZZY_MATCH_TOP_K, min_score=0.0, require_substring=False):
+        """返回得分最高的 k 个候选 (FuzzyMatch 列表，按得分从高到低，同分时较短的文本优先)"""
+        query_normalized = normalize_text(query)
+        if not query_normalized:
+            return []
+        query_grams = char_grams(query_normalized)
+        query_tokens = alnum_tokens(query)
+
+        postings = sorted((self._postings.get(gram, ()) for gram in query_grams), key=len)
+        if len(query_normalized) < 2:
+            # 单个字符的关键词没有二元组可查 (倒排表中只有长度为 1 的文本)，逐个检查是否包含
+            candidates = [index for index, normalized in enumerate(self._normalized) if query_normalized in normalized]
+        elif require_substring:
+            # 包含关键词的文本必然含有全部二元组：从最少的倒排表开始求交集
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(posting)
+            limit = max(k, 1) * _CANDIDATE_FACTOR
+            if len(candidates) > limit:
+                # 都包含关键词时二元组越少的文本 Dice 系数越高，只对最短的一部分计算完整得分
+                candidates = heapq.nsmallest(limit, candidates, key=lambda index: len(self._grams[index]))
+        else:
+            # 出现在大部分文本中的二元组 (如 "产品") 区分度很低，只用较少见的二元组生成候选；
+            # 它们仍然参与完整得分的计算
+            common_limit = max(_COMMON_GRAM_RATIO * len(self.texts), 1)
+            selective = [posting for posting in postings if len(posting) <= common_limit] or postings[:1]
+            hits = Counter()
+            for posting in selective:
+                hits.update(posting)
+            limit = max(k, 1) * _CANDIDATE_FACTOR
+            if len(hits) > limit:
+                candidates = [index for index, _ in hits.most_common(limit)]
+            else:
+                candidates = list(hits)
+
+        scored = []
+        for index in candidates:
+            score, contains = self._score(index, query_normalized, query_grams, query_tokens)
+            if require_substring and not contains:
+                continue
+            if score >= min_score:
+                scored.append((score, -len(self._normalized[index]), -index, index, contains))
+        top = heapq.nlargest(k, scored)
+        return [FuzzyMatch(index, self.texts[index], round(score, 4), contains)
+                for score, _, _, index, contains in top]
+
+
+def is_ambiguous(matches, margin=FUZZY_MATCH_AMBIGUITY_MARGIN):
+    """最佳候选不是完全匹配，且与第二名的得分差小于 margin 时视为有歧义，需要用户确认"""
+    if len(matches) < 2 or matches[0].score >= 1.0:
+        return False
+    return matches[0].score - matches[1].score < margin
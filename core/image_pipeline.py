@@ -0,0 +1,92 @@
+# core/image_pipeline.py - 设备外观图预处理
+#
+# 手机拍摄的原图往往有数 MB 到数十 MB，原样嵌入后报告的每次打开和保存都会变慢。
+# 插入前按 EXIF 方向旋正，缩小到显示尺寸在 REPORT_PICTURE_DPI 下的像素数，
+# 再重新编码为优化的 JPEG (有透明通道时为 PNG)。处理结果按文件内容哈希缓存。
+# 依赖 Pillow；未安装或处理失败时返回原图路径。
+
+import os
+import hashlib
+
+from config.settings import REPORT_PICTURE_SIZE_CM, REPORT_PICTURE_DPI, REPORT_PICTURE_JPEG_QUALITY, CACHE_DIR
+
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+# 处理参数或算法变化时递增，使旧缓存失效
+PIPELINE_VERSION = 1
+
+
+def target_pixels(size_cm=REPORT_PICTURE_SIZE_CM, dpi=REPORT_PICTURE_DPI):
+    """显示尺寸 (厘米) 在给定 DPI 下对应的像素数 (宽, 高)"""
+    return round(size_cm[0] / 2.54 * dpi), round(size_cm[1] / 2.54 * dpi)
+
+
+def _cache_key(image_path, size_px, quality):
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    digest.update(f"|{PIPELINE_VERSION}|{size_px[0]}x{size_px[1]}|{quality}".encode())
+    return digest.hexdigest()
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def prepare_report_picture(image_path, size_cm=REPORT_PICTURE_SIZE_CM, dpi=REPORT_PICTURE_DPI,
+                           quality=REPORT_PICTURE_JPEG_QUALITY, cache_dir=IMAGE_CACHE_DIR, log_callback=None):
+    """
+    返回用于插入报告的图片路径：处理后的缓存文件，或在无需/无法处理时返回原图路径。
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        if log_callback: log_callback("提示: 未安装 Pillow，设备外观图将按原图插入。", False)
+        return image_path
+
+    try:
+        size_px = target_pixels(size_cm, dpi)
+        key = _cache_key(image_path, size_px, quality)
+        for ext in (".jpg", ".png"):
+            cached_path = os.path.join(cache_dir, key + ext)
+            if os.path.exists(cached_path):
+                if log_callback: log_callback(f"使用已缓存的处理后图片 ({os.path.getsize(cached_path) / 1024:.0f} KB)。", False)
+                return cached_path
+
+        original_size = os.path.getsize(image_path)
+        with Image.open(image_path) as img:
+            original_px = img.size
+            original_format = img.format
+            exif_orientation = img.getexif().get(0x0112, 1)
+            img = ImageOps.exif_transpose(img)
+            if img.width > size_px[0] or img.height > size_px[1]:
+                img.thumbnail(size_px, Image.LANCZOS)  # 保持宽高比，只缩小不放大
+            elif exif_orientation == 1 and original_format in ("JPEG", "PNG"):
+                if log_callback: log_callback("设备外观图尺寸不超过显示尺寸，无需处理。", False)
+                return image_path
+
+            os.makedirs(cache_dir, exist_ok=True)
+            if _has_alpha(img):
+                cached_path = os.path.join(cache_dir, key + ".png")
+                save_kwargs = {"format": "PNG", "optimize": True}
+                if img.mode not in ("RGBA", "LA"):
+                    img = img.convert("RGBA")
+            else:
+                cached_path = os.path.join(cache_dir, key + ".jpg")
+                save_kwargs = {"format": "JPEG", "quality": quality, "optimize": True, "progressive": True}
+                if img.mode != "RGB":
+                    img = img.convert("RGB")
+            # 先写临时文件再替换，避免中断时留下不完整的缓存
+            tmp_path = cached_path + f".{os.getpid()}.tmp"
+            img.save(tmp_path, dpi=(dpi, dpi), **save_kwargs)
+            os.replace(tmp_path, cached_path)
+            processed_px = img.size
+
+        processed_size = os.path.getsize(cached_path)
+        if log_callback: log_callback(
+            f"设备外观图已预处理：{original_px[0]}x{original_px[1]} -> {processed_px[0]}x{processed_px[1]}，"
+            f"{original_size / 1024:.0f} KB -> {processed_size / 1024:.0f} KB。", False)
+        return cached_path
+    except Exception as e:
+        if log_callback: log_callback(f"警告: 预处理设备外观图失败，将按原图插入。原因: {e}", False)
+        return image_path
@@ -0,0 +1,253 @@
+# core/job_scheduler.py - 后台任务调度
+#
+# 各页面的工作线程 (QThread) 不再直接 start()，而是包装为 Job 提交给 JOB_SCHEDULER：
+#   - 每种任务类型占用一定的资源 (浏览器、Excel 实例、CPU 进程)，同时运行的任务不超过 JOB_RESOURCE_LIMITS；
+#   - 资源不足时排队，按优先级、提交顺序启动；依赖的任务全部成功后才启动，任一失败则取消；
+#   - 排队中的任务可直接取消，运行中的任务请求中断 (工作线程检查 isInterruptionRequested 后尽早结束)；
+#   - 状态、进度和耗时通过统一的信号发出，供任务列表面板和主窗口退出确认使用。
+# 调度器只在界面线程中使用；工作线程的信号经 Qt 的队列连接回到界面线程。
+
+import time
+import itertools
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from core.log_bus import channel_log_callback
+from config.settings import JOB_RESOURCE_LIMITS, JOB_HISTORY_SIZE
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {PRIORITY_HIGH: "高", PRIORITY_NORMAL: "普通", PRIORITY_LOW: "低"}
+
+# 任务类型 -> (显示名称, 默认占用的资源)
+JOB_KINDS = {
+    'selenium': ("禅道自动化", {'browser': 1}),
+    'query': ("禅道查询", {'browser': 1}),
+    'excel': ("Excel 处理", {'excel': 1}),
+    'cpu': ("数据处理", {'cpu': 1}),
+    'io': ("文件导出", {}),
+}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+STATE_NAMES = {QUEUED: "排队中", RUNNING: "运行中", SUCCEEDED: "已完成", FAILED: "失败", CANCELLED: "已取消"}
+
+_job_ids = itertools.count(1)
+
+
+class Job:
+    """
+    一个后台任务。worker 为尚未启动的 QThread，需有 finished_signal(bool, str)，可选 progress_signal(int)；
+    resources 缺省时按任务类型决定，例如 {'excel': 3} 表示同时占用 3 个 Excel 实例。
+    """
+
+    def __init__(self, title, kind, worker, resources=None, priority=PRIORITY_NORMAL, depends_on=()):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}")
+        self.id = next(_job_ids)
+        self.title = title
+        self.kind = kind
+        self.worker = worker
+        self.resources = dict(JOB_KINDS[kind][1] if resources is None else resources)
+        self.priority = priority
+        self.depends_on = list(depends_on)
+        self.state = QUEUED
+        self.progress = None  # 0-100，None 表示未知
+        self.message = ""
+        self.cancel_requested = False
+        self.demand = {}  # 运行时实际占用的资源
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._result = None  # finished_signal 给出的 (success, message)
+
+    @property
+    def kind_name(self):
+        return JOB_KINDS[self.kind][0]
+
+    @property
+    def state_name(self):
+        if self.state == RUNNING and self.cancel_requested:
+            return "正在取消"
+        return STATE_NAMES[self.state]
+
+    @property
+    def is_active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    @property
+    def wait_time(self):
+        """排队等待的秒数"""
+        return (self.started or self.finished or time.time()) - self.created
+
+    @property
+    def run_time(self):
+        """运行的秒数，尚未开始时为 None"""
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+
+class JobScheduler(QObject):
+    job_added = pyqtSignal(object)  # Job
+    job_updated = pyqtSignal(object)  # Job (状态或进度变化)
+    job_finished = pyqtSignal(object)  # Job (成功、失败或取消)
+
+    def __init__(self, limits=JOB_RESOURCE_LIMITS, history_size=JOB_HISTORY_SIZE, parent=None):
+        super().__init__(parent)
+        self.limits = dict(limits)
+        self.history_size = history_size
+        self.jobs = []  # 按提交顺序，包含最近结束的任务
+        self._in_use = {name: 0 for name in self.limits}
+        self._log = channel_log_callback("jobs")
+
+    # --- 提交与查询 ---
+
+    def submit(self, job):
+        self.jobs.append(job)
+        self.job_added.emit(job)
+        self._schedule()
+        return job
+
+    def active_jobs(self):
+        return [job for job in self.jobs if job.is_active]
+
+    def job_for(self, worker):
+        for job in reversed(self.jobs):
+            if job.worker is worker:
+                return job
+        return None
+
+    def is_active(self, worker):
+        """worker 所属的任务是否正在排队或运行 (worker 为 None 时返回 False)"""
+        job = self.job_for(worker) if worker is not None else None
+        return job is not None and job.is_active
+
+    def usage(self):
+        """各资源的 (已占用, 上限)"""
+        return {name: (self._in_use.get(name, 0), limit) for name, limit in self.limits.items()}
+
+    # --- 取消 ---
+
+    def cancel(self, job):
+        if job.state == QUEUED:
+            self._finish(job, CANCELLED, "已在排队时取消")
+            self._schedule()
+        elif job.state == RUNNING and not job.cancel_requested:
+            job.cancel_requested = True
+            job.worker.requestInterruption()
+            self.job_updated.emit(job)
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            self.cancel(job)
+
+    def shutdown(self, timeout_ms=5000):
+        """
+        程序退出时调用：丢弃排队中的任务 (不再通知页面)，请求运行中的任务中断并最多等待 timeout_ms 毫秒，
+        避免工作线程对象在线程仍在运行时被销毁。
+        """
+        deadline = time.time() + timeout_ms / 1000
+        running = []
+        for job in self.active_jobs():
+            if job.state == QUEUED:
+                job.state, job.message, job.finished, job.worker = CANCELLED, "程序退出", time.time(), None
+            else:
+                job.cancel_requested = True
+                job.worker.requestInterruption()
+                running.append(job)
+        for job in running:
+            job.worker.wait(max(0, int((deadline - time.time()) * 1000)))
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if job.is_active]
+
+    # --- 调度 ---
+
+    def _demand(self, job):
+        # 请求量超过上限时按上限占用，避免任务永远无法启动
+        return {name: min(amount, self.limits.get(name, amount)) for name, amount in job.resources.items()}
+
+    def _fits(self, demand):
+        return all(self._in_use.get(name, 0) + amount <= self.limits.get(name, amount)
+                   for name, amount in demand.items())
+
+    def _schedule(self):
+        queued = sorted((job for job in self.jobs if job.state == QUEUED), key=lambda job: (job.priority, job.id))
+        for job in queued:
+            if job.state != QUEUED:
+                continue  # 页面在取消通知中提交新任务时会重入调度，已在内层处理
+            failed = [dep for dep in job.depends_on if dep.state in (FAILED, CANCELLED)]
+            if failed:
+                self._finish(job, CANCELLED, f"依赖的任务“{failed[0].title}”未成功")
+                continue
+            if any(dep.state != SUCCEEDED for dep in job.depends_on):
+                continue
+            demand = self._demand(job)
+            if self._fits(demand):
+                self._start(job, demand)
+        self._trim_history()
+
+    def _start(self, job, demand):
+        for name, amount in demand.items():
+            self._in_use[name] = self._in_use.get(name, 0) + amount
+        job.demand = demand
+        job.state = RUNNING
+        job.started = time.time()
+        worker = job.worker
+        worker.finished_signal.connect(lambda success, message, job=job: self._on_result(job, success, message))
+        if hasattr(worker, 'progress_signal'):
+            worker.progress_signal.connect(lambda value, job=job: self._on_progress(job, value))
+        worker.finished.connect(lambda job=job: self._on_thread_finished(job))
+        worker.start()
+        self.job_updated.emit(job)
+
+    def _on_progress(self, job, value):
+        if job.state == RUNNING and value != job.progress:
+            job.progress = value
+            self.job_updated.emit(job)
+
+    def _on_result(self, job, success, message):
+        job._result = (success, message)
+
+    def _on_thread_finished(self, job):
+        for name, amount in job.demand.items():
+            self._in_use[name] -= amount
+        success, message = job._result or (False, "任务意外结束")
+        if success:
+            state = SUCCEEDED
+        else:
+            state = CANCELLED if job.cancel_requested else FAILED
+        self._finish(job, state, message)
+        self._schedule()
+
+    def _finish(self, job, state, message):
+        never_started = job.started is None
+        job.state = state
+        job.message = message
+        job.finished = time.time()
+        if state == SUCCEEDED:
+            job.progress = 100
+        worker, job.worker = job.worker, None  # 不再持有已结束的工作线程
+        if never_started:
+            # 未启动的任务不会发出 finished_signal，由调度器代发，页面按失败处理即可恢复界面状态
+            worker.finished_signal.emit(False, f"任务已取消: {message}")
+            self._log(f"任务“{job.title}”{STATE_NAMES[state]}: {message}", False)
+        else:
+            self._log(f"任务“{job.title}”{STATE_NAMES[state]}，排队 {job.wait_time:.1f} 秒，"
+                      f"运行 {job.run_time:.1f} 秒", state == FAILED)
+        self.job_updated.emit(job)
+        self.job_finished.emit(job)
+
+    def _trim_history(self):
+        finished = [job for job in self.jobs if not job.is_active]
+        if len(finished) > self.history_size:
+            drop = set(id(job) for job in finished[:len(finished) - self.history_size])
+            self.jobs = [job for job in self.jobs if id(job) not in drop]
+
+
+JOB_SCHEDULER = JobScheduler()
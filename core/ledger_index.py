@@ -0,0 +1,159 @@
+# core/ledger_index.py - 项目台账索引
+#
+# 台账文件只在变化时解析一次：按列存储 (每列一个列表)，并以 (路径, 修改时间, 大小) 为键
+# 缓存在内存和磁盘 (CACHE_DIR/ledger) 中。之后的查询只需一次 os.stat 和内存中的字符串匹配。
+
+import os
+import pickle
+import hashlib
+
+from core.xlsx_readers import iter_rows, active_sheet_index
+from core.fuzzy_match import FuzzyIndex
+from config.settings import CACHE_DIR, FUZZY_MATCH_TOP_K
+
+LEDGER_CACHE_DIR = os.path.join(CACHE_DIR, "ledger")
+# 索引结构变化时递增，使旧的磁盘缓存失效
+INDEX_VERSION = 3
+
+_memory_cache = {}  # 绝对路径 -> LedgerIndex
+
+
+class LedgerIndex:
+    """台账活动工作表 (保存时选中的工作表，与 openpyxl 的 wb.active 一致) 的列式索引：第一行为表头，以下为数据行"""
+
+    def __init__(self, path, mtime, size, headers, columns, row_count):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.headers = headers
+        self.columns = columns  # 表头 -> 该列所有数据行的值
+        self.row_count = row_count
+        self._fuzzy = {}  # 表头 -> 该列的 FuzzyIndex，首次按该列查询时生成
+        self._matches = {}  # (表头, 关键词) -> 最佳匹配行号
+
+    @classmethod
+    def build(cls, path):
+        stat = os.stat(path)
+        rows = iter_rows(path, skip_rows=0, sheet_index=active_sheet_index(path))
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValueError(f"台账文件为空: {os.path.basename(path)}")
+        headers = []
+        positions = []
+        for position, header in enumerate(header_row):
+            if header is not None and header not in headers:
+                headers.append(header)
+                positions.append(position)
+        columns = {header: [] for header in headers}
+        row_count = 0
+        for row in rows:
+            for header, position in zip(headers, positions):
+                columns[header].append(row[position] if position < len(row) else None)
+            row_count += 1
+        return cls(os.path.abspath(path), stat.st_mtime, stat.st_size, headers, columns, row_count)
+
+    def is_current(self, stat):
+        return self.mtime == stat.st_mtime and self.size == stat.st_size
+
+    def _check_columns(self, key_column, target_columns):
+        if key_column not in self.columns:
+            raise ValueError(f"找不到列标题: {key_column}")
+        for col in target_columns:
+            if col not in self.columns:
+                raise ValueError(f"找不到目标列标题: {col}")
+
+    def fuzzy_index(self, key_column):
+        fuzzy = self._fuzzy.get(key_column)
+        if fuzzy is None:
+            fuzzy = self._fuzzy[key_column] = FuzzyIndex(self.columns[key_column])
+        return fuzzy
+
+    def find_row(self, key_column, key_value):
+        """
+        返回 key_column 列中包含 key_value 的行里得分最高的数据行号 (从 0 开始)，没有则返回 None。
+        排序见 core.fuzzy_match，例如 "2600" 优先命中 "2600" 而不是 "2600E2"。
+        """
+        memo_key = (key_column, key_value)
+        if memo_key in self._matches:
+            return self._matches[memo_key]
+        matches = self.fuzzy_index(key_column).search(key_value, k=1, require_substring=True)
+        match = matches[0].index if matches else None
+        self._matches[memo_key] = match
+        return match
+
+    def search(self, key_column, key_value, target_columns, k=FUZZY_MATCH_TOP_K, require_substring=False):
+        """返回前 k 个候选 [(FuzzyMatch, 目标列字典), ...]，供界面展示和选择"""
+        self._check_columns(key_column, target_columns)
+        matches = self.fuzzy_index(key_column).search(key_value, k=k, require_substring=require_substring)
+        return [(match, self.row_values(match.index, target_columns)) for match in matches]
+
+    def row_values(self, index, target_columns):
+        return {col: self.columns[col][index] for col in target_columns}
+
+    def lookup(self, key_column, key_value, target_columns):
+        self._check_columns(key_column, target_columns)
+        index = self.find_row(key_column, key_value)
+        return None if index is None else self.row_values(index, target_columns)
+
+    def lookup_many(self, key_column, key_values, target_columns):
+        """批量查询，返回 {关键词: 匹配行的目标列字典或 None}"""
+        self._check_columns(key_column, target_columns)
+        results = {}
+        for key_value in key_values:
+            index = self.find_row(key_column, key_value)
+            results[key_value] = None if index is None else self.row_values(index, target_columns)
+        return results
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_fuzzy'] = {}
+        state['_matches'] = {}
+        return state
+
+
+def _cache_file(abs_path):
+    return os.path.join(LEDGER_CACHE_DIR, hashlib.sha1(abs_path.encode('utf-8')).hexdigest() + ".pkl")
+
+
+def _load_disk_cache(abs_path, stat):
+    cache_path = _cache_file(abs_path)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'rb') as f:
+            version, index = pickle.load(f)
+    except Exception:
+        return None  # 缓存损坏时重新解析
+    if version != INDEX_VERSION or index.path != abs_path or not index.is_current(stat):
+        return None
+    return index
+
+
+def _save_disk_cache(index):
+    try:
+        os.makedirs(LEDGER_CACHE_DIR, exist_ok=True)
+        cache_path = _cache_file(index.path)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((INDEX_VERSION, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # 缓存写入失败不影响查询
+
+
+def get_ledger_index(file_path, log_callback=None):
+    """返回台账索引：优先使用内存缓存，其次磁盘缓存，文件变化时重新解析"""
+    abs_path = os.path.abspath(file_path)
+    stat = os.stat(abs_path)
+    index = _memory_cache.get(abs_path)
+    if index is not None and index.is_current(stat):
+        return index
+
+    index = _load_disk_cache(abs_path, stat)
+    if index is None:
+        if log_callback: log_callback(f"正在解析台账 '{os.path.basename(abs_path)}' 并建立索引...", False)
+        index = LedgerIndex.build(abs_path)
+        _save_disk_cache(index)
+        if log_callback: log_callback(f"台账索引已建立，共 {index.row_count} 行。", False)
+    _memory_cache[abs_path] = index
+    return index
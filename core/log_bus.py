@@ -0,0 +1,172 @@
+# core/log_bus.py - 全局日志通道
+#
+# 各页面及后台任务通过 Python logging 记录日志 (每个页面一个通道，即 genreport.<通道> 记录器)：
+#   记录器 -> QueueHandler (只是放入队列，任何线程调用都不会阻塞)
+#   QueueListener 线程 -> 内存环形缓冲区 (界面定时批量读取) + 滚动日志文件
+# 界面侧见 ui/log_view.py。
+
+import os
+import queue
+import logging
+import threading
+import collections
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config.settings import (
+    LOG_DIR, LOG_FILE_NAME, LOG_FILE_MAX_MB, LOG_FILE_BACKUPS, LOG_FILE_LEVEL, LOG_RING_SIZE
+)
+
+ROOT_LOGGER = "genreport"
+_FILE_FORMAT = "%(asctime)s %(levelname)-7s [%(name)s] %(message)s"
+
+
+def classify_level(message, is_error=False):
+    """
+    把原有的 (消息, 是否错误) 映射为日志级别：
+    “警告”开头为 WARNING，其他错误为 ERROR；缩进的步骤明细 (如导出过程中的每一步) 为 DEBUG。
+    """
+    text = message.lstrip(" -")
+    if text.startswith("警告"):
+        return logging.WARNING
+    if is_error:
+        return logging.ERROR
+    if message.startswith("  "):
+        return logging.DEBUG
+    return logging.INFO
+
+
+def is_clear_marker(record):
+    return getattr(record, "clear", False)
+
+
+class RingBuffer:
+    """线程安全的定长记录缓冲区：保留最近 capacity 条记录，读取方按序号增量获取 (见 RingReader)"""
+
+    def __init__(self, capacity):
+        self._records = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        self._counts = collections.Counter()  # 记录器名称 -> 累计写入的记录数
+
+    @property
+    def next_seq(self):
+        with self._lock:
+            return self._next_seq
+
+    def position(self, name=None):
+        """返回 (下一条记录的序号, 累计写入的记录数)；指定 name 时只计该记录器的记录"""
+        with self._lock:
+            return self._next_seq, (self._counts[name] if name is not None else self._next_seq)
+
+    def append(self, record):
+        with self._lock:
+            self._records.append((self._next_seq, record))
+            self._next_seq += 1
+            self._counts[record.name] += 1
+
+    def since(self, seq, name=None):
+        """
+        返回 (序号 >= seq 的记录列表, 下一次读取的序号, 累计写入的记录数)；
+        指定 name 时只返回并统计该记录器的记录。
+        """
+        with self._lock:
+            next_seq = self._next_seq
+            new = []
+            for record_seq, record in reversed(self._records):
+                if record_seq < seq:
+                    break
+                if name is None or record.name == name:
+                    new.append(record)
+            count = self._counts[name] if name is not None else next_seq
+        new.reverse()
+        return new, next_seq, count
+
+
+class RingReader:
+    """按记录器名称增量读取环形缓冲区，并统计该记录器因缓冲区已满而未能读到的记录数"""
+
+    def __init__(self, ring, name=None):
+        self.ring = ring
+        self.name = name
+        self._seq, self._count = ring.position(name)
+
+    def read(self):
+        """返回 (新记录列表, 上次读取后丢失的本记录器记录数)"""
+        records, self._seq, count = self.ring.since(self._seq, self.name)
+        dropped = count - self._count - len(records)
+        self._count = count
+        return records, dropped
+
+
+class RingBufferHandler(logging.Handler):
+    def __init__(self, ring):
+        super().__init__()
+        self.ring = ring
+
+    def emit(self, record):
+        self.ring.append(record)
+
+
+class LogBus:
+    def __init__(self, ring_size=LOG_RING_SIZE):
+        self.queue = queue.SimpleQueue()
+        self.ring = RingBuffer(ring_size)
+        self.log_file = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self, log_dir=LOG_DIR):
+        """启动后台监听线程 (重复调用无副作用)"""
+        with self._lock:
+            if self._listener is not None:
+                return
+            handlers = [RingBufferHandler(self.ring)]
+            try:
+                os.makedirs(log_dir, exist_ok=True)
+                self.log_file = os.path.join(log_dir, LOG_FILE_NAME)
+                file_handler = RotatingFileHandler(self.log_file, maxBytes=LOG_FILE_MAX_MB * 1024 * 1024,
+                                                   backupCount=LOG_FILE_BACKUPS, encoding="utf-8", delay=True)
+                file_handler.setLevel(LOG_FILE_LEVEL)
+                file_handler.setFormatter(logging.Formatter(_FILE_FORMAT))
+                file_handler.addFilter(lambda record: not is_clear_marker(record))
+                handlers.append(file_handler)
+            except OSError:
+                self.log_file = None  # 日志目录不可写时只保留界面日志
+
+            root = logging.getLogger(ROOT_LOGGER)
+            root.setLevel(logging.DEBUG)
+            root.propagate = False
+            root.addHandler(QueueHandler(self.queue))
+            self._listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+            self._listener.start()
+
+    def stop(self):
+        """处理完队列中剩余的记录后停止监听线程"""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+                root = logging.getLogger(ROOT_LOGGER)
+                for handler in list(root.handlers):
+                    if isinstance(handler, QueueHandler):
+                        root.removeHandler(handler)
+
+    def logger(self, channel):
+        self.start()
+        return logging.getLogger(f"{ROOT_LOGGER}.{channel}")
+
+
+LOG_BUS = LogBus()
+
+
+def get_channel_logger(channel):
+    return LOG_BUS.logger(channel)
+
+
+def channel_log_callback(channel):
+    """返回 log_callback(message, is_error=False)，供非界面代码 (命令行、批处理) 写入同一日志通道"""
+    logger = get_channel_logger(channel)
+
+    def log_callback(message, is_error=False):
+        logger.log(classify_level(message, is_error), message)
+    return log_callback
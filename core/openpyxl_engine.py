@@ -0,0 +1,219 @@
+# core/openpyxl_engine.py - 纯 Python 数据汇总引擎
+#
+# 与 excel_utils 中的 xlwings 引擎行为一致：从第3行开始清除并写入三张数据表，
+# 在“设备外观图”工作表 A2 处插入图片，并生成“数据汇总”统计页。只修改单元格的值，模板中的样式保持不变。
+# 无需安装 Microsoft Excel，可在 Linux 构建机上运行。
+
+import os
+import math
+import traceback
+
+from openpyxl import load_workbook
+from openpyxl.cell.cell import MergedCell
+
+from core.excel_utils import open_source_chunks, write_progress_logger
+from core.sheet_diff import diff_write_chunks, format_diff_summary
+from core.image_pipeline import prepare_report_picture
+from core.file_utils import atomic_save_workbook
+from core.report_summary import SummarySources, add_report_summary, write_summary_openpyxl
+from config.settings import (
+    REPORT_SOURCE_SHEETS, REPORT_PICTURE_SHEET, REPORT_DATA_START_ROW, REPORT_PICTURE_SIZE_CM,
+    CONSOLIDATION_WRITE_MODE_DEFAULT
+)
+
+PIXELS_PER_CM = 96 / 2.54
+
+
+def _clean_value(value):
+    """pandas 读取的空单元格为 NaN，写入前转换为 None (与 xlwings 写入空单元格一致)"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _get_or_create_sheet(wb, sheet_name, log_callback=None):
+    if sheet_name in wb.sheetnames:
+        if log_callback: log_callback(f"已找到工作表: '{sheet_name}'", False)
+        return wb[sheet_name]
+    ws = wb.create_sheet(title=sheet_name)  # 与 xlwings 引擎一致，新建的工作表放在最后
+    if log_callback: log_callback(f"创建工作表：{sheet_name}", False)
+    return ws
+
+
+def clear_sheet_values(ws, start_row, last_col, last_row=None):
+    """清除 start_row 到 last_row (默认最后一行) 的单元格内容，保留单元格样式；返回清除到的最后一行"""
+    last_row = ws.max_row if last_row is None else last_row
+    if last_row < start_row:
+        return last_row
+    for row in ws.iter_rows(min_row=start_row, max_row=last_row, max_col=last_col):
+        for cell in row:
+            if cell.value is not None and not isinstance(cell, MergedCell):
+                cell.value = None
+    return last_row
+
+
+def write_sheet_rows(ws, data, start_row):
+    """从 start_row 第1列开始逐行写入二维数据"""
+    for r_offset, row in enumerate(data):
+        for c_offset, value in enumerate(row):
+            value = _clean_value(value)
+            cell = ws.cell(row=start_row + r_offset, column=1 + c_offset)
+            if isinstance(cell, MergedCell):
+                continue
+            cell.value = value
+
+
+def write_sheet_chunks(ws, chunks, start_row, sheet_name, log_callback=None):
+    """逐块写入数据，返回写入的总行数"""
+    progress = write_progress_logger(sheet_name, log_callback)
+    offset = 0
+    for chunk in chunks:
+        write_sheet_rows(ws, chunk, start_row + offset)
+        offset += len(chunk)
+        progress(offset)
+    return offset
+
+
+def diff_write_sheet(ws, chunks, start_row, last_col, sheet_name, log_callback=None):
+    """逐块只写入与工作表现有内容不同的行 (见 core.sheet_diff)"""
+    last_row = ws.max_row
+
+    def read_old(offset, count, width):
+        first = start_row + offset
+        return [list(row) for row in ws.iter_rows(min_row=first, max_row=first + count - 1, max_col=width,
+                                                  values_only=True)]
+
+    def write_rows(offset, rows):
+        write_sheet_rows(ws, rows, start_row + offset)
+
+    old_row_count = max(0, last_row - start_row + 1)
+    total, summary, block_count, rows_written = diff_write_chunks(
+        chunks, last_col, old_row_count, read_old, write_rows, write_progress_logger(sheet_name, log_callback))
+    if total < old_row_count:
+        clear_sheet_values(ws, start_row + total, last_col, last_row=last_row)
+    if log_callback: log_callback(format_diff_summary(sheet_name, summary, block_count, rows_written), False)
+
+
+def insert_picture(ws, image_path, anchor="A2", size_cm=REPORT_PICTURE_SIZE_CM, log_callback=None):
+    """删除第2行及以后的旧图片，并在 anchor 处插入新图片"""
+    from openpyxl.drawing.image import Image  # 依赖 Pillow，仅插图时需要
+
+    if log_callback: log_callback(f"正在清除 '{ws.title}' 中第二行及以后所有图片...", False)
+    kept_images = []
+    deleted_count = 0
+    for img in ws._images:
+        anchor_from = getattr(img.anchor, "_from", None)
+        # anchor._from.row 从 0 开始计数，>= 1 即位于第2行及以后
+        if anchor_from is not None and anchor_from.row >= 1:
+            deleted_count += 1
+        else:
+            kept_images.append(img)
+    ws._images = kept_images
+    if log_callback: log_callback(f"已清除 {deleted_count} 张图片。", False)
+
+    img = Image(image_path)
+    img.width = round(size_cm[0] * PIXELS_PER_CM)
+    img.height = round(size_cm[1] * PIXELS_PER_CM)
+    ws.add_image(img, anchor)
+
+
+def consolidate_with_openpyxl(doc1_path: str, doc2_path: str, doc3_path: str, doc4_path: str,
+                              target_report_path: str, log_callback=None,
+                              write_mode: str = CONSOLIDATION_WRITE_MODE_DEFAULT):
+    """
+    openpyxl implementation of consolidate_excel_data_and_insert_chart.
+    Macros are kept for .xlsm targets; shapes and form controls that openpyxl
+    cannot read are not preserved.
+    """
+    source_info = [
+        {'path': path, 'sheet_name': sheet_name}
+        for path, sheet_name in zip((doc1_path, doc2_path, doc3_path), REPORT_SOURCE_SHEETS)
+    ]
+    summary_sources = SummarySources(doc1_path, doc2_path, doc3_path)
+
+    try:
+        if not target_report_path or not os.path.exists(target_report_path):
+            if log_callback: log_callback(
+                f"错误：目标报告文件 '{os.path.basename(target_report_path) if target_report_path else '未指定'}' 不存在或路径为空。",
+                True)
+            return False
+
+        keep_vba = target_report_path.lower().endswith(".xlsm")
+        wb = load_workbook(target_report_path, keep_vba=keep_vba)
+        if log_callback: log_callback(f"已打开目标报告：{os.path.basename(target_report_path)} (openpyxl 引擎)", False)
+
+        for info in source_info:
+            src_path = info['path']
+            target_sheet_name = info['sheet_name']
+
+            if not src_path or not os.path.exists(src_path):
+                if log_callback: log_callback(
+                    f"警告：源文件 '{os.path.basename(src_path) if src_path else target_sheet_name + '文档'}' 未选择或不存在，跳过处理。",
+                    False)
+                continue
+
+            if log_callback: log_callback(
+                f"\n正在处理源文件 '{os.path.basename(src_path)}' -> 工作表 '{target_sheet_name}'", False)
+
+            chunks = open_source_chunks(src_path, log_callback, summary_sources=summary_sources)
+            if chunks is None:
+                continue
+
+            ws = _get_or_create_sheet(wb, target_sheet_name, log_callback)
+            start_row = REPORT_DATA_START_ROW
+            last_col = ws.max_column
+
+            if write_mode == "diff":
+                diff_write_sheet(ws, chunks, start_row, last_col, target_sheet_name, log_callback)
+                continue
+
+            if ws.max_row >= start_row:
+                if log_callback: log_callback(
+                    f"清除 '{target_sheet_name}' 第 {start_row} 行到第 {ws.max_row} 行的内容 (到第 {last_col} 列)...",
+                    False)
+                clear_sheet_values(ws, start_row, last_col)
+            else:
+                if log_callback: log_callback(f"工作表 '{target_sheet_name}' 已经足够干净，无需清除旧数据。", False)
+
+            rows_written = write_sheet_chunks(ws, chunks, start_row, target_sheet_name, log_callback)
+            if rows_written:
+                if log_callback: log_callback(f"已粘贴 {rows_written} 行到 '{target_sheet_name}'。", False)
+            else:
+                if log_callback: log_callback(f"没有数据需要粘贴到 '{target_sheet_name}'。", False)
+
+        if doc4_path and os.path.exists(doc4_path):
+            if log_callback: log_callback(f"\n正在处理图片文件 '{os.path.basename(doc4_path)}'", False)
+            pic_ws = _get_or_create_sheet(wb, REPORT_PICTURE_SHEET, log_callback)
+            try:
+                normalized_doc4_path = os.path.normpath(doc4_path)
+                normalized_doc4_path = prepare_report_picture(normalized_doc4_path, log_callback=log_callback)
+                if log_callback: log_callback(
+                    f"正在插入图片 '{os.path.basename(normalized_doc4_path)}' 到 '{REPORT_PICTURE_SHEET}' 的 'A2'...",
+                    False)
+                insert_picture(pic_ws, normalized_doc4_path, log_callback=log_callback)
+                if log_callback: log_callback("图片插入成功。", False)
+            except ImportError:
+                if log_callback: log_callback("错误: openpyxl 插入图片需要 Pillow，请先安装 Pillow。", True)
+            except Exception as e:
+                if log_callback: log_callback(f"错误: 插入图片到工作表 '{REPORT_PICTURE_SHEET}' 失败。原因: {e}", True)
+                if log_callback: log_callback(traceback.format_exc(), True)
+        else:
+            if log_callback: log_callback(
+                f"警告：图片文件 '{os.path.basename(doc4_path) if doc4_path else '未指定'}' 未选择或不存在，跳过图片插入。",
+                False)
+
+        add_report_summary(wb, write_summary_openpyxl, doc1_path, doc2_path, doc3_path, log_callback,
+                           sources=summary_sources)
+
+        atomic_save_workbook(wb, target_report_path)
+        if log_callback: log_callback("\n✅ 所有数据及图片已成功汇总到目标文件。", False)
+        return True
+
+    except PermissionError:
+        if log_callback: log_callback(
+            f"❌ 无法保存 '{os.path.basename(target_report_path)}'：权限被拒绝，请确保文件已关闭且您有写入权限。", True)
+        return False
+    except Exception as e:
+        if log_callback: log_callback(f"❌ 出现错误：{e}", True)
+        if log_callback: log_callback(f"详细错误信息: {traceback.format_exc()}", True)
+        return False
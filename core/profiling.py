@@ -0,0 +1,310 @@
+# core/profiling.py - 可选的性能分析
+#
+# 开启后 (环境变量 GENREPORT_PROFILE=1，或设置文件 "profiling" 节的 enabled，命令行批处理也可加 --profile)，
+# 每次后台任务 / 命令行批处理在 cProfile 和 tracemalloc 下运行，结果写入 PROFILE_DIR/<时间>-<名称>-<进程>-<序号>/：
+#   profile.prof       cProfile 原始数据，可用 snakeviz 等工具打开
+#   profile.txt        按累计耗时排序的函数列表
+#   allocations.txt    结束时仍占用内存最多的分配位置及其调用栈
+#   summary.json       耗时、内存峰值、最耗时函数和最大分配 (供汇总查看)
+# cProfile 在 Python 3.12 之前只记录运行任务的线程；3.12 起同一时间只能有一个 cProfile 运行，
+# 其他同时开始的任务只记录内存 (summary 中 functions 为空)。
+# tracemalloc 是整个进程共享的，多个任务同时运行时内存统计互相包含 (summary 中有标记)。
+# 进程池子进程中的耗时和内存不计入。
+# 汇总查看最近的运行: python -m core.profiling [--last 10] [--name SeleniumWorker]
+
+import os
+import io
+import re
+import sys
+import json
+import time
+import shutil
+import pstats
+import cProfile
+import argparse
+import functools
+import itertools
+import threading
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+
+from config.settings import (
+    PROFILE_ENV_VAR, PROFILE_DIR, PROFILE_MAX_RUNS, PROFILE_TOP_FUNCTIONS, PROFILE_TOP_ALLOCATIONS,
+    PROFILE_TRACEMALLOC_FRAMES
+)
+
+SUMMARY_FILE = "summary.json"
+
+_lock = threading.Lock()
+_active_runs = 0  # 正在记录的运行数 (tracemalloc 在第一个开始时启动，最后一个结束时停止)
+_started_tracemalloc = False
+_overlap_generation = 0  # 有任务在其他任务记录期间开始时递增，用于判断一次运行期间是否有其他任务同时记录
+_run_numbers = itertools.count(1)
+
+
+def profiling_enabled():
+    """环境变量优先 (可用于临时关闭)，否则使用设置文件中的开关"""
+    value = os.environ.get(PROFILE_ENV_VAR)
+    if value is not None:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    try:
+        from core.settings_store import SETTINGS_STORE
+        return bool(SETTINGS_STORE.section("profiling").get("enabled"))
+    except Exception:
+        return False
+
+
+def _new_run_dir(name):
+    safe_name = re.sub(r"[^\w.-]+", "_", name)
+    run_dir = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{safe_name}-{os.getpid()}-"
+                                        f"{next(_run_numbers)}")
+    os.makedirs(run_dir, exist_ok=True)
+    return run_dir
+
+
+def _start_tracemalloc():
+    """开始记录内存，返回传给 _memory_shared 的标记 (开始时是否有其他运行, 当时的重叠计数)"""
+    global _active_runs, _started_tracemalloc, _overlap_generation
+    with _lock:
+        _active_runs += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            _started_tracemalloc = True
+        shared = _active_runs > 1
+        if shared:
+            _overlap_generation += 1  # 正在记录的其他运行因此也变为共享
+        else:
+            tracemalloc.reset_peak()
+        return shared, _overlap_generation
+
+
+def _memory_shared(token):
+    """本次运行期间是否有其他运行同时记录 (开始时已有，或之后有新的运行开始)"""
+    shared, generation = token
+    with _lock:
+        return shared or _overlap_generation != generation
+
+
+def _stop_tracemalloc():
+    global _active_runs, _started_tracemalloc
+    with _lock:
+        _active_runs -= 1
+        if _active_runs == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+
+def _function_label(key):
+    filename, line, function = key
+    if filename == "~":  # 内置函数
+        return function
+    return f"{function} ({os.path.basename(filename)}:{line})"
+
+
+def _top_functions(stats, sort_index, limit):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][sort_index], reverse=True)[:limit]
+    return [{'function': _function_label(key), 'file': key[0], 'calls': calls,
+             'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4)}
+            for key, (_, calls, tottime, cumtime, _) in rows]
+
+
+def _ignored_frame(frame):
+    return frame.filename in (tracemalloc.__file__, "<unknown>") or frame.filename.startswith("<frozen importlib")
+
+
+def _write_results(run_dir, name, profiler, started, seconds, error, memory_shared):
+    functions, cumulative = [], []
+    if profiler is not None:
+        profiler.dump_stats(os.path.join(run_dir, "profile.prof"))
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(os.path.join(run_dir, "profile.txt"), "w", encoding="utf-8") as f:
+            f.write(stream.getvalue())
+        functions = _top_functions(stats, 2, PROFILE_TOP_FUNCTIONS)  # 按自身耗时
+        cumulative = _top_functions(stats, 3, PROFILE_TOP_FUNCTIONS)  # 按累计耗时
+
+    current, peak = tracemalloc.get_traced_memory()
+    # 不用 filter_traces 排除 tracemalloc 自身等位置：逐条过滤对大快照很慢，这里在统计结果中跳过
+    snapshot = tracemalloc.take_snapshot()
+    by_line = [stat for stat in snapshot.statistics("lineno")
+               if not _ignored_frame(stat.traceback[0])][:PROFILE_TOP_ALLOCATIONS]
+    allocations = [{'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size_kb': round(stat.size / 1024, 1), 'count': stat.count} for stat in by_line]
+    by_traceback = [stat for stat in snapshot.statistics("traceback")
+                    if not _ignored_frame(stat.traceback[-1])][:PROFILE_TOP_ALLOCATIONS]
+    with open(os.path.join(run_dir, "allocations.txt"), "w", encoding="utf-8") as f:
+        f.write(f"结束时占用 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB\n\n")
+        for index, stat in enumerate(by_traceback, start=1):
+            f.write(f"#{index}: {stat.size / 1024:.1f} KB，{stat.count} 个对象\n")
+            for line in stat.traceback.format():
+                f.write(f"    {line}\n")
+            f.write("\n")
+
+    summary = {
+        'name': name,
+        'started': datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+        'seconds': round(seconds, 3),
+        'error': error,
+        'pid': os.getpid(),
+        'thread': threading.current_thread().name,
+        'current_mb': round(current / 1024 / 1024, 1),
+        'peak_mb': round(peak / 1024 / 1024, 1),
+        'memory_shared': memory_shared,  # 记录期间有其他任务同时运行，内存统计包含它们的分配
+        'functions': functions,
+        'cumulative': cumulative,
+        'allocations': allocations,
+    }
+    with open(os.path.join(run_dir, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+def _prune_runs(keep=PROFILE_MAX_RUNS):
+    try:
+        runs = sorted(entry for entry in os.listdir(PROFILE_DIR) if os.path.isdir(os.path.join(PROFILE_DIR, entry)))
+    except OSError:
+        return
+    for entry in runs[:max(0, len(runs) - keep)]:
+        shutil.rmtree(os.path.join(PROFILE_DIR, entry), ignore_errors=True)
+
+
+@contextmanager
+def profile_run(name, enabled=None, log_callback=None):
+    """
+    在 cProfile 和 tracemalloc 下执行 with 块；未开启性能分析时不做任何事。
+    产生本次运行的结果目录 (未开启时为 None)。记录失败只提示，不影响任务本身。
+    """
+    if not (profiling_enabled() if enabled is None else enabled):
+        yield None
+        return
+    run_dir = _new_run_dir(name)
+    memory_token = _start_tracemalloc()
+    started = time.time()
+    start = time.perf_counter()
+    error = None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # 另一个任务的 cProfile 正在运行
+        profiler = None
+        if log_callback: log_callback("提示: 其他任务正在进行性能分析，本次只记录内存。", False)
+    try:
+        yield run_dir
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        seconds = time.perf_counter() - start
+        try:
+            _write_results(run_dir, name, profiler, started, seconds, error, _memory_shared(memory_token))
+            _prune_runs()
+            if log_callback: log_callback(f"性能分析结果已保存到: {run_dir}", False)
+        except Exception as e:
+            if log_callback: log_callback(f"保存性能分析结果失败: {e}", True)
+        finally:
+            _stop_tracemalloc()
+
+
+def profiled(name=None):
+    """
+    工作线程 run() 的装饰器：开启性能分析时记录整个 run()。
+    name 为字符串或以工作线程为参数的函数，缺省为类名。
+    """
+    def decorate(run):
+        @functools.wraps(run)
+        def wrapper(self, *args, **kwargs):
+            label = name(self) if callable(name) else (name or type(self).__name__)
+            log_signal = getattr(self, "log_signal", None)
+            log_callback = (lambda msg, is_err=False: log_signal.emit(msg, is_err)) if log_signal else None
+            with profile_run(label, log_callback=log_callback):
+                return run(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- 汇总查看 ---
+
+def load_runs(profile_dir=PROFILE_DIR, last=10, name=None):
+    """最近 last 次运行的 summary (按时间从早到晚)；name 只选名称中包含该字符串的运行"""
+    summaries = []
+    try:
+        entries = sorted(os.listdir(profile_dir))
+    except OSError:
+        return summaries
+    for entry in reversed(entries):
+        path = os.path.join(profile_dir, entry, SUMMARY_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if name and name.lower() not in summary.get('name', '').lower():
+            continue
+        summary['dir'] = os.path.join(profile_dir, entry)
+        summaries.append(summary)
+        if len(summaries) >= last:
+            break
+    return list(reversed(summaries))
+
+
+def aggregate_functions(summaries, key="tottime", limit=20):
+    """各次运行的函数耗时合计：[(函数, 合计秒数, 出现次数, 最大单次秒数)]"""
+    totals = {}
+    for summary in summaries:
+        for item in summary.get('functions' if key == "tottime" else 'cumulative', []):
+            total, runs, largest = totals.get(item['function'], (0.0, 0, 0.0))
+            totals[item['function']] = (total + item[key], runs + 1, max(largest, item[key]))
+    rows = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    return [(function, total, runs, largest) for function, (total, runs, largest) in rows]
+
+
+def aggregate_allocations(summaries, limit=20):
+    """各次运行中的最大分配位置：[(位置, 最大 KB, 出现次数)]"""
+    largest = {}
+    for summary in summaries:
+        for item in summary.get('allocations', []):
+            size, runs = largest.get(item['location'], (0.0, 0))
+            largest[item['location']] = (max(size, item['size_kb']), runs + 1)
+    rows = sorted(largest.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    return [(location, size, runs) for location, (size, runs) in rows]
+
+
+def format_overview(summaries, limit=20):
+    if not summaries:
+        return f"没有性能分析记录 ({PROFILE_DIR})。设置环境变量 {PROFILE_ENV_VAR}=1 后重新运行任务即可记录。"
+    lines = [f"最近 {len(summaries)} 次运行:"]
+    for summary in summaries:
+        shared = " (内存统计含同时运行的任务)" if summary.get('memory_shared') else ""
+        failed = f"  异常: {summary['error']}" if summary.get('error') else ""
+        lines.append(f"  {summary['started']}  {summary['name']:<28} {summary['seconds']:9.2f} s  "
+                     f"峰值 {summary['peak_mb']:8.1f} MB{shared}{failed}")
+        lines.append(f"      {summary['dir']}")
+
+    lines.append(f"\n最耗时的函数 (自身耗时，{len(summaries)} 次运行合计):")
+    for function, total, runs, largest in aggregate_functions(summaries, "tottime", limit):
+        lines.append(f"  {total:9.3f} s  {runs:3} 次运行  单次最多 {largest:8.3f} s  {function}")
+    lines.append("\n累计耗时最多的函数:")
+    for function, total, runs, largest in aggregate_functions(summaries, "cumtime", limit):
+        lines.append(f"  {total:9.3f} s  {runs:3} 次运行  单次最多 {largest:8.3f} s  {function}")
+    lines.append("\n占用内存最多的分配位置 (任务结束时):")
+    for location, size, runs in aggregate_allocations(summaries, limit):
+        lines.append(f"  {size:10.1f} KB  {runs:3} 次运行  {location}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="汇总最近的性能分析记录")
+    parser.add_argument("--last", type=int, default=10, help="汇总最近几次运行")
+    parser.add_argument("--name", default=None, help="只看名称包含该字符串的运行，例如 SeleniumWorker")
+    parser.add_argument("--top", type=int, default=20, help="每个列表显示的条数")
+    parser.add_argument("--dir", default=PROFILE_DIR, help="性能分析结果目录")
+    args = parser.parse_args(argv)
+    print(format_overview(load_runs(args.dir, args.last, args.name), args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
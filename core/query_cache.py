@@ -0,0 +1,161 @@
+# core/query_cache.py - BUG 查询结果缓存
+#
+# 以 (禅道地址, 查询使用的账号, 产品, 规范化后的查询条件) 的哈希为键 (不同账号在禅道中的权限不同，结果不能共用)，把查询结果保存在 CACHE_DIR/bug_queries 中，
+# 每个条目一个文件。读取时更新文件的修改时间，超出条目数或总大小上限时删除最久未使用的条目 (LRU)。
+# 条目在 TTL 内为“新鲜”，可直接使用；超过 TTL 的条目仍会返回 (标记为过期)，
+# 由调用方先显示、再在后台重新查询 (stale-while-revalidate)，并用结果摘要判断数据是否变化。
+
+import os
+import json
+import time
+import pickle
+import hashlib
+
+from core.file_utils import atomic_write_bytes
+from config.settings import CACHE_DIR, BUG_QUERY_CACHE_TTL, BUG_QUERY_CACHE_MAX_ENTRIES, BUG_QUERY_CACHE_MAX_MB
+
+QUERY_CACHE_DIR = os.path.join(CACHE_DIR, "bug_queries")
+# 条目格式变化时递增，使旧的缓存失效
+CACHE_VERSION = 2
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def result_digest(bugs):
+    """查询结果的摘要，用于判断后台刷新得到的数据是否与缓存相同"""
+    data = json.dumps(bugs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class CachedResult:
+    def __init__(self, bugs, digest, created, ttl):
+        self.bugs = bugs
+        self.digest = digest
+        self.created = created
+        self.ttl = ttl
+
+    @property
+    def age(self):
+        return max(0.0, time.time() - self.created)
+
+    @property
+    def is_fresh(self):
+        return self.age < self.ttl
+
+
+class QueryResultCache:
+    def __init__(self, cache_dir=QUERY_CACHE_DIR, ttl=BUG_QUERY_CACHE_TTL,
+                 max_entries=BUG_QUERY_CACHE_MAX_ENTRIES, max_bytes=BUG_QUERY_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # 本次运行的统计
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_unchanged = 0
+        self.refresh_changed = 0
+
+    @staticmethod
+    def make_key(base_url, account, product_name, query_params):
+        """相同账号下相同含义的查询条件 (首尾空白、空字符串与 None、键的顺序不同) 得到相同的键"""
+        normalized = {
+            'base_url': (base_url or '').rstrip('/'),
+            'account': _normalize(account),
+            'product': _normalize(product_name),
+            'params': {key: _normalize(value) for key, value in (query_params or {}).items()},
+        }
+        data = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, key):
+        """返回 CachedResult (可能已过期，见 is_fresh)，没有缓存时返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                version, stored_key, created, digest, bugs = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            self._remove(path)  # 损坏的条目
+            self.misses += 1
+            return None
+        if version != CACHE_VERSION or stored_key != key:
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # 记录最近使用时间，供 LRU 淘汰
+        except OSError:
+            pass
+        result = CachedResult(bugs, digest, created, self.ttl)
+        if result.is_fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return result
+
+    def put(self, key, bugs):
+        """保存查询结果并按上限淘汰旧条目，返回结果摘要；写入失败不影响查询"""
+        digest = result_digest(bugs)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data = pickle.dumps((CACHE_VERSION, key, time.time(), digest, bugs), protocol=pickle.HIGHEST_PROTOCOL)
+            atomic_write_bytes(self._path(key), data)
+            self._evict()
+        except OSError:
+            pass
+        return digest
+
+    def record_refresh(self, changed):
+        if changed:
+            self.refresh_changed += 1
+        else:
+            self.refresh_unchanged += 1
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()  # 最久未使用的在前
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pkl"):
+                    self._remove(os.path.join(self.cache_dir, name))
+
+    def stats_text(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        rate = (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        return (f"查询缓存: 命中 {self.hits}，过期命中 {self.stale_hits}，未命中 {self.misses} (命中率 {rate:.0%})；"
+                f"后台刷新 数据变化 {self.refresh_changed} 次，未变化 {self.refresh_unchanged} 次")
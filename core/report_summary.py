@@ -0,0 +1,368 @@
+# core/report_summary.py - 报告数据汇总页
+#
+# 从三份禅道导出 (缺陷、需求、测试用例) 计算报告中常用的统计结果：
+#   缺陷按严重程度 / 状态 / 模块 / 指派人计数，需求的用例覆盖情况，用例执行结果及通过率。
+# 只读取统计需要的列，用 pandas 做向量化的计数；结果写入“数据汇总”工作表，
+# 汇总引擎写数据表时通过 SummarySources 顺带收集这些列，源文件只解析一次。
+# 每张统计表旁插入一个 Excel 原生图表 (openpyxl 与 xlwings 引擎各有一个写入函数，布局相同)。
+
+import os
+import traceback
+
+import pandas as pd
+from openpyxl.chart import BarChart, PieChart, Reference
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from core.xlsx_readers import iter_rows
+from config.settings import REPORT_SUMMARY_SHEET, REPORT_SUMMARY_TOP_N, REPORT_SUMMARY_COLUMNS
+
+# 禅道导出中的代码值 -> 报告中显示的名称 (中文导出本身已是名称，原样保留)
+_SEVERITY_NAMES = {"1": "1-严重", "2": "2-主要", "3": "3-次要", "4": "4-建议"}
+_STATUS_NAMES = {"active": "激活", "resolved": "已解决", "closed": "已关闭"}
+_RESULT_NAMES = {"pass": "通过", "fail": "失败", "blocked": "阻塞", "n/a": "忽略"}
+_CLOSED_STATUS = "已关闭"
+_PASSED_RESULT = "通过"
+_NOT_RUN_RESULT = "未执行"
+
+# 图表放在统计表右侧的 E 列，尺寸 15 x 7.5 厘米，约占 16 行 (默认行高)
+_CHART_COLUMN = 5
+_CHART_SIZE_CM = (15, 7.5)
+_CHART_ROWS = 16
+_XLWINGS_CHART_TYPES = {"column": "column_clustered", "bar": "bar_clustered", "pie": "pie"}
+POINTS_PER_CM = 28.3465
+
+
+class SummaryTable:
+    """
+    一张统计表：rows 为 [[标签, 数值], ...]。chart_type 为 'column' / 'bar' / 'pie'，None 表示不画图；
+    percent_rows 中的行 (从 0 开始) 的数值按百分比格式显示。
+    """
+
+    def __init__(self, title, headers, rows, chart_type=None, percent_rows=()):
+        self.title = title
+        self.headers = headers
+        self.rows = rows
+        self.chart_type = chart_type
+        self.percent_rows = set(percent_rows)
+
+
+class ReportSummary:
+    def __init__(self, tables):
+        self.tables = tables
+
+
+# --- 统计 ---
+
+def _wanted_columns(prefix):
+    return {key: names for key, names in REPORT_SUMMARY_COLUMNS.items() if key.startswith(prefix)}
+
+
+class _ColumnCollector:
+    """按表头找出 wanted ({键: 候选列名列表}) 中的列，逐块收集这些列的值 (跳过空行)"""
+
+    def __init__(self, header_row, wanted):
+        header = ["" if value is None else str(value).strip() for value in (header_row or [])]
+        self.indices = {}
+        for key, names in wanted.items():
+            for name in names:
+                if name in header:
+                    self.indices[key] = header.index(name)
+                    break
+        self.missing = [key for key in wanted if key not in self.indices]
+        self.columns = {key: [] for key in self.indices}
+        self.count = 0
+
+    def add(self, rows):
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            self.count += 1
+            for key, i in self.indices.items():
+                self.columns[key].append(row[i] if i < len(row) else None)
+
+    def frame(self):
+        return pd.DataFrame(self.columns, index=pd.RangeIndex(self.count), dtype=object)
+
+
+def read_source_columns(path, wanted, backend=None):
+    """
+    读取源文件的表头 (第1行)，只收集 wanted ({键: 候选列名列表}) 中能找到的列。
+    返回 (DataFrame，列名为键、每个非空数据行一行；表头中找不到的键列表)。
+    """
+    rows = iter_rows(path, skip_rows=0, backend=backend)
+    collector = _ColumnCollector(next(rows, None), wanted)
+    collector.add(rows)
+    return collector.frame(), collector.missing
+
+
+class SummarySources:
+    """
+    汇总引擎写入数据表时顺带收集统计列：watch() 包装源文件的数据块迭代器，数据块经过时取出统计需要的列。
+    只有完整读完的源文件才会被使用；写入中途失败的源文件在计算汇总时仍从磁盘读取。
+    """
+
+    def __init__(self, bug_path=None, story_path=None, case_path=None):
+        self._prefixes = {}
+        for path, prefix in ((bug_path, "bug_"), (story_path, "story_"), (case_path, "case_")):
+            if path:
+                self._prefixes.setdefault(path, []).append(prefix)
+        self._collected = {}  # (路径, 前缀) -> (DataFrame, 找不到的键)
+
+    def watch(self, path, header_row, chunks):
+        """返回与 chunks 相同的数据块迭代器；header_row 为源文件第1行"""
+        prefixes = self._prefixes.get(path)
+        if not prefixes:
+            return chunks
+        return self._collect(path, {prefix: _ColumnCollector(header_row, _wanted_columns(prefix))
+                                    for prefix in prefixes}, chunks)
+
+    def _collect(self, path, collectors, chunks):
+        for chunk in chunks:
+            for collector in collectors.values():
+                collector.add(chunk)
+            yield chunk
+        for prefix, collector in collectors.items():
+            self._collected[(path, prefix)] = (collector.frame(), collector.missing)
+
+    def get(self, path, prefix):
+        """返回已收集的 (DataFrame, 找不到的键)，没有完整收集时返回 None"""
+        return self._collected.get((path, prefix))
+
+
+def _labels(series, empty_label, names=None):
+    """把一列单元格值规范为文本标签：整数值去掉小数点，空白为 empty_label，names 把代码值映射为名称"""
+    numeric = pd.to_numeric(series, errors="coerce")
+    integral = numeric.notna() & (numeric % 1 == 0)
+    text = series.astype("string").str.strip()
+    text = text.mask(integral, numeric.where(integral).astype("Int64").astype("string"))
+    text = text.replace("", pd.NA)
+    if names:
+        text = text.str.lower().map(names).fillna(text)
+    return text.fillna(empty_label).astype(str)
+
+
+def _count_table(title, header, labels, chart_type, top_n=None, sort_by_label=False):
+    counts = labels.value_counts()
+    if sort_by_label:
+        counts = counts.sort_index()
+    if top_n and len(counts) > top_n:
+        counts = pd.concat([counts.iloc[:top_n], pd.Series({"其他": counts.iloc[top_n:].sum()})])
+    rows = [[label, int(count)] for label, count in counts.items()]
+    return SummaryTable(title, [header, "数量"], rows, chart_type)
+
+
+def _ratio(part, total):
+    return part / total if total else 0.0
+
+
+def _summarize_bugs(bugs, metrics):
+    tables = []
+    metrics.append(["缺陷总数", len(bugs)])
+    if "bug_status" in bugs:
+        status = _labels(bugs["bug_status"], "(空)", _STATUS_NAMES)
+        metrics.append(["未关闭缺陷", int((status != _CLOSED_STATUS).sum())])
+        tables.append(_count_table("缺陷状态分布", "状态", status, "pie"))
+    if "bug_severity" in bugs:
+        severity = _labels(bugs["bug_severity"], "(空)", _SEVERITY_NAMES)
+        tables.insert(0, _count_table("缺陷严重程度分布", "严重程度", severity, "column", sort_by_label=True))
+    if "bug_module" in bugs:
+        tables.append(_count_table("缺陷模块分布", "模块", _labels(bugs["bug_module"], "(无模块)"), "bar",
+                                   top_n=REPORT_SUMMARY_TOP_N))
+    if "bug_assignee" in bugs:
+        tables.append(_count_table("缺陷指派人分布", "指派给", _labels(bugs["bug_assignee"], "(未指派)"), "bar",
+                                   top_n=REPORT_SUMMARY_TOP_N))
+    return tables
+
+
+def _linked_story_ids(cases):
+    """用例的“相关研发需求”列形如 '需求标题(#12)' 或直接为编号，返回其中引用的需求编号集合"""
+    refs = _labels(cases["case_story"], "")
+    linked = set(refs.str.extractall(r"#(\d+)")[0])
+    linked.update(refs[refs.str.fullmatch(r"\d+")])
+    return linked
+
+
+def _summarize_coverage(stories, cases, metrics):
+    covered = pd.Series(False, index=stories.index)
+    sources = []
+    if "story_case_count" in stories:
+        covered |= pd.to_numeric(stories["story_case_count"], errors="coerce").fillna(0) > 0
+        sources.append("用例数")
+    if "story_id" in stories and cases is not None and "case_story" in cases:
+        covered |= _labels(stories["story_id"], "").isin(_linked_story_ids(cases))
+        sources.append("用例关联")
+    metrics.append(["需求总数", len(stories)])
+    if not sources:
+        return [], False
+    covered_count = int(covered.sum())
+    metrics.append(["已覆盖需求", covered_count])
+    metrics.append(["需求覆盖率", _ratio(covered_count, len(stories))])
+    table = SummaryTable("需求用例覆盖", ["覆盖情况", "数量"],
+                         [["已覆盖", covered_count], ["未覆盖", len(stories) - covered_count]], "pie")
+    return [table], True
+
+
+def _summarize_cases(cases, metrics):
+    metrics.append(["用例总数", len(cases)])
+    if "case_result" not in cases:
+        return []
+    results = _labels(cases["case_result"], _NOT_RUN_RESULT, _RESULT_NAMES)
+    executed = int((results != _NOT_RUN_RESULT).sum())
+    passed = int((results == _PASSED_RESULT).sum())
+    metrics.append(["已执行用例", executed])
+    metrics.append(["用例通过率 (已执行)", _ratio(passed, executed)])
+    return [_count_table("用例执行结果", "结果", results, "pie")]
+
+
+def _read_source(path, prefix, description, log_callback=None, sources=None):
+    if not path or not os.path.exists(path):
+        return None
+    collected = sources.get(path, prefix) if sources is not None else None
+    if collected is not None:
+        df, missing = collected
+    else:
+        try:
+            df, missing = read_source_columns(path, _wanted_columns(prefix))
+        except Exception as e:
+            if log_callback: log_callback(f"错误: 读取{description} '{os.path.basename(path)}' 失败，跳过相关统计。原因: {e}", True)
+            return None
+    if missing and log_callback:
+        names = "、".join(REPORT_SUMMARY_COLUMNS[key][0] for key in missing)
+        log_callback(f"提示: {description}中未找到列 {names}，相关统计将跳过。", False)
+    return df
+
+
+def compute_report_summary(bug_path=None, story_path=None, case_path=None, log_callback=None, sources=None):
+    """
+    根据缺陷、需求、用例导出计算统计表；三份文档均可缺省。没有任何可统计的数据时返回 None。
+    sources 为写入数据表时收集了统计列的 SummarySources，其中没有的文档才从磁盘读取。
+    """
+    bugs = _read_source(bug_path, "bug_", "缺陷列表", log_callback, sources)
+    stories = _read_source(story_path, "story_", "需求列表", log_callback, sources)
+    cases = _read_source(case_path, "case_", "测试用例", log_callback, sources)
+
+    metrics = []
+    tables = []
+    if bugs is not None:
+        tables += _summarize_bugs(bugs, metrics)
+    if stories is not None:
+        coverage_tables, has_coverage = _summarize_coverage(stories, cases, metrics)
+        tables += coverage_tables
+        if not has_coverage and log_callback:
+            log_callback("提示: 需求列表中没有用例数，测试用例中也没有相关需求列，无法计算需求覆盖率。", False)
+    if cases is not None:
+        tables += _summarize_cases(cases, metrics)
+    if not metrics:
+        return None
+
+    percent_rows = [i for i, (_, value) in enumerate(metrics) if isinstance(value, float)]
+    return ReportSummary([SummaryTable("汇总指标", ["指标", "值"], metrics, percent_rows=percent_rows)] + tables)
+
+
+# --- 写入 ---
+
+def summary_layout(summary):
+    """依次返回 (统计表, 起始行)：每张表占 标题行 + 表头行 + 数据行，有图表时至少占图表的高度，表之间空一行"""
+    row = 1
+    for table in summary.tables:
+        yield table, row
+        height = len(table.rows) + 2
+        if table.chart_type:
+            height = max(height, _CHART_ROWS)
+        row += height + 1
+
+
+def _openpyxl_chart(ws, table, row):
+    header_row = row + 1
+    last_row = header_row + len(table.rows)
+    if table.chart_type == "pie":
+        chart = PieChart()
+    else:
+        chart = BarChart()
+        chart.type = "bar" if table.chart_type == "bar" else "col"
+        chart.legend = None
+    chart.title = table.title
+    chart.add_data(Reference(ws, min_col=2, min_row=header_row, max_row=last_row), titles_from_data=True)
+    chart.set_categories(Reference(ws, min_col=1, min_row=header_row + 1, max_row=last_row))
+    chart.width, chart.height = _CHART_SIZE_CM
+    return chart
+
+
+def write_summary_openpyxl(wb, summary, sheet_name=REPORT_SUMMARY_SHEET):
+    """把统计表和图表写入 sheet_name 工作表 (已存在时先清除其内容和图表)"""
+    if sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+        ws.delete_rows(1, ws.max_row)
+        ws._charts = []
+    else:
+        ws = wb.create_sheet(title=sheet_name)
+
+    bold = Font(bold=True)
+    for table, row in summary_layout(summary):
+        ws.cell(row=row, column=1, value=table.title).font = bold
+        for col, header in enumerate(table.headers, start=1):
+            ws.cell(row=row + 1, column=col, value=header).font = bold
+        for r_offset, values in enumerate(table.rows):
+            for col, value in enumerate(values, start=1):
+                cell = ws.cell(row=row + 2 + r_offset, column=col, value=value)
+                if col == 2 and r_offset in table.percent_rows:
+                    cell.number_format = "0.0%"
+        if table.chart_type and table.rows:
+            ws.add_chart(_openpyxl_chart(ws, table, row), f"{get_column_letter(_CHART_COLUMN)}{row}")
+    ws.column_dimensions["A"].width = 24
+
+
+def write_summary_xlwings(wb, summary, sheet_name=REPORT_SUMMARY_SHEET):
+    """xlwings 版本的 write_summary_openpyxl，图表为 Excel 原生图表"""
+    if sheet_name in [s.name for s in wb.sheets]:
+        sht = wb.sheets[sheet_name]
+        for chart in list(sht.charts):
+            chart.delete()
+        sht.cells.clear()
+    else:
+        sht = wb.sheets.add(name=sheet_name, after=wb.sheets[-1])
+
+    for table, row in summary_layout(summary):
+        # 整张表一次写入，减少 COM 调用
+        sht.range((row, 1)).value = [[table.title, None], list(table.headers)] + [list(values) for values in table.rows]
+        sht.range((row, 1), (row + 1, len(table.headers))).font.bold = True
+        for r_offset in table.percent_rows:
+            sht.range((row + 2 + r_offset, 2)).number_format = "0.0%"
+        if table.chart_type and table.rows:
+            anchor = sht.range((row, _CHART_COLUMN))
+            chart = sht.charts.add(left=anchor.left, top=anchor.top,
+                                   width=_CHART_SIZE_CM[0] * POINTS_PER_CM, height=_CHART_SIZE_CM[1] * POINTS_PER_CM)
+            chart.set_source_data(sht.range((row + 1, 1), (row + 1 + len(table.rows), 2)))
+            chart.chart_type = _XLWINGS_CHART_TYPES[table.chart_type]
+            try:
+                chart.api[1].HasTitle = True
+                chart.api[1].ChartTitle.Text = table.title
+            except Exception:
+                pass  # 图表标题只能通过 Windows 的 COM 接口设置
+    sht.range("A:A").column_width = 24
+
+
+def add_report_summary(wb, writer, bug_path, story_path, case_path, log_callback=None,
+                       sheet_name=REPORT_SUMMARY_SHEET, sources=None):
+    """
+    计算统计结果并用 writer (write_summary_openpyxl / write_summary_xlwings) 写入工作簿；
+    sources 见 compute_report_summary。
+    汇总页是附加内容：失败时只记录日志，不影响数据表的汇总结果。返回是否已写入。
+    """
+    if not sheet_name:
+        return False
+    if log_callback: log_callback(f"\n正在计算数据汇总 -> 工作表 '{sheet_name}'...", False)
+    try:
+        summary = compute_report_summary(bug_path, story_path, case_path, log_callback, sources)
+        if summary is None:
+            if log_callback: log_callback("没有可统计的源文档，跳过数据汇总页。", False)
+            return False
+        writer(wb, summary, sheet_name)
+    except Exception as e:
+        if log_callback: log_callback(f"错误: 生成数据汇总页失败。原因: {e}", True)
+        if log_callback: log_callback(traceback.format_exc(), True)
+        return False
+    charts = sum(1 for table in summary.tables if table.chart_type and table.rows)
+    if log_callback: log_callback(f"已生成数据汇总页 '{sheet_name}'：{len(summary.tables)} 张统计表，{charts} 个图表。", False)
+    return True
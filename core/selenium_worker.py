@@ -3,20 +3,64 @@ import os
 import time
 import traceback
 import re  # Import for regex
+from datetime import datetime
 
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.common.keys import Keys
 
 from PyQt5.QtCore import QThread, pyqtSignal
 
-from config.settings import EDGEDRIVER_PATH, DOWNLOAD_DIR, ZEN_TAO_BASE_URL  # Import necessary settings
+from config.settings import (  # Import necessary settings
+    ZEN_TAO_BASE_URL, FUZZY_MATCH_TOP_K, BUG_QUERY_PAGE_SIZE, BUG_QUERY_MAX_PAGES
+)
+from core.session_broker import SESSION_BROKER
+from core.fuzzy_match import FuzzyIndex, is_ambiguous
+from core.profiling import profiled
+from core.bug_search import search_conditions, post_search, browse_url, extract_rows, matches_locally
+
+PRODUCT_LIST_PATH = "/product-all-0-0-noclosed-order_desc-849-2000-1.html"
+
+
+def rank_products(driver, base_url, product_name, k=FUZZY_MATCH_TOP_K):
+    """
+    打开产品列表页，按与 product_name 的匹配度返回前 k 个产品 [(FuzzyMatch, 产品ID), ...]。
+    产品名称和链接通过一次脚本调用取回，避免逐个元素读取。
+    """
+    driver.get(f"{base_url}{PRODUCT_LIST_PATH}")
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="product-view"]'))
+    )
+    links = driver.execute_script(
+        "return Array.from(document.querySelectorAll('a[href*=\"/product-view-\"]'))"
+        ".map(function (a) { return [a.textContent.trim(), a.href]; });"
+    )
+    products = []
+    for text, href in links:
+        match = re.search(r'product-view-(\d+)', href or '')
+        if match and text:
+            products.append((text, match.group(1)))
+    index = FuzzyIndex([text for text, _ in products])
+    return [(match, products[match.index][1]) for match in index.search(product_name, k=k)]
+
+
+def select_product(ranked, product_name, log_callback):
+    """
+    从 rank_products 的结果中选择产品ID：只接受名称包含关键词的产品，取匹配度最高的一个。
+    有多个相近候选时在日志中列出，便于发现命中错误的产品。
+    """
+    if not ranked or not ranked[0][0].contains:
+        if ranked:
+            log_callback(f"相近的产品: {', '.join(match.text for match, _ in ranked)}", True)
+        return None
+    best_match, product_id = ranked[0]
+    if is_ambiguous([match for match, _ in ranked]):
+        log_callback(f"提示: '{product_name}' 匹配到多个产品，已选择匹配度最高的 '{best_match.text}'。其他候选: "
+                     + ", ".join(f"{match.text} ({match.score:.0%})" for match, _ in ranked[1:]), False)
+    return product_id
 
 class UserInfo:
     """用户信息数据类"""
@@ -52,108 +96,130 @@ class SeleniumWorker(QThread):
         self.headless_mode = headless_mode
         self.task_type = task_type  # "export" 或 "login_only"
         self.driver = None
+        self.session = None
         self.user_info = UserInfo()
 
+    @profiled(lambda worker: f"SeleniumWorker-{worker.task_type}")
     def run(self):
         """Main execution logic for Selenium operations."""
         try:
-            self.log_signal.emit("初始化浏览器中...", False)
             self.progress_signal.emit(5)
-            self.driver = self._setup_driver()
-            if not self.driver:
-                self.finished_signal.emit(False, "浏览器启动失败。")
-                return
-
-            self.log_signal.emit("尝试登录禅道...", False)
-            self.progress_signal.emit(15)
-            if not self._login(self.driver, self.base_url, self.account, self.password):
-                self.finished_signal.emit(False, "登录失败，请检查账号密码。")
-                return
-
-            # 登录成功后获取用户信息
-            self.log_signal.emit("获取用户信息中...", False)
-            self.progress_signal.emit(25)
-            self._get_user_info()
-
-            # 发送用户信息信号
-            self.user_info_signal.emit(self.user_info)
-
-            if self.task_type == "login_only":
-                # 如果只是登录获取用户信息，直接结束
-                self.finished_signal.emit(True, "登录成功，用户信息已获取。")
-                self.progress_signal.emit(100)
-                return
-
-            self.log_signal.emit(f"查找产品: '{self.product_name}'...", False)
-            self.progress_signal.emit(30)
-            product_id = self._find_product_id_by_name(self.driver, self.base_url, self.product_name)
-
-            if not product_id:
-                self.finished_signal.emit(False, f"未找到产品：'{self.product_name}'。")
-                return
-
-            self.log_signal.emit(f"产品ID: {product_id}。开始导出...", False)
-            self.progress_signal.emit(40)
+            with SESSION_BROKER.session(self.account, self.password, self.headless_mode,
+                                        download_dir=self.download_dir or None, base_url=self.base_url,
+                                        log_callback=self._emit_log) as session:
+                self.session = session
+                self.driver = session.driver
+                self._run_in_session()
+        except RuntimeError as e:
+            # 浏览器启动或登录失败，详细原因已写入日志
+            self.finished_signal.emit(False, str(e))
+        except Exception as e:
+            self.log_signal.emit(f"任务执行异常: {e}", True)
+            self.log_signal.emit(traceback.format_exc(), True)
+            self.finished_signal.emit(False, f"任务执行异常: {e}")
+        finally:
+            # 浏览器由会话代理持有，供后续任务复用，这里不再退出
+            self.driver = None
+            self.session = None
 
-            # Navigate to product view and browse pages first to establish context
-            self.log_signal.emit(f"导航到产品详情页...", False)
-            self.driver.get(f"{self.base_url}/product-view-{product_id}.html")
-            time.sleep(1)
+    def _emit_log(self, message, is_error=False):
+        self.log_signal.emit(message, is_error)
 
-            self.log_signal.emit(f"导航到产品浏览页...", False)
-            self.driver.get(f"{self.base_url}/product-browse-{product_id}.html")
-            time.sleep(1)
+    def _cancelled(self):
+        """任务被取消 (任务列表或进度对话框) 时结束任务；在两个 Selenium 步骤之间检查"""
+        if not self.isInterruptionRequested():
+            return False
+        self.log_signal.emit("任务已取消，已完成的步骤不会回滚。", True)
+        self.finished_signal.emit(False, "任务已取消。")
+        return True
 
-            # Export Requirements
-            self.log_signal.emit("\n--- 导出需求中 ---", False)
-            self.progress_signal.emit(50)
-            if not self._export_requirements(self.driver, self.base_url, product_id, '[公共] 验收报告'):
-                self.finished_signal.emit(False, "导出需求失败。")
-                return
-            self.log_signal.emit("需求导出完成。", False)
-            self.progress_signal.emit(70)
-
-            # Navigate to QA/Bug browse page before exporting bugs
-            self.log_signal.emit(f"导航到 QA 浏览页...", False)
-            self.driver.get(f"{self.base_url}/qa/")
-            time.sleep(1)
-            self.log_signal.emit(f"导航到 Bug 浏览页...", False)
-            self.driver.get(f"{self.base_url}/bug-browse-{product_id}.html")
-            time.sleep(1)
+    def _run_in_session(self):
+        """在已登录的会话中执行任务"""
+        self.progress_signal.emit(15)
 
-            # Export Unclosed Bugs
-            self.log_signal.emit("\n--- 导出未关闭 Bug 中 ---", False)
-            self.progress_signal.emit(80)
-            if not self._export_unclosed_bugs(self.driver, self.base_url, product_id, '[公共]  验收报告V1.0'):
-                self.finished_signal.emit(False, "导出未关闭 Bug 失败。")
-                return
-            self.log_signal.emit("未关闭 Bug 导出完成。", False)
-            self.progress_signal.emit(90)
-
-            # Navigate to Test Cases browse page before exporting test cases
-            self.log_signal.emit(f"导航到测试单浏览页...", False)
-            self.driver.get(f"{self.base_url}/testcase-browse-{product_id}.html")
-            time.sleep(1)
+        # 登录成功后获取用户信息
+        self.log_signal.emit("获取用户信息中...", False)
+        self.progress_signal.emit(25)
+        self._get_user_info()
 
-            # Export Test Cases
-            self.log_signal.emit("\n--- 导出测试单中 ---", False)
-            self.progress_signal.emit(95)
-            if not self._export_test_cases(self.driver, self.base_url, product_id, '[公共] 验收报告'):
-                self.finished_signal.emit(False, "导出测试单失败。")
-                return
-            self.log_signal.emit("测试单导出完成。", False)
+        # 发送用户信息信号
+        self.user_info_signal.emit(self.user_info)
 
-            self.finished_signal.emit(True, "所有数据导出成功！")
+        if self.task_type == "login_only":
+            # 如果只是登录获取用户信息，直接结束
+            self.finished_signal.emit(True, "登录成功，用户信息已获取。")
             self.progress_signal.emit(100)
-
-        except Exception as e:
-            self.log_signal.emit(f"任务执行异常: {e}", True)
-            self.log_signal.emit(traceback.format_exc(), True)
-            self.finished_signal.emit(False, f"任务执行异常: {e}")
-        finally:
-            if self.driver:
-                self.log_signal.emit("关闭浏览器中...", False)
-                self.driver.quit()
+            return
+
+        if self._cancelled():
+            return
+        self.log_signal.emit(f"查找产品: '{self.product_name}'...", False)
+        self.progress_signal.emit(30)
+        product_id = self._find_product_id_by_name(self.driver, self.base_url, self.product_name)
+
+        if not product_id:
+            self.finished_signal.emit(False, f"未找到产品：'{self.product_name}'。")
+            return
+
+        self.log_signal.emit(f"产品ID: {product_id}。开始导出...", False)
+        self.progress_signal.emit(40)
+
+        # Navigate to product view and browse pages first to establish context
+        self.log_signal.emit(f"导航到产品详情页...", False)
+        self.driver.get(f"{self.base_url}/product-view-{product_id}.html")
+        time.sleep(1)
+
+        self.log_signal.emit(f"导航到产品浏览页...", False)
+        self.driver.get(f"{self.base_url}/product-browse-{product_id}.html")
+        time.sleep(1)
+
+        # Export Requirements
+        if self._cancelled():
+            return
+        self.log_signal.emit("\n--- 导出需求中 ---", False)
+        self.progress_signal.emit(50)
+        if not self._export_requirements(self.driver, self.base_url, product_id, '[公共] 验收报告'):
+            self.finished_signal.emit(False, "导出需求失败。")
+            return
+        self.log_signal.emit("需求导出完成。", False)
+        self.progress_signal.emit(70)
+
+        # Navigate to QA/Bug browse page before exporting bugs
+        self.log_signal.emit(f"导航到 QA 浏览页...", False)
+        self.driver.get(f"{self.base_url}/qa/")
+        time.sleep(1)
+        self.log_signal.emit(f"导航到 Bug 浏览页...", False)
+        self.driver.get(f"{self.base_url}/bug-browse-{product_id}.html")
+        time.sleep(1)
+
+        # Export Unclosed Bugs
+        if self._cancelled():
+            return
+        self.log_signal.emit("\n--- 导出未关闭 Bug 中 ---", False)
+        self.progress_signal.emit(80)
+        if not self._export_unclosed_bugs(self.driver, self.base_url, product_id, '[公共]  验收报告V1.0'):
+            self.finished_signal.emit(False, "导出未关闭 Bug 失败。")
+            return
+        self.log_signal.emit("未关闭 Bug 导出完成。", False)
+        self.progress_signal.emit(90)
+
+        # Navigate to Test Cases browse page before exporting test cases
+        self.log_signal.emit(f"导航到测试单浏览页...", False)
+        self.driver.get(f"{self.base_url}/testcase-browse-{product_id}.html")
+        time.sleep(1)
+
+        # Export Test Cases
+        if self._cancelled():
+            return
+        self.log_signal.emit("\n--- 导出测试单中 ---", False)
+        self.progress_signal.emit(95)
+        if not self._export_test_cases(self.driver, self.base_url, product_id, '[公共] 验收报告'):
+            self.finished_signal.emit(False, "导出测试单失败。")
+            return
+        self.log_signal.emit("测试单导出完成。", False)
+
+        self.finished_signal.emit(True, "所有数据导出成功！")
+        self.progress_signal.emit(100)
 
     def _get_user_info(self):
         """获取当前登录用户的详细信息 - 基于实际页面结构"""
@@ -394,124 +460,24 @@ class SeleniumWorker(QThread):
             self.user_info.role = "普通用户"
             self.user_info.last_login = "N/A"
 
-    def _setup_driver(self):
-        """Internal helper for setting up WebDriver."""
-        self.log_signal.emit(f"下载目录: {self.download_dir}", False)
-        edge_options = EdgeOptions()
-        if self.headless_mode:
-            edge_options.add_argument("--headless")
-            self.log_signal.emit("以无头模式运行浏览器。", False)
-        else:
-            self.log_signal.emit("以有头模式运行浏览器。", False)
-
-        edge_options.add_argument("--window-size=1920,1080")
-
-        prefs = {
-            "download.default_directory": self.download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safeBrowse.enabled": True
-        }
-        edge_options.add_experimental_option("prefs", prefs)
-
-        try:
-            driver = None  # 初始化 driver 变量
-
-            # 检查 EDGEDRIVER_PATH 是否指定且文件存在
-            if EDGEDRIVER_PATH and os.path.exists(EDGEDRIVER_PATH):
-                self.log_signal.emit(f"使用指定 Edge WebDriver 路径: {EDGEDRIVER_PATH}", False)
-                service = EdgeService(executable_path=EDGEDRIVER_PATH)
-                driver = webdriver.Edge(service=service, options=edge_options)
-            elif EDGEDRIVER_PATH and not os.path.exists(EDGEDRIVER_PATH):
-                # 如果指定了路径但文件不存在，则报错
-                self.log_signal.emit(f"错误: 指定的 Edge WebDriver 文件不存在: {EDGEDRIVER_PATH}", True)
-                self.log_signal.emit("请检查 EDGEDRIVER_PATH 配置是否正确，或文件是否已被移动/删除。", True)
-                return None
-            else:
-                # 如果 EDGEDRIVER_PATH 为空或 None，尝试让 Selenium 自动从 PATH 查找
-                self.log_signal.emit("未指定 Edge WebDriver 路径，尝试从系统 PATH 查找...", False)
-                driver = webdriver.Edge(options=edge_options)
-
-            driver.maximize_window()
-            driver.set_page_load_timeout(60)
-            self.log_signal.emit("浏览器初始化成功。", False)
-            return driver
-        except WebDriverException as e:
-            self.log_signal.emit(f"浏览器启动失败: {e}", True)
-            self.log_signal.emit("请确保 Edge 浏览器和 Edge WebDriver (msedgedriver) 已正确安装并配置。", True)
-            self.log_signal.emit("1. 确保您的 Edge 浏览器是最新的。", True)
-            self.log_signal.emit("2. 从官方网站下载与您 Edge 浏览器版本完全匹配的 msedgedriver.exe。", True)
-            self.log_signal.emit(
-                "3. 将 msedgedriver.exe 放置在项目根目录，或将其完整路径配置到 config/settings.py 中的 EDGEDRIVER_PATH。",
-                True)
-            self.log_signal.emit("4. 如果 msedgedriver.exe 在系统 PATH 环境变量中，请确保其路径设置正确。", True)
-            return None
-        except Exception as e:
-            self.log_signal.emit(f"初始化浏览器时发生意外错误: {e}", True)
-            self.log_signal.emit(traceback.format_exc(), True)
-            return None
-
-    def _login(self, driver, base_url, account, password):
-        """Internal helper for logging in."""
-        self.log_signal.emit(f"导航到登录页: {base_url}/user-login.html", False)
-        try:
-            driver.get(f"{base_url}/user-login.html")
-            WebDriverWait(driver, 15).until(EC.visibility_of_element_located((By.ID, 'account')))
-
-            account_input = driver.find_element(By.ID, 'account')
-            password_input = driver.find_element(By.NAME, 'password')
-            login_button = driver.find_element(By.ID, 'submit')
-
-            account_input.send_keys(account)
-            password_input.send_keys(password)
-            self.log_signal.emit("点击登录按钮...", False)
-            login_button.click()
-
-            WebDriverWait(driver, 30).until(
-                EC.any_of(
-                    EC.url_changes(f"{base_url}/user-login.html"),
-                    EC.presence_of_element_located((By.CSS_SELECTOR, '.main-header .user-name'))
-                )
-            )
-            if "登录失败" in driver.page_source:
-                self.log_signal.emit("登录失败：账号或密码错误。", True)
-                return False
-            else:
-                self.log_signal.emit("登录成功。", False)
-                return True
-        except TimeoutException:
-            self.log_signal.emit("登录超时。", True)
-            return False
-        except NoSuchElementException as e:
-            self.log_signal.emit(f"登录页元素未找到: {e}", True)
-            return False
-        except Exception as e:
-            self.log_signal.emit(f"登录时发生异常: {e}", True)
-            self.log_signal.emit(traceback.format_exc(), True)
-            return False
-
     def _find_product_id_by_name(self, driver, base_url, product_name):
         """Internal helper for finding product ID."""
+        if self.session and product_name in self.session.product_ids:
+            product_id = self.session.product_ids[product_name]
+            self.log_signal.emit(f"使用已缓存的产品ID: '{product_name}' -> {product_id}", False)
+            return product_id
         self.log_signal.emit(f"导航到产品列表页...", False)
         try:
             # This URL might be specific to your ZenTao version/setup.
             # You might need to adjust it if products are not listed on this exact page.
-            driver.get(f"{base_url}/product-all-0-0-noclosed-order_desc-849-2000-1.html")
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="product-view"]'))
-            )
             self.log_signal.emit(f'查找产品 \'{product_name}\'...', False)
-            product_links = driver.find_elements(By.CSS_SELECTOR, 'a[href*="/product-view-"]')
-            for link in product_links:
-                if product_name in link.text:
-                    href = link.get_attribute('href')
-                    try:
-                        product_id = href.split('-')[-1].split('.')[0]
-                        self.log_signal.emit(f"找到产品 '{product_name}'，ID: {product_id}", False)
-                        return product_id
-                    except IndexError:
-                        self.log_signal.emit(f"警告: 无法解析产品ID: {href}", True)
-                        continue
+            ranked = rank_products(driver, base_url, product_name)
+            product_id = select_product(ranked, product_name, self._emit_log)
+            if product_id:
+                self.log_signal.emit(f"找到产品 '{ranked[0][0].text}'，ID: {product_id}", False)
+                if self.session:
+                    self.session.product_ids[product_name] = product_id
+                return product_id
             self.log_signal.emit(f"未找到产品：{product_name}。", True)
             return None
         except TimeoutException:
@@ -784,97 +750,54 @@ class BugQueryWorker(QThread):
         self.product_name = product_name
         self.query_params = query_params  # 查询参数字典
         self.driver = None
+        self.session = None
 
+    @profiled()
     def run(self):
         try:
-            self.log_signal.emit("初始化浏览器中...", False)
             self.progress_signal.emit(10)
 
-            # 使用管理员账号登录
-            self.driver = self._setup_driver()
-            if not self.driver:
-                self.finished_signal.emit(False, "浏览器启动失败。")
-                return
-
+            # 使用管理员账号的共享会话，已登录时不再重复登录
             self.log_signal.emit(f"使用管理员账号 {self.manager_account} 登录中...", False)
-            self.progress_signal.emit(20)
+            with SESSION_BROKER.session(self.manager_account, self.manager_password, headless=True,
+                                        base_url=self.base_url,
+                                        log_callback=lambda msg, is_err=False: self.log_signal.emit(msg, is_err)
+                                        ) as session:
+                self.session = session
+                self.driver = session.driver
+                self.progress_signal.emit(20)
 
-            if not self._login():
-                self.finished_signal.emit(False, "管理员登录失败。")
-                return
+                # 添加操作备注
+                self._add_operation_log()
 
-            # 查询历史BUG
-            self.log_signal.emit("查询历史BUG中...", False)
-            self.progress_signal.emit(50)
+                # 查询历史BUG
+                self.log_signal.emit("查询历史BUG中...", False)
+                self.progress_signal.emit(50)
 
-            bug_list = self._query_historical_bugs()
+                bug_list = self._query_historical_bugs()
 
-            if bug_list:
+            if bug_list is None:
+                self.finished_signal.emit(False, "查询已取消。")
+            else:
+                # 没有结果也是成功的查询：结果 (包括空列表) 会替换缓存和表格中的旧数据
                 self.log_signal.emit(f"查询到 {len(bug_list)} 条历史BUG记录", False)
                 self.bug_data_signal.emit(bug_list)
-                self.finished_signal.emit(True, f"查询完成，共找到 {len(bug_list)} 条记录")
-            else:
-                self.finished_signal.emit(False, "未查询到相关BUG记录")
+                if bug_list:
+                    self.finished_signal.emit(True, f"查询完成，共找到 {len(bug_list)} 条记录")
+                else:
+                    self.finished_signal.emit(True, "未查询到相关BUG记录")
 
             self.progress_signal.emit(100)
 
+        except RuntimeError as e:
+            # 浏览器启动或管理员登录失败，详细原因已写入日志
+            self.finished_signal.emit(False, str(e))
         except Exception as e:
             self.log_signal.emit(f"BUG查询异常: {e}", True)
             self.finished_signal.emit(False, f"查询异常: {e}")
         finally:
-            if self.driver:
-                self.driver.quit()
-
-    def _setup_driver(self):
-        """设置浏览器驱动"""
-        edge_options = EdgeOptions()
-        edge_options.add_argument("--headless")  # 历史查询默认使用无头模式
-        edge_options.add_argument("--window-size=1920,1080")
-
-        try:
-            if EDGEDRIVER_PATH and os.path.exists(EDGEDRIVER_PATH):
-                service = EdgeService(executable_path=EDGEDRIVER_PATH)
-                driver = webdriver.Edge(service=service, options=edge_options)
-            else:
-                driver = webdriver.Edge(options=edge_options)
-
-            driver.set_page_load_timeout(60)
-            return driver
-        except Exception as e:
-            self.log_signal.emit(f"浏览器初始化失败: {e}", True)
-            return None
-
-    def _login(self):
-        """管理员登录"""
-        try:
-            self.driver.get(f"{self.base_url}/user-login.html")
-            WebDriverWait(self.driver, 15).until(EC.visibility_of_element_located((By.ID, 'account')))
-
-            account_input = self.driver.find_element(By.ID, 'account')
-            password_input = self.driver.find_element(By.NAME, 'password')
-            login_button = self.driver.find_element(By.ID, 'submit')
-
-            account_input.send_keys(self.manager_account)
-            password_input.send_keys(self.manager_password)
-            login_button.click()
-
-            WebDriverWait(self.driver, 30).until(
-                EC.any_of(
-                    EC.url_changes(f"{self.base_url}/user-login.html"),
-                    EC.presence_of_element_located((By.CSS_SELECTOR, '.main-header .user-name'))
-                )
-            )
-
-            if "登录失败" in self.driver.page_source:
-                return False
-
-            # 添加操作备注
-            self._add_operation_log()
-            return True
-
-        except Exception as e:
-            self.log_signal.emit(f"登录异常: {e}", True)
-            return False
+            self.driver = None
+            self.session = None
 
     def _add_operation_log(self):
         """添加操作日志备注"""
@@ -892,78 +815,78 @@ class BugQueryWorker(QThread):
             self.log_signal.emit(f"添加操作日志失败: {e}", True)
 
     def _query_historical_bugs(self):
-        """查询历史BUG"""
+        """
+        查询历史BUG：条件提交到禅道的搜索表单由服务端筛选，再分页读取结果；任务被取消时返回 None。
+        找不到产品或查询出错时抛出 RuntimeError，避免把失败当作“没有结果”替换缓存中的数据。
+        """
+        product_id = None
+        if self.product_name:
+            product_id = self._find_product_id(self.product_name)
+            if not product_id:
+                # 产品名写错时查询失败，不能当作“没有BUG”显示并缓存
+                self.log_signal.emit(f"未找到产品: {self.product_name}", True)
+                raise RuntimeError(f"未找到产品: {self.product_name}")
+
         try:
-            # 构建查询URL
-            base_query_url = f"{self.base_url}/bug-browse"
-
-            # 根据查询参数构建完整URL
-            query_params = []
-            if self.product_name:
-                # 这里需要先获取产品ID
-                product_id = self._find_product_id(self.product_name)
-                if product_id:
-                    query_params.append(f"product={product_id}")
-
-            # 添加其他查询条件
-            if self.query_params.get('status'):
-                query_params.append(f"status={self.query_params['status']}")
-            if self.query_params.get('severity'):
-                query_params.append(f"severity={self.query_params['severity']}")
-            if self.query_params.get('date_from'):
-                query_params.append(f"openedDate={self.query_params['date_from']}")
-
-            query_url = base_query_url
-            if query_params:
-                query_url += "?" + "&".join(query_params)
-
-            self.driver.get(query_url)
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'table, .main-table'))
-            )
+            conditions = search_conditions(self.query_params)
+            browse_type = 'all'
+            if conditions:
+                self.log_signal.emit("查询条件: " + "，".join(f"{field} {operator} {value}"
+                                                          for field, operator, value in conditions), False)
+                # fetch 需要在禅道页面中执行才会带上会话
+                if not (self.driver.current_url or '').startswith(self.base_url):
+                    self.driver.get(f"{self.base_url}/misc-ping.html")
+                self.driver.set_script_timeout(30)
+                if post_search(self.driver, self.base_url, product_id, conditions):
+                    browse_type = 'bySearch'
+                else:
+                    self.log_signal.emit("警告: 禅道搜索表单不可用，改为读取全部BUG后在本地筛选。", True)
 
-            # 解析BUG列表
             bug_list = []
-            rows = self.driver.find_elements(By.CSS_SELECTOR, 'table tbody tr')
-
-            for row in rows:
-                cells = row.find_elements(By.TAG_NAME, 'td')
-                if len(cells) >= 8:  # 确保有足够的列
-                    bug_info = {
-                        'id': cells[0].text.strip(),
-                        'title': cells[2].text.strip(),
-                        'status': cells[3].text.strip(),
-                        'opened_by': cells[4].text.strip(),
-                        'opened_date': cells[5].text.strip(),
-                        'severity': cells[6].text.strip(),
-                        'assigned_to': cells[7].text.strip() if len(cells) > 7 else ''
-                    }
-                    bug_list.append(bug_info)
+            seen_ids = set()
+            for page in range(1, BUG_QUERY_MAX_PAGES + 1):
+                if self.isInterruptionRequested():
+                    self.log_signal.emit(f"查询已取消，已读取 {len(bug_list)} 条。", True)
+                    return None
+                self.driver.get(browse_url(self.base_url, product_id, browse_type, page))
+                WebDriverWait(self.driver, 15).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'table, .main-table'))
+                )
+                bugs, total = extract_rows(self.driver)
+                # 页码超出范围时禅道会再次显示最后一页
+                new_bugs = [bug for bug in bugs if bug['id'] not in seen_ids]
+                if not new_bugs:
+                    break
+                seen_ids.update(bug['id'] for bug in new_bugs)
+                bug_list.extend(new_bugs)
+                if total:
+                    self.progress_signal.emit(50 + 45 * min(len(bug_list), total) // total)
+                    self.log_signal.emit(f"  已读取 {len(bug_list)}/{total} 条", False)
+                if len(bugs) < BUG_QUERY_PAGE_SIZE or (total and len(bug_list) >= total):
+                    break
+            else:
+                self.log_signal.emit(f"警告: 结果超过 {BUG_QUERY_MAX_PAGES} 页，只读取了前 "
+                                     f"{len(bug_list)} 条，请缩小查询范围。", True)
 
+            if browse_type != 'bySearch' and conditions:
+                bug_list = [bug for bug in bug_list if matches_locally(bug, conditions)]
             return bug_list
 
         except Exception as e:
             self.log_signal.emit(f"查询历史BUG失败: {e}", True)
-            return []
+            raise RuntimeError(f"查询历史BUG失败: {e}") from e
 
     def _find_product_id(self, product_name):
         """查找产品ID"""
+        if self.session and product_name in self.session.product_ids:
+            return self.session.product_ids[product_name]
         try:
-            self.driver.get(f"{self.base_url}/product-all-0-0-noclosed-order_desc-849-2000-1.html")
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="product-view"]'))
-            )
-
-            product_links = self.driver.find_elements(By.CSS_SELECTOR, 'a[href*="/product-view-"]')
-            for link in product_links:
-                if product_name in link.text:
-                    href = link.get_attribute('href')
-                    try:
-                        product_id = href.split('-')[-1].split('.')[0]
-                        return product_id
-                    except IndexError:
-                        continue
-            return None
+            ranked = rank_products(self.driver, self.base_url, product_name)
+            product_id = select_product(ranked, product_name,
+                                        lambda msg, is_err=False: self.log_signal.emit(msg, is_err))
+            if product_id and self.session:
+                self.session.product_ids[product_name] = product_id
+            return product_id
         except Exception as e:
             self.log_signal.emit(f"查找产品ID失败: {e}", True)
             return None
@@ -0,0 +1,313 @@
+# core/session_broker.py - 禅道会话代理
+#
+# SeleniumWorker (普通账号) 与 BugQueryWorker (管理员账号) 共用同一个代理：
+# 每个 (禅道地址, 账号) 只维护一个已登录的浏览器会话，切换页面或刷新用户信息时直接复用，
+# 后台线程定期访问轻量页面保持会话不过期。
+
+import os
+import time
+import threading
+import traceback
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.edge.service import Service as EdgeService
+from selenium.webdriver.edge.options import Options as EdgeOptions
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+
+from config.settings import (
+    EDGEDRIVER_PATH, ZEN_TAO_BASE_URL,
+    ZENTAO_SESSION_PING_INTERVAL, ZENTAO_SESSION_IDLE_TIMEOUT
+)
+
+
+def _noop_log(message, is_error=False):
+    pass
+
+
+class ZentaoSession:
+    """一个已登录账号对应的浏览器会话"""
+
+    def __init__(self, base_url, account):
+        self.base_url = base_url
+        self.account = account
+        self.password = ""
+        self.headless = True
+        self.download_dir = None
+        self.driver = None
+        self.logged_in = False
+        self.lock = threading.RLock()  # 同一浏览器不能被两个线程同时驱动
+        self.product_ids = {}  # 产品名称 -> 产品ID 缓存
+        self.last_used = time.time()
+        self.last_ping = 0.0
+
+    @property
+    def key(self):
+        return self.base_url, self.account
+
+    def is_alive(self):
+        """浏览器进程是否仍可用"""
+        if not self.driver:
+            return False
+        try:
+            _ = self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+        self.logged_in = False
+        self.product_ids.clear()
+
+
+class ZentaoSessionBroker:
+    """按 (禅道地址, 账号) 管理共享的已登录会话"""
+
+    def __init__(self, ping_interval=ZENTAO_SESSION_PING_INTERVAL, idle_timeout=ZENTAO_SESSION_IDLE_TIMEOUT):
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._keepalive_thread = None
+
+    @contextmanager
+    def session(self, account, password, headless=True, download_dir=None, base_url=ZEN_TAO_BASE_URL,
+                log_callback=None):
+        """
+        获取已登录的会话并独占使用，用法:
+            with SESSION_BROKER.session(account, password, ...) as session:
+                session.driver.get(...)
+        会话不存在、浏览器已退出或登录失效时自动重建/重新登录；失败时抛出 RuntimeError。
+        """
+        log = log_callback or _noop_log
+        with self._lock:
+            session = self._sessions.get((base_url, account))
+            if session is None:
+                session = ZentaoSession(base_url, account)
+                self._sessions[session.key] = session
+
+        if not session.lock.acquire(blocking=False):
+            log(f"账号 {account} 的会话正被其他任务使用，等待其完成...", False)
+            session.lock.acquire()
+        try:
+            self._prepare(session, password, headless, download_dir, log)
+            self._ensure_keepalive()
+            yield session
+        except WebDriverException:
+            # 浏览器已崩溃或被关闭，下次重建
+            session.close()
+            raise
+        finally:
+            session.last_used = time.time()
+            session.lock.release()
+
+    def _prepare(self, session, password, headless, download_dir, log):
+        if session.driver and session.headless != headless:
+            log("浏览器显示模式已变更，重新启动浏览器...", False)
+            session.close()
+        if session.driver and not session.is_alive():
+            log("浏览器会话已失效，重新启动浏览器...", False)
+            session.close()
+        if session.password and session.password != password:
+            # 密码变更时必须重新验证，不能沿用旧会话
+            session.logged_in = False
+
+        if not session.driver:
+            log("初始化浏览器中...", False)
+            session.driver = self._create_driver(headless, download_dir, log)
+            if not session.driver:
+                raise RuntimeError("浏览器启动失败。")
+            session.headless = headless
+            session.download_dir = download_dir
+            session.logged_in = False
+        elif download_dir and session.download_dir != download_dir:
+            self._set_download_dir(session, download_dir, log)
+
+        if session.logged_in and self._ping(session):
+            log(f"复用已登录的禅道会话 ({session.account})。", False)
+        else:
+            log("尝试登录禅道...", False)
+            if not self._login(session.driver, session.base_url, session.account, password, log):
+                session.logged_in = False
+                raise RuntimeError("登录失败，请检查账号密码。")
+            session.logged_in = True
+            session.last_ping = time.time()
+        session.password = password
+
+    def _create_driver(self, headless, download_dir, log):
+        """创建 Edge WebDriver"""
+        if download_dir:
+            log(f"下载目录: {download_dir}", False)
+        edge_options = EdgeOptions()
+        if headless:
+            edge_options.add_argument("--headless")
+            log("以无头模式运行浏览器。", False)
+        else:
+            log("以有头模式运行浏览器。", False)
+
+        edge_options.add_argument("--window-size=1920,1080")
+
+        if download_dir:
+            prefs = {
+                "download.default_directory": download_dir,
+                "download.prompt_for_download": False,
+                "download.directory_upgrade": True,
+                "safeBrowse.enabled": True
+            }
+            edge_options.add_experimental_option("prefs", prefs)
+
+        try:
+            if EDGEDRIVER_PATH and os.path.exists(EDGEDRIVER_PATH):
+                log(f"使用指定 Edge WebDriver 路径: {EDGEDRIVER_PATH}", False)
+                service = EdgeService(executable_path=EDGEDRIVER_PATH)
+                driver = webdriver.Edge(service=service, options=edge_options)
+            elif EDGEDRIVER_PATH and not os.path.exists(EDGEDRIVER_PATH):
+                log(f"错误: 指定的 Edge WebDriver 文件不存在: {EDGEDRIVER_PATH}", True)
+                log("请检查 EDGEDRIVER_PATH 配置是否正确，或文件是否已被移动/删除。", True)
+                return None
+            else:
+                log("未指定 Edge WebDriver 路径，尝试从系统 PATH 查找...", False)
+                driver = webdriver.Edge(options=edge_options)
+
+            driver.maximize_window()
+            driver.set_page_load_timeout(60)
+            log("浏览器初始化成功。", False)
+            return driver
+        except WebDriverException as e:
+            log(f"浏览器启动失败: {e}", True)
+            log("请确保 Edge 浏览器和 Edge WebDriver (msedgedriver) 已正确安装并配置。", True)
+            log("1. 确保您的 Edge 浏览器是最新的。", True)
+            log("2. 从官方网站下载与您 Edge 浏览器版本完全匹配的 msedgedriver.exe。", True)
+            log("3. 将 msedgedriver.exe 放置在项目根目录，或将其完整路径配置到 config/settings.py 中的 EDGEDRIVER_PATH。",
+                True)
+            log("4. 如果 msedgedriver.exe 在系统 PATH 环境变量中，请确保其路径设置正确。", True)
+            return None
+        except Exception as e:
+            log(f"初始化浏览器时发生意外错误: {e}", True)
+            log(traceback.format_exc(), True)
+            return None
+
+    def _set_download_dir(self, session, download_dir, log):
+        """运行中切换下载目录，避免为此重启浏览器"""
+        try:
+            session.driver.execute_cdp_cmd("Page.setDownloadBehavior",
+                                           {"behavior": "allow", "downloadPath": download_dir})
+            session.download_dir = download_dir
+            log(f"下载目录: {download_dir}", False)
+        except Exception as e:
+            log(f"无法切换下载目录 ({e})，重新启动浏览器...", False)
+            session.close()
+            session.driver = self._create_driver(session.headless, download_dir, log)
+            if not session.driver:
+                raise RuntimeError("浏览器启动失败。")
+            session.download_dir = download_dir
+
+    def _login(self, driver, base_url, account, password, log):
+        """登录禅道"""
+        log(f"导航到登录页: {base_url}/user-login.html", False)
+        try:
+            driver.get(f"{base_url}/user-login.html")
+            WebDriverWait(driver, 15).until(EC.visibility_of_element_located((By.ID, 'account')))
+
+            account_input = driver.find_element(By.ID, 'account')
+            password_input = driver.find_element(By.NAME, 'password')
+            login_button = driver.find_element(By.ID, 'submit')
+
+            account_input.clear()
+            account_input.send_keys(account)
+            password_input.send_keys(password)
+            log("点击登录按钮...", False)
+            login_button.click()
+
+            WebDriverWait(driver, 30).until(
+                EC.any_of(
+                    EC.url_changes(f"{base_url}/user-login.html"),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, '.main-header .user-name'))
+                )
+            )
+            if "登录失败" in driver.page_source:
+                log("登录失败：账号或密码错误。", True)
+                return False
+            log("登录成功。", False)
+            return True
+        except TimeoutException:
+            log("登录超时。", True)
+            return False
+        except NoSuchElementException as e:
+            log(f"登录页元素未找到: {e}", True)
+            return False
+        except Exception as e:
+            log(f"登录时发生异常: {e}", True)
+            log(traceback.format_exc(), True)
+            return False
+
+    def _ping(self, session):
+        """访问轻量页面，确认登录仍然有效并刷新服务端会话"""
+        try:
+            session.driver.get(f"{session.base_url}/misc-ping.html")
+            alive = "user-login" not in session.driver.current_url
+        except Exception:
+            alive = False
+        session.last_ping = time.time()
+        if not alive:
+            session.logged_in = False
+        return alive
+
+    def _ensure_keepalive(self):
+        with self._lock:
+            if self._keepalive_thread and self._keepalive_thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name="zentao-keepalive",
+                                                      daemon=True)
+            self._keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        while not self._stop_event.wait(self.ping_interval):
+            with self._lock:
+                sessions = list(self._sessions.values())
+            now = time.time()
+            for session in sessions:
+                # 正在被任务使用的会话无需保活，也不能打断
+                if not session.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if not session.driver:
+                        continue
+                    if now - session.last_used > self.idle_timeout:
+                        session.close()
+                    elif session.logged_in and now - session.last_ping >= self.ping_interval:
+                        self._ping(session)
+                finally:
+                    session.lock.release()
+
+    def invalidate(self, account, base_url=ZEN_TAO_BASE_URL):
+        """关闭指定账号的会话 (例如用户登出)"""
+        with self._lock:
+            session = self._sessions.pop((base_url, account), None)
+        if session:
+            with session.lock:
+                session.close()
+
+    def shutdown(self):
+        """关闭全部浏览器，程序退出时调用"""
+        self._stop_event.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            # 不等待正在运行的任务，直接关闭浏览器
+            session.close()
+
+
+SESSION_BROKER = ZentaoSessionBroker()
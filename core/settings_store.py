@@ -0,0 +1,183 @@
+# core/settings_store.py - 进程内共享的设置存储
+#
+# 所有页面的设置保存在 SETTINGS_FILE 一个文件中 (按页面分节)，启动后第一次访问时读取，之后都从内存读取。
+# 修改只更新内存并安排延迟写入：SETTINGS_SAVE_DELAY 秒内的多次修改合并为一次原子写入 (先写临时文件并刷新到磁盘，
+# 再替换原文件)，程序退出时写入尚未保存的修改。
+# 文件记录格式版本，读取时依次执行 _MIGRATIONS 中的迁移；版本 0 -> 1 导入旧版放在启动目录下的各个 .ini 文件。
+
+import os
+import sys
+import copy
+import json
+import atexit
+import threading
+import traceback
+
+from core.file_utils import atomic_write_bytes
+from config.settings import SETTINGS_FILE, SETTINGS_SAVE_DELAY, SETTINGS_SCHEMA
+
+SETTINGS_VERSION = 1
+
+
+def _noop_log(message, is_error=False):
+    pass
+
+
+def _legacy_dirs():
+    """旧版把 <页面>.ini 写在启动程序时的当前目录，通常就是程序所在目录"""
+    dirs = [os.getcwd(), os.path.dirname(os.path.abspath(sys.argv[0] or '.'))]
+    return list(dict.fromkeys(os.path.normcase(os.path.abspath(d)) for d in dirs))
+
+
+def _read_legacy_ini(path):
+    # 旧版文件可能是 GBK 编码，只在迁移时尝试一次
+    for encoding in ('utf-8', 'gbk'):
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return json.load(f)
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def _migrate_legacy_ini(sections, log):
+    for name in SETTINGS_SCHEMA:
+        if name in sections:
+            continue
+        for directory in _legacy_dirs():
+            path = os.path.join(directory, f"{name}.ini")
+            if not os.path.isfile(path):
+                continue
+            try:
+                values = _read_legacy_ini(path)
+            except Exception as e:
+                log(f"警告: 无法读取旧设置文件 {path}: {e}", True)
+                continue
+            if isinstance(values, dict):
+                sections[name] = values
+                log(f"已导入旧设置文件: {path}", False)
+                break
+    return sections
+
+
+# 版本 N -> N+1 的迁移函数: (各节设置, log) -> 各节设置
+_MIGRATIONS = {
+    0: _migrate_legacy_ini,
+}
+
+
+def _conform(value, default):
+    """按默认值的类型检查读取到的值；默认值为 None 时不限制类型"""
+    if default is None:
+        return value
+    if isinstance(default, bool):
+        return value if isinstance(value, bool) else default
+    if isinstance(default, int):
+        return value if isinstance(value, int) and not isinstance(value, bool) else default
+    if isinstance(default, float):
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+    return value if isinstance(value, type(default)) else default
+
+
+class SettingsStore:
+    def __init__(self, path=SETTINGS_FILE, schema=SETTINGS_SCHEMA, save_delay=SETTINGS_SAVE_DELAY):
+        self.path = path
+        self.schema = schema
+        self.save_delay = save_delay
+        self.log = _noop_log
+        self._sections = None
+        self._lock = threading.RLock()
+        self._timer = None
+        self._dirty = False
+
+    def set_log_callback(self, log_callback):
+        """读取和写入失败时的提示"""
+        self.log = log_callback or _noop_log
+
+    def _ensure_loaded(self):
+        if self._sections is not None:
+            return
+        data = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            # 文件损坏时保留一份，避免下次保存时覆盖掉
+            self.log(f"设置文件无法读取，将使用默认设置: {e}", True)
+            try:
+                os.replace(self.path, self.path + ".broken")
+            except OSError:
+                pass
+        if not isinstance(data, dict):
+            data = {}
+        sections = data.get('sections') if isinstance(data.get('sections'), dict) else {}
+        version = data.get('version', 0)
+        if not isinstance(version, int) or isinstance(version, bool):
+            version = 0
+
+        while version < SETTINGS_VERSION:
+            migrate = _MIGRATIONS.get(version)
+            if migrate:
+                try:
+                    sections = migrate(sections, self.log)
+                except Exception as e:
+                    self.log(f"设置迁移 (版本 {version}) 失败: {e}\n{traceback.format_exc()}", True)
+            version += 1
+            self._dirty = True
+        self._sections = sections
+        if self._dirty:
+            self._schedule_save()
+
+    def section(self, name):
+        """返回某一页面的设置 (副本)，缺少的键用默认值补全"""
+        with self._lock:
+            self._ensure_loaded()
+            stored = self._sections.get(name) or {}
+            defaults = self.schema.get(name, {})
+            values = {key: _conform(stored.get(key, default), default) for key, default in defaults.items()}
+            for key, value in stored.items():
+                values.setdefault(key, value)  # 不在默认值中的键原样保留
+            return copy.deepcopy(values)
+
+    def update(self, name, values):
+        """更新某一页面的设置；只有内容变化时才安排写入"""
+        with self._lock:
+            self._ensure_loaded()
+            current = self._sections.get(name) or {}
+            merged = dict(current, **values)
+            if merged == current:
+                return
+            self._sections[name] = copy.deepcopy(merged)
+            self._dirty = True
+            self._schedule_save()
+
+    def _schedule_save(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.save_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            data = json.dumps({'version': SETTINGS_VERSION, 'sections': self._sections},
+                              ensure_ascii=False, indent=4)
+            # 写入也在锁内完成，避免较早的内容覆盖较新的内容
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                atomic_write_bytes(self.path, data.encode('utf-8'))
+                self._dirty = False
+            except OSError as e:
+                self.log(f"保存设置失败: {e}", True)  # 保持未保存状态，下次修改或退出时重试
+
+
+SETTINGS_STORE = SettingsStore()
+atexit.register(SETTINGS_STORE.flush)
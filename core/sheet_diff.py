@@ -0,0 +1,143 @@
+# core/sheet_diff.py - 报告工作表的单元格级差异写入
+#
+# 重新汇总时大部分数据与上次相同。将新数据与工作表当前内容逐行比较，
+# 只写入发生变化的连续行块，只清除新数据中已不存在的末尾行。
+
+import re
+from datetime import datetime, date
+
+_NUMERIC_RE = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+
+def _number_text(number):
+    """数字在单元格中显示的文本 (整数不带小数点)"""
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+def normalize_cell(value):
+    """
+    把单元格值转换为可比较的形式：空字符串视为空，1 与 1.0 相等，布尔值与数字不相等。
+    Excel 会把数字文本和日期文本转换成数字/日期，因此文本也按数字/日期比较；
+    数字文本只有与转换后的数字写法完全一致时才按数字比较 ("12" 等于 12，"012"、"1.0" 仍是文本)。
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return ('bool', value)  # True == 1.0，需要与数字区分
+    if isinstance(value, (int, float)):
+        if value != value:  # NaN
+            return None
+        return float(value)
+    if isinstance(value, datetime):
+        if value.hour == value.minute == value.second == value.microsecond == 0:
+            return value.strftime("%Y-%m-%d")
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        if _NUMERIC_RE.match(text):
+            number = float(text)
+            if _number_text(number) == text:
+                return number
+            return text
+        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%Y-%m-%d", "%Y/%m/%d"):
+            try:
+                return normalize_cell(datetime.strptime(text, fmt))
+            except ValueError:
+                continue
+        return text
+    return value
+
+
+def _normalize_row(row, width):
+    normalized = [normalize_cell(value) for value in row[:width]]
+    normalized.extend([None] * (width - len(normalized)))
+    return normalized
+
+
+def _last_non_empty(rows):
+    last = len(rows)
+    while last > 0 and all(normalize_cell(value) is None for value in rows[last - 1]):
+        last -= 1
+    return last
+
+
+def diff_rows(old_rows, new_rows, width):
+    """
+    比较工作表现有内容 old_rows 与新数据 new_rows (只比较前 width 列)。
+    返回 (blocks, removed, summary)：
+      blocks  - [(起始偏移, 行列表), ...]，需要写入的连续行块，每行补齐到 width 列 (补 None 即清除多余单元格)
+      removed - (起始偏移, 结束偏移) 需要清除的末尾行范围 (含两端)，没有则为 None
+      summary - {'added': 新增行数, 'removed': 删除行数, 'modified': 修改行数, 'unchanged': 未变行数}
+    """
+    old_count = _last_non_empty(old_rows)
+    new_count = len(new_rows)
+    summary = {'added': max(0, new_count - old_count), 'removed': max(0, old_count - new_count),
+               'modified': 0, 'unchanged': 0}
+
+    blocks = []
+    current_start = None
+    current_rows = []
+    for index in range(new_count):
+        new_row = list(new_rows[index][:width]) + [None] * max(0, width - len(new_rows[index]))
+        if index < old_count:
+            changed = _normalize_row(old_rows[index], width) != _normalize_row(new_row, width)
+            if changed:
+                summary['modified'] += 1
+            else:
+                summary['unchanged'] += 1
+        else:
+            changed = True
+        if changed:
+            if current_start is None:
+                current_start = index
+            current_rows.append(new_row)
+        elif current_start is not None:
+            blocks.append((current_start, current_rows))
+            current_start, current_rows = None, []
+    if current_start is not None:
+        blocks.append((current_start, current_rows))
+
+    removed = (new_count, old_count - 1) if old_count > new_count else None
+    return blocks, removed, summary
+
+
+def diff_write_chunks(chunks, width, old_row_count, read_old, write_rows, progress=None):
+    """
+    分块差异写入，内存占用只与块大小有关。
+      chunks        - 新数据块迭代器 (见 core.xlsx_readers.chunk_rows)
+      old_row_count - 工作表中现有数据的行数
+      read_old(offset, count, width) 返回现有内容中从 offset 起 count 行
+      write_rows(offset, rows)       从 offset 起写入连续行块
+      progress(rows_done)            每块处理完后调用
+    返回 (新数据总行数, summary, 写入块数, 写入行数)；新数据之后多余的旧行由调用方清除。
+    """
+    totals = {'added': 0, 'removed': 0, 'modified': 0, 'unchanged': 0}
+    offset = 0
+    block_count = 0
+    rows_written = 0
+    for chunk in chunks:
+        chunk_width = max([width] + [len(row) for row in chunk])
+        old_count = min(len(chunk), max(0, old_row_count - offset))
+        old_rows = read_old(offset, old_count, chunk_width) if old_count else []
+        blocks, _, summary = diff_rows(old_rows, chunk, chunk_width)
+        for block_offset, rows in blocks:
+            write_rows(offset + block_offset, rows)
+            rows_written += len(rows)
+        block_count += len(blocks)
+        for key in ('added', 'modified', 'unchanged'):
+            totals[key] += summary[key]
+        offset += len(chunk)
+        if progress:
+            progress(offset)
+    totals['removed'] = max(0, old_row_count - offset)
+    return offset, totals, block_count, rows_written
+
+
+def format_diff_summary(sheet_name, summary, block_count, rows_written):
+    return (f"'{sheet_name}' 差异写入：新增 {summary['added']} 行，删除 {summary['removed']} 行，"
+            f"修改 {summary['modified']} 行，未变 {summary['unchanged']} 行；写入 {block_count} 个数据块，"
+            f"共 {rows_written} 行。")
@@ -0,0 +1,202 @@
+# core/template_layout.py - 模板布局预编译
+#
+# 填写模板前需要知道目标工作表的合并单元格以及目标单元格实际应写入的位置 (合并区域的左上角)。
+# 这些信息只与模板的结构 (工作表及目标工作表的合并区域) 有关：第一次使用时分析一次，按结构哈希缓存在内存和磁盘
+# (CACHE_DIR/templates) 中。不按文件内容哈希：模板通常被原地填写，每次填写都会改变文件内容，但结构不变，
+# 同一模板的后续填写仍能直接使用缓存结果。结构哈希只扫描目标工作表，模板中较大的数据表不会被解压。
+# 合并区域按起始行排序并记录前缀最大结束行，查询某个单元格时二分定位，只检查可能覆盖它的区域。
+
+import os
+import re
+import pickle
+import bisect
+import hashlib
+import zipfile
+
+from openpyxl.utils import range_boundaries
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string, get_column_letter
+
+from core.xlsx_readers import sheet_parts
+from config.settings import CACHE_DIR
+
+TEMPLATE_CACHE_DIR = os.path.join(CACHE_DIR, "templates")
+# 布局结构变化时递增，使旧的磁盘缓存失效
+LAYOUT_VERSION = 3
+
+_MERGE_CELL_RE = re.compile(rb'<(?:\w+:)?mergeCell\b[^>]*?\bref="([^"]+)"')
+
+_memory_cache = {}  # 结构哈希 -> TemplateLayout
+_key_cache = {}  # (绝对路径, 修改时间, 大小, 目标工作表) -> 结构哈希
+
+
+class MergedRangeIndex:
+    """一个工作表中合并区域的区间索引"""
+
+    def __init__(self, ranges):
+        # ranges: [(min_row, max_row, min_col, max_col), ...]
+        self.ranges = sorted(ranges)
+        self._starts = [r[0] for r in self.ranges]
+        self._prefix_max_row = []
+        running = 0
+        for r in self.ranges:
+            running = max(running, r[1])
+            self._prefix_max_row.append(running)
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def find(self, row, col):
+        """返回覆盖 (row, col) 的合并区域，没有则返回 None"""
+        i = bisect.bisect_right(self._starts, row) - 1
+        while i >= 0 and self._prefix_max_row[i] >= row:
+            min_row, max_row, min_col, max_col = self.ranges[i]
+            if row <= max_row and min_col <= col <= max_col:
+                return self.ranges[i]
+            i -= 1
+        return None
+
+
+class SheetLayout:
+    def __init__(self, name, merged):
+        self.name = name
+        self.merged = merged  # MergedRangeIndex
+        self._resolved = {}
+
+    def resolve(self, coord):
+        """单元格坐标 -> 实际写入的坐标 (位于合并区域内时为区域左上角)"""
+        resolved = self._resolved.get(coord)
+        if resolved is None:
+            column_letter, row = coordinate_from_string(coord)
+            merged = self.merged.find(row, column_index_from_string(column_letter))
+            resolved = coord if merged is None else f"{get_column_letter(merged[2])}{merged[0]}"
+            self._resolved[coord] = resolved
+        return resolved
+
+
+class TemplateLayout:
+    def __init__(self, path, key, sheets):
+        self.path = path
+        self.key = key  # 结构哈希，见 structure_key
+        self.sheets = sheets  # 工作表名称 -> SheetLayout，按工作簿中的顺序，只包含分析过的工作表
+
+    @property
+    def sheet_names(self):
+        return list(self.sheets)
+
+    def sheet(self, name):
+        return self.sheets.get(name)
+
+    def resolve_mapping(self, sheet_name, field_mapping):
+        """把 {字段: {'excel_cell': 坐标}} 或 {字段: 坐标} 解析为 {字段: 实际写入坐标}，未指定单元格的字段为 None"""
+        sheet = self.sheets[sheet_name]
+        resolved = {}
+        for field_name, config in field_mapping.items():
+            coord = config.get("excel_cell") if isinstance(config, dict) else config
+            resolved[field_name] = sheet.resolve(coord) if coord else None
+        return resolved
+
+
+def compile_template_layout(wb, path, key, targets=None):
+    """
+    从已加载的工作簿分析布局。targets 为 {工作表名称: [单元格坐标, ...]}，只分析其中的工作表
+    (未提供时分析全部工作表)，这些目标单元格会预先解析。
+    """
+    sheets = {}
+    for ws in wb.worksheets:
+        if targets is not None and ws.title not in targets:
+            continue
+        ranges = []
+        for merged_range in ws.merged_cells.ranges:
+            min_col, min_row, max_col, max_row = range_boundaries(str(merged_range))
+            ranges.append((min_row, max_row, min_col, max_col))
+        sheet = SheetLayout(ws.title, MergedRangeIndex(ranges))
+        for coord in (targets or {}).get(ws.title, ()):
+            if coord:
+                sheet.resolve(coord)
+        sheets[ws.title] = sheet
+    return TemplateLayout(os.path.abspath(path), key, sheets)
+
+
+def _merged_refs(archive, part):
+    """流式扫描工作表 XML 中的合并区域 (位于单元格数据之后)；块之间保留一段重叠，避免漏掉跨块的元素"""
+    refs = set()
+    tail = b''
+    with archive.open(part) as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            data = tail + block
+            refs.update(_MERGE_CELL_RE.findall(data))
+            tail = data[-512:]
+    return sorted(refs)
+
+
+def structure_key(path, sheet_names=None):
+    """
+    模板结构的哈希：全部工作表的名称和顺序，以及 sheet_names 中各工作表 (None 为全部工作表) 的合并区域。
+    只解压这些工作表的 XML；单元格的值、样式和工作表范围不参与计算，因此填写模板 (即使原地写入) 不会改变结果。
+    按 (路径, 修改时间, 大小, sheet_names) 记住结果。
+    """
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    scanned = None if sheet_names is None else tuple(sorted(sheet_names))
+    cache_key = (abs_path, stat.st_mtime, stat.st_size, scanned)
+    digest = _key_cache.get(cache_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with zipfile.ZipFile(abs_path) as archive:
+            for name, part in sheet_parts(archive):
+                sha.update(name.encode('utf-8') + b'\0')
+                if scanned is None or name in scanned:
+                    sha.update(b'\1')
+                    for ref in _merged_refs(archive, part):
+                        sha.update(ref + b',')
+                sha.update(b'\n')
+        digest = _key_cache[cache_key] = sha.hexdigest()
+    return digest
+
+
+def _cache_file(digest):
+    return os.path.join(TEMPLATE_CACHE_DIR, digest + ".pkl")
+
+
+def _load_disk_cache(digest):
+    cache_path = _cache_file(digest)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'rb') as f:
+            version, layout = pickle.load(f)
+    except Exception:
+        return None
+    return layout if version == LAYOUT_VERSION else None
+
+
+def _save_disk_cache(layout):
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        cache_path = _cache_file(layout.key)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((LAYOUT_VERSION, layout), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # 缓存写入失败不影响填写
+
+
+def get_template_layout(path, wb=None, targets=None, log_callback=None):
+    """
+    返回模板布局：优先使用内存缓存，其次磁盘缓存；都没有时从 wb (未提供则加载模板) 分析并缓存。
+    targets 见 compile_template_layout；缓存键只包含 targets 中工作表的合并区域。
+    """
+    digest = structure_key(path, None if targets is None else list(targets))
+    layout = _memory_cache.get(digest)
+    if layout is None:
+        layout = _load_disk_cache(digest)
+    if layout is None:
+        if log_callback: log_callback(f"正在分析模板布局 '{os.path.basename(path)}'...", False)
+        if wb is None:
+            from openpyxl import load_workbook
+            wb = load_workbook(path)
+        layout = compile_template_layout(wb, path, digest, targets)
+        _save_disk_cache(layout)
+    _memory_cache[digest] = layout
+    return layout
@@ -0,0 +1,382 @@
+# core/xlsx_readers.py - 可插拔的 xlsx 读取后端
+#
+# 汇总时读取禅道导出文件是主要的 CPU 开销。这里提供多个读取后端，按速度优先级自动选择：
+#   calamine  - python-calamine (Rust 实现)，最快，需要额外安装
+#   iterparse - 直接流式解析工作表 XML，仅依赖标准库
+#   openpyxl  - openpyxl 只读流式模式
+#   pandas    - pd.read_excel，原有实现，作为最后的兜底
+# 所有后端返回相同的结果：指定工作表 (默认第一个) 的数据行，空单元格为 None。
+# 只有 iterparse 和 openpyxl 是真正流式的 (内存占用与行数无关)；calamine 在 Rust 中加载整个工作表后再逐行转换，
+# pandas 一次读入整个工作表。分块读取 (iter_row_chunks) 在 auto 模式下因此只选择流式后端。
+
+import os
+import re
+import zipfile
+import posixpath
+from datetime import date, datetime, time, timedelta
+from xml.etree.ElementTree import iterparse
+
+from config.settings import XLSX_READER_BACKEND
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Excel 内置的日期/时间数字格式
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+_CELL_REF_RE = re.compile(r"([A-Z]+)(\d+)")
+
+
+def _column_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - 64)
+    return index - 1
+
+
+def _is_date_format(format_code):
+    # 去掉引号内的文字和颜色/条件等方括号内容后，含有日期时间占位符即视为日期格式
+    code = re.sub(r'"[^"]*"|\[[^\]]*\]', '', format_code).lower()
+    return any(ch in code for ch in "dmyhs")
+
+
+def _from_excel_serial(value):
+    # 与 openpyxl 一样把一天内的时间舍入到毫秒，避免浮点误差得到 10:19:59.999999 这样的结果
+    try:
+        day, fraction = divmod(value, 1)
+        return _EXCEL_EPOCH + timedelta(days=day, milliseconds=round(fraction * 86400000))
+    except (OverflowError, ValueError):
+        return value
+
+
+def _iso_value(text):
+    """
+    t="d" 单元格的 ISO 8601 值 (openpyxl iso_dates=True 等工具写入)，与 openpyxl 一样按内容返回
+    datetime / date / time；无法解析时保留原文
+    """
+    text = text[:-1] if text.endswith("Z") else text
+    try:
+        if "T" in text or " " in text:
+            return datetime.fromisoformat(text)
+        if ":" in text:
+            return time.fromisoformat(text)
+        return date.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _number(text):
+    value = float(text)
+    if value.is_integer() and 'E' not in text and 'e' not in text and '.' not in text:
+        return int(value)
+    return value
+
+
+# --- iterparse 后端 ---
+
+def sheet_parts(archive):
+    """根据 workbook.xml 与其关系文件返回 [(工作表名称, 工作表 XML 路径), ...]，按工作簿中的顺序"""
+    sheets = []
+    with archive.open("xl/workbook.xml") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == _NS_MAIN + "sheet":
+                sheets.append((elem.get("name"), elem.get(_NS_REL + "id")))
+    targets = {}
+    with archive.open("xl/_rels/workbook.xml.rels") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == _NS_PKG_REL + "Relationship":
+                target = elem.get("Target")
+                if target.startswith("/"):
+                    targets[elem.get("Id")] = target.lstrip("/")
+                else:
+                    targets[elem.get("Id")] = posixpath.normpath(posixpath.join("xl", target))
+    return [(name, targets[rel_id]) for name, rel_id in sheets if rel_id in targets]
+
+
+def _sheet_part(archive, sheet_index=0):
+    parts = sheet_parts(archive)
+    if not parts:
+        raise ValueError("工作簿中没有工作表")
+    if sheet_index >= len(parts):
+        raise ValueError(f"工作簿中没有第 {sheet_index + 1} 个工作表")
+    return parts[sheet_index][1]
+
+
+def active_sheet_index(path):
+    """保存时的活动工作表序号 (workbook.xml 中 workbookView 的 activeTab，与 openpyxl 的 wb.active 一致)"""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("xl/workbook.xml") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == _NS_MAIN + "workbookView":
+                    return int(elem.get("activeTab", 0))
+    return 0
+
+
+def _shared_strings(archive):
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == _NS_MAIN + "si":
+                # 纯文本为 <t>，富文本由多个 <r><t> 组成；忽略拼音注释 <rPh>
+                parts = []
+                for child in elem:
+                    if child.tag == _NS_MAIN + "t":
+                        parts.append(child.text or "")
+                    elif child.tag == _NS_MAIN + "r":
+                        t = child.find(_NS_MAIN + "t")
+                        if t is not None:
+                            parts.append(t.text or "")
+                strings.append("".join(parts))
+                elem.clear()
+    return strings
+
+
+def _date_styles(archive):
+    """返回使用日期格式的单元格样式索引集合"""
+    if "xl/styles.xml" not in archive.namelist():
+        return set()
+    custom_formats = {}
+    date_styles = set()
+    with archive.open("xl/styles.xml") as f:
+        in_cell_xfs = False
+        xf_index = 0
+        for event, elem in iterparse(f, events=("start", "end")):
+            if event == "start":
+                if elem.tag == _NS_MAIN + "cellXfs":
+                    in_cell_xfs = True
+                continue
+            if elem.tag == _NS_MAIN + "numFmt":
+                custom_formats[int(elem.get("numFmtId"))] = elem.get("formatCode", "")
+            elif elem.tag == _NS_MAIN + "cellXfs":
+                in_cell_xfs = False
+            elif elem.tag == _NS_MAIN + "xf" and in_cell_xfs:
+                fmt_id = int(elem.get("numFmtId", 0))
+                if fmt_id in _BUILTIN_DATE_FORMATS or (
+                        fmt_id in custom_formats and _is_date_format(custom_formats[fmt_id])):
+                    date_styles.add(xf_index)
+                xf_index += 1
+    return date_styles
+
+
+def _iter_rows_iterparse(path, sheet_index=0):
+    with zipfile.ZipFile(path) as archive:
+        strings = _shared_strings(archive)
+        date_styles = _date_styles(archive)
+        sheet_part = _sheet_part(archive, sheet_index)
+        with archive.open(sheet_part) as f:
+            next_row = 1
+            row = []
+            sheet_data = None
+            for event, elem in iterparse(f, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == _NS_MAIN + "sheetData":
+                        sheet_data = elem
+                    continue
+                if tag == _NS_MAIN + "c":
+                    ref = elem.get("r")
+                    if ref:
+                        col = _column_index(_CELL_REF_RE.match(ref).group(1))
+                    else:
+                        col = len(row)
+                    cell_type = elem.get("t")
+                    value = None
+                    if cell_type == "inlineStr":
+                        value = "".join(t.text or "" for t in elem.iter(_NS_MAIN + "t"))
+                    else:
+                        v = elem.find(_NS_MAIN + "v")
+                        if v is not None and v.text is not None:
+                            text = v.text
+                            if cell_type == "s":
+                                value = strings[int(text)]
+                            elif cell_type in ("str", "e"):
+                                value = text
+                            elif cell_type == "b":
+                                value = text == "1"
+                            elif cell_type == "d":
+                                value = _iso_value(text)
+                            else:
+                                value = _number(text)
+                                if int(elem.get("s", 0)) in date_styles:
+                                    value = _from_excel_serial(value)
+                    if value is not None and value != "":  # 空文本与其他后端一样视为空单元格
+                        if col >= len(row):
+                            row.extend([None] * (col - len(row) + 1))
+                        row[col] = value
+                    elem.clear()
+                elif tag == _NS_MAIN + "row":
+                    row_number = int(elem.get("r", next_row))
+                    # 中间跳过的行为空行，与 pandas 保持一致
+                    while next_row < row_number:
+                        yield []
+                        next_row += 1
+                    yield row
+                    next_row = row_number + 1
+                    row = []
+                    # 已处理的行从树中移除，保证内存占用与行数无关
+                    if sheet_data is not None:
+                        sheet_data.clear()
+
+
+# --- 其他后端 ---
+
+def _iter_rows_calamine(path, sheet_index=0):
+    from python_calamine import CalamineWorkbook
+    workbook = CalamineWorkbook.from_path(path)
+    sheet = workbook.get_sheet_by_index(sheet_index)
+    # iter_rows 逐行转换为 Python 对象 (旧版本没有时用 to_python 一次转换整个工作表)
+    rows = sheet.iter_rows() if hasattr(sheet, "iter_rows") else sheet.to_python(skip_empty_area=False)
+    for row in rows:
+        yield [None if value == "" else value for value in row]
+
+
+def _iter_rows_openpyxl(path, sheet_index=0):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb.worksheets[sheet_index].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        wb.close()
+
+
+def _iter_rows_pandas(path, sheet_index=0):
+    import pandas as pd
+    df = pd.read_excel(path, header=None, sheet_name=sheet_index)
+    df = df.astype(object).where(df.notna(), None)
+    for row in df.itertuples(index=False, name=None):
+        yield list(row)
+
+
+def _calamine_available():
+    try:
+        import python_calamine  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _openpyxl_available():
+    try:
+        import openpyxl  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _pandas_available():
+    try:
+        import pandas  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# 按速度从快到慢排列
+READER_BACKENDS = {
+    "calamine": (_iter_rows_calamine, _calamine_available),
+    "iterparse": (_iter_rows_iterparse, lambda: True),
+    "openpyxl": (_iter_rows_openpyxl, _openpyxl_available),
+    "pandas": (_iter_rows_pandas, _pandas_available),
+}
+
+
+# 内存占用与工作表行数无关的后端
+STREAMING_BACKENDS = ("iterparse", "openpyxl")
+
+
+def available_backends(streaming=False):
+    """当前环境可用的读取后端，按速度从快到慢排列；streaming 为 True 时只包括流式后端"""
+    return [name for name, (_, is_available) in READER_BACKENDS.items()
+            if (not streaming or name in STREAMING_BACKENDS) and is_available()]
+
+
+def resolve_backend(backend=None, streaming=False):
+    """
+    backend 为 None 或 'auto' 时使用配置的后端，配置为 'auto' 时选择最快的可用后端
+    (streaming 为 True 时选择最快的流式后端)。明确指定的后端总是照用。
+    """
+    backend = backend or XLSX_READER_BACKEND
+    if backend == "auto":
+        return available_backends(streaming)[0]
+    if backend not in READER_BACKENDS:
+        raise ValueError(f"未知的读取后端: {backend}")
+    return backend
+
+
+def iter_rows(path, skip_rows=1, backend=None, streaming=False, sheet_index=0):
+    """逐行读取第 sheet_index 个工作表 (默认第一个)，跳过前 skip_rows 行 (禅道导出的表头)；行长度不做补齐"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    iter_func = READER_BACKENDS[resolve_backend(backend, streaming)][0]
+    for index, row in enumerate(iter_func(path, sheet_index)):
+        if index >= skip_rows:
+            yield row
+
+
+def _trimmed_width(row):
+    last = len(row)
+    while last > 0 and row[last - 1] is None:
+        last -= 1
+    return last
+
+
+def chunk_rows(rows, chunk_size):
+    """
+    把任意行迭代器切分为最多 chunk_size 行的数据块，每块内的行补齐到相同列数。
+    末尾的空行被丢弃 (与 read_rows 一致)；中间的空行只记录数量，遇到下一个非空行时才输出。
+    """
+    chunk = []
+    pending_empty = 0
+    for row in rows:
+        if _trimmed_width(row) == 0:
+            pending_empty += 1
+            continue
+        while pending_empty:
+            chunk.append([])
+            pending_empty -= 1
+            if len(chunk) >= chunk_size:
+                yield _pad_chunk(chunk)
+                chunk = []
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield _pad_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield _pad_chunk(chunk)
+
+
+def _pad_chunk(chunk):
+    width = max(1, max(_trimmed_width(row) for row in chunk))
+    return [list(row[:width]) + [None] * (width - len(row)) if len(row) != width else list(row) for row in chunk]
+
+
+def iter_row_chunks(path, chunk_size, skip_rows=1, backend=None):
+    """
+    读取第一个工作表，按 chunk_size 行分块返回 (见 chunk_rows)。auto 模式下使用流式后端，内存占用只与块大小有关；
+    明确指定 calamine 或 pandas 时整个工作表仍会先读入内存。
+    """
+    return chunk_rows(iter_rows(path, skip_rows=skip_rows, backend=backend, streaming=True), chunk_size)
+
+
+def read_rows(path, skip_rows=1, backend=None):
+    """读取第一个工作表为二维列表，所有行补齐到相同列数 (去掉末尾的空列)"""
+    rows = list(iter_rows(path, skip_rows=skip_rows, backend=backend))
+    width = 0
+    for row in rows:
+        last = len(row)
+        while last > width and row[last - 1] is None:
+            last -= 1
+        width = max(width, last)
+    for i, row in enumerate(rows):
+        if len(row) < width:
+            row.extend([None] * (width - len(row)))
+        elif len(row) > width:
+            rows[i] = row[:width]
+    # 去掉末尾的空行
+    while rows and all(value is None for value in rows[-1]):
+        rows.pop()
+    return rows
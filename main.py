@@ -1,9 +1,17 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from ui.main_window import MainApplication
+from core.log_bus import LOG_BUS, channel_log_callback
+from core.settings_store import SETTINGS_STORE
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 批量汇总使用进程池，打包为 exe 后需要
+    SETTINGS_STORE.set_log_callback(channel_log_callback("settings"))
     app = QApplication(sys.argv)
     window = MainApplication()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    SETTINGS_STORE.flush()  # 写入延迟保存中的修改
+    LOG_BUS.stop()  # 写完队列中剩余的日志
+    sys.exit(exit_code)
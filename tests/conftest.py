@@ -0,0 +1,14 @@
+# tests/conftest.py - 测试环境
+#
+# 测试从项目根目录导入 core / config / benchmarks；程序数据目录 (缓存、日志) 指向临时目录，不影响本机的数据。
+
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# config.settings 在导入时读取 GENREPORT_HOME，必须在导入任何项目模块之前设置
+os.environ["GENREPORT_HOME"] = tempfile.mkdtemp(prefix="genreport-tests-")
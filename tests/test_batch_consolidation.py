@@ -0,0 +1,36 @@
+# tests/test_batch_consolidation.py - 批量汇总的任务调度
+#
+# 用 openpyxl 引擎在写入进程中运行真实的汇总任务；目标报告相同的任务必须整组拒绝，其余任务照常完成。
+
+import shutil
+
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import generate_bug_export, generate_report_template
+from core.batch_consolidation import run_batch, duplicate_targets
+from config.settings import REPORT_SOURCE_SHEETS, REPORT_DATA_START_ROW
+
+
+def _job(bug_path, target_path):
+    return {'doc1_path': bug_path, 'doc2_path': '', 'doc3_path': '', 'doc4_path': '',
+            'target_report_path': target_path}
+
+
+def test_duplicate_targets_are_rejected(tmp_path):
+    bugs = generate_bug_export(str(tmp_path / "bugs.xlsx"), 5)
+    template = generate_report_template(str(tmp_path / "template.xlsx"), 2)
+    shared, single = str(tmp_path / "shared.xlsx"), str(tmp_path / "single.xlsx")
+    shutil.copy(template, shared)
+    shutil.copy(template, single)
+    jobs = [_job(bugs, shared), _job(bugs, single), _job(bugs, str(tmp_path / "." / "shared.xlsx"))]
+    assert duplicate_targets(jobs) == {shared}
+
+    finished = []
+    results = run_batch(jobs, engine="openpyxl", max_writers=2,
+                        on_result=lambda index, result: finished.append(index))
+    assert [result['success'] for result in results] == [False, True, False]
+    assert sorted(finished) == [0, 1, 2]
+
+    ws = load_workbook(single)[REPORT_SOURCE_SHEETS[0]]
+    assert ws.cell(row=REPORT_DATA_START_ROW + 4, column=1).value is not None
+    assert ws.cell(row=REPORT_DATA_START_ROW + 5, column=1).value is None
@@ -0,0 +1,41 @@
+# tests/test_bug_query_worker.py - 历史BUG查询线程的失败处理
+#
+# 查询失败 (如产品名写错) 时不能发出空结果：空列表会被当作“没有BUG”显示在表格中并写入查询缓存。
+# 不启动浏览器，直接在当前线程调用 run()，会话由假的 SESSION_BROKER 提供。
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from core import selenium_worker
+from core.selenium_worker import BugQueryWorker
+
+
+class FakeBroker:
+    @contextmanager
+    def session(self, account, password, **kwargs):
+        yield SimpleNamespace(driver=object(), product_ids={})
+
+
+@pytest.fixture
+def worker(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # 操作日志写在当前目录
+    monkeypatch.setattr(selenium_worker, "SESSION_BROKER", FakeBroker())
+    worker = BugQueryWorker("admin", "secret", "tester", "不存在的产品", {})
+    monkeypatch.setattr(worker, "_find_product_id", lambda product_name: None)
+    return worker
+
+
+def test_unknown_product_raises(worker):
+    with pytest.raises(RuntimeError, match="未找到产品: 不存在的产品"):
+        worker._query_historical_bugs()
+
+
+def test_unknown_product_fails_run_without_results(worker):
+    results, finished = [], []
+    worker.bug_data_signal.connect(results.append)
+    worker.finished_signal.connect(lambda success, message: finished.append((success, message)))
+    worker.run()
+    assert results == []
+    assert finished == [(False, "未找到产品: 不存在的产品")]
@@ -0,0 +1,17 @@
+# tests/test_fuzzy_match.py - 关键词排序匹配
+
+from core.fuzzy_match import FuzzyIndex
+
+
+def test_single_character_query_matches_substring():
+    index = FuzzyIndex(['智慧园区', '项目A', '项目B', '园'])
+    assert {match.text for match in index.search('园', require_substring=True)} == {'智慧园区', '园'}
+    assert index.search('园', require_substring=True)[0].text == '园'  # 完全相同的排在前面
+    assert [match.text for match in index.search('A', require_substring=True)] == ['项目A']
+    assert [match.text for match in index.search('a')] == ['项目A']
+
+
+def test_short_model_number_prefers_exact_token():
+    index = FuzzyIndex(['P1_2601 门禁系统', '2600 窗口式照相机', '2600E2 窗口式照相机'])
+    matches = index.search('2600', require_substring=True)
+    assert [match.text for match in matches] == ['2600 窗口式照相机', '2600E2 窗口式照相机']
@@ -0,0 +1,171 @@
+# tests/test_openpyxl_engine.py - openpyxl 汇总引擎的黄金文件测试
+#
+# 用 benchmarks/synthetic.py 生成的报告模板和禅道导出文件 (固定 seed) 运行 consolidate_with_openpyxl，
+# 把结果工作簿的快照 (各工作表的值、合并区域、图片锚点、图表数) 与 tests/golden 中的黄金文件比较。
+# replace 和 diff 两种写入模式必须得到同一份黄金文件；另外检查模板中的样式和合并区域没有被改动。
+# 黄金文件按 xlwings 引擎的行为核对过：数据从第3行写入，多余的旧行被清除，图片替换为 A2 处的一张。
+# 引擎行为有意改变后，用 UPDATE_GOLDEN=1 python -m pytest tests/test_openpyxl_engine.py 重新生成并检查差异。
+
+import os
+import json
+from copy import copy
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from benchmarks.synthetic import (
+    generate_bug_export, generate_story_export, generate_case_export, generate_report_template, generate_picture,
+    pictures_supported
+)
+from core.openpyxl_engine import consolidate_with_openpyxl
+from config.settings import REPORT_SOURCE_SHEETS, REPORT_PICTURE_SHEET, EXCEL_SHEET_NAME_ACCEPTANCE
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "openpyxl_consolidation.json")
+SOURCE_ROWS = 12
+TEMPLATE_ROWS = 15  # 模板中上一次汇总留下的行比新数据多，检查多余的行被清除
+
+pytestmark = pytest.mark.skipif(not pictures_supported(), reason="openpyxl 读写图片需要 Pillow")
+
+HEADER_FONT = Font(name="黑体", bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill("solid", fgColor="305496")
+DATA_FONT = Font(name="宋体", italic=True)
+
+
+def _style_template(path):
+    """给模板加上表头和数据区的样式；汇总只能改单元格的值，这些样式必须原样保留"""
+    wb = load_workbook(path)
+    for sheet_name in REPORT_SOURCE_SHEETS:
+        ws = wb[sheet_name]
+        for cell in ws[2]:
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+        for row in ws.iter_rows(min_row=3, max_row=TEMPLATE_ROWS + 4, max_col=3):
+            for cell in row:
+                cell.font = DATA_FONT
+                cell.number_format = "@"
+        ws.column_dimensions["D"].width = 48
+    wb.save(path)
+
+
+@pytest.fixture(scope="module")
+def inputs(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("inputs")
+    paths = {
+        'doc1': generate_bug_export(str(data_dir / "bugs.xlsx"), SOURCE_ROWS),
+        'doc2': generate_story_export(str(data_dir / "stories.xlsx"), SOURCE_ROWS),
+        'doc3': generate_case_export(str(data_dir / "cases.xlsx"), SOURCE_ROWS),
+        'doc4': generate_picture(str(data_dir / "device.png"), (400, 300), seed=1),
+        'old_picture': generate_picture(str(data_dir / "old.png"), (200, 150), seed=2),
+    }
+    paths['template'] = generate_report_template(str(data_dir / "report.xlsx"), TEMPLATE_ROWS,
+                                                 picture_path=paths['old_picture'])
+    _style_template(paths['template'])
+    return paths
+
+
+def _consolidate(inputs, tmp_path, write_mode):
+    target = str(tmp_path / f"report_{write_mode}.xlsx")
+    with open(inputs['template'], "rb") as src, open(target, "wb") as dst:
+        dst.write(src.read())
+    logs = []
+    success = consolidate_with_openpyxl(inputs['doc1'], inputs['doc2'], inputs['doc3'], inputs['doc4'], target,
+                                        log_callback=lambda msg, is_err=False: logs.append((msg, is_err)),
+                                        write_mode=write_mode)
+    assert success, "\n".join(msg for msg, _ in logs)
+    assert not [msg for msg, is_err in logs if is_err]
+    return target
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _anchor(img):
+    anchor = img.anchor
+    anchor_from = anchor._from
+    ext = getattr(anchor, "ext", None)
+    return {'type': type(anchor).__name__, 'row': anchor_from.row, 'col': anchor_from.col,
+            'cx': ext.width if ext is not None else None, 'cy': ext.height if ext is not None else None}
+
+
+def snapshot(path):
+    """工作簿中与汇总结果有关的内容，可直接与 JSON 黄金文件比较"""
+    wb = load_workbook(path)
+    sheets = {}
+    for ws in wb.worksheets:
+        sheets[ws.title] = {
+            'values': [[_json_value(value) for value in row] for row in ws.iter_rows(values_only=True)],
+            'merged': sorted(str(cell_range) for cell_range in ws.merged_cells.ranges),
+            'images': [_anchor(img) for img in ws._images],
+            'charts': len(ws._charts),
+        }
+    return {'sheet_order': wb.sheetnames, 'sheets': sheets}
+
+
+def _golden():
+    if os.environ.get("UPDATE_GOLDEN"):
+        return None
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("write_mode", ["replace", "diff"])
+def test_matches_golden(inputs, tmp_path, write_mode):
+    result = snapshot(_consolidate(inputs, tmp_path, write_mode))
+    golden = _golden()
+    if golden is None:
+        os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        pytest.skip("已重新生成黄金文件")
+    assert result['sheet_order'] == golden['sheet_order']
+    for sheet_name, expected in golden['sheets'].items():
+        assert result['sheets'][sheet_name] == expected, f"工作表 '{sheet_name}' 与黄金文件不同"
+
+
+@pytest.mark.parametrize("write_mode", ["replace", "diff"])
+def test_data_sheets_hold_source_rows(inputs, tmp_path, write_mode):
+    """每张数据表从第3行起是对应导出文件的数据行 (不含表头)，之后没有残留的旧数据"""
+    result = load_workbook(_consolidate(inputs, tmp_path, write_mode))
+    for sheet_name, source in zip(REPORT_SOURCE_SHEETS, (inputs['doc1'], inputs['doc2'], inputs['doc3'])):
+        expected = [list(row) for row in load_workbook(source).active.iter_rows(min_row=2, values_only=True)]
+        ws = result[sheet_name]
+        rows = [list(row) for row in ws.iter_rows(min_row=3, max_row=TEMPLATE_ROWS + 2, max_col=len(expected[0]),
+                                                   values_only=True)]
+        assert rows[:SOURCE_ROWS] == expected
+        assert all(value is None for row in rows[SOURCE_ROWS:] for value in row)
+
+
+@pytest.mark.parametrize("write_mode", ["replace", "diff"])
+def test_template_formatting_untouched(inputs, tmp_path, write_mode):
+    template = load_workbook(inputs['template'])
+    result = load_workbook(_consolidate(inputs, tmp_path, write_mode))
+    for sheet_name in REPORT_SOURCE_SHEETS:
+        before, after = template[sheet_name], result[sheet_name]
+        assert sorted(map(str, after.merged_cells.ranges)) == sorted(map(str, before.merged_cells.ranges))
+        assert after["A1"].value == before["A1"].value  # 合并的标题行
+        assert [cell.value for cell in after[2]] == [cell.value for cell in before[2]]  # 表头
+        for row in before.iter_rows(min_row=2, max_row=TEMPLATE_ROWS + 4, max_col=3):
+            for cell in row:
+                styled = after[cell.coordinate]
+                # 单元格的 font / fill 是只读代理，复制出样式对象再比较
+                assert copy(styled.font) == copy(cell.font) and copy(styled.fill) == copy(cell.fill), cell.coordinate
+                assert styled.number_format == cell.number_format, cell.coordinate
+        assert after.column_dimensions["D"].width == before.column_dimensions["D"].width
+    acceptance_before, acceptance_after = template[EXCEL_SHEET_NAME_ACCEPTANCE], result[EXCEL_SHEET_NAME_ACCEPTANCE]
+    assert (sorted(map(str, acceptance_after.merged_cells.ranges))
+            == sorted(map(str, acceptance_before.merged_cells.ranges)))
+    assert [_anchor(img) for img in acceptance_after._images] == [_anchor(img) for img in acceptance_before._images]
+
+
+def test_picture_replaced_at_a2(inputs, tmp_path):
+    """设备外观图工作表中旧图片被删除，新图片锚定在 A2 (第2行第1列，从0计数为 row 1, col 0)"""
+    result = load_workbook(_consolidate(inputs, tmp_path, "replace"))
+    images = result[REPORT_PICTURE_SHEET]._images
+    assert len(images) == 1
+    anchor = _anchor(images[0])
+    assert (anchor['row'], anchor['col']) == (1, 0)
+    assert result[REPORT_PICTURE_SHEET]["A1"].value == REPORT_PICTURE_SHEET
@@ -0,0 +1,40 @@
+# tests/test_report_summary.py - 数据汇总页的统计来源
+#
+# 汇总引擎写数据表时收集统计列，汇总页不应再次从磁盘解析源文件；结果必须与直接读取源文件计算的相同。
+
+import shutil
+
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import (
+    generate_bug_export, generate_story_export, generate_case_export, generate_report_template
+)
+from core import report_summary
+from core.report_summary import compute_report_summary, summary_layout
+from core.openpyxl_engine import consolidate_with_openpyxl
+from config.settings import REPORT_SUMMARY_SHEET
+
+
+def _fail_disk_read(path, wanted, backend=None):
+    raise AssertionError(f"汇总页再次读取了源文件 {path}")
+
+
+def test_summary_uses_rows_read_for_data_sheets(tmp_path, monkeypatch):
+    docs = (generate_bug_export(str(tmp_path / "bugs.xlsx"), 30),
+            generate_story_export(str(tmp_path / "stories.xlsx"), 20),
+            generate_case_export(str(tmp_path / "cases.xlsx"), 25))
+    expected = compute_report_summary(*docs)
+    target = str(tmp_path / "report.xlsx")
+    shutil.copy(generate_report_template(str(tmp_path / "template.xlsx"), 5), target)
+
+    monkeypatch.setattr(report_summary, "read_source_columns", _fail_disk_read)
+    logs = []
+    assert consolidate_with_openpyxl(*docs, None, target,
+                                     log_callback=lambda msg, is_err=False: logs.append((msg, is_err)))
+    assert not [msg for msg, is_err in logs if is_err]
+
+    ws = load_workbook(target)[REPORT_SUMMARY_SHEET]
+    for table, row in summary_layout(expected):
+        assert ws.cell(row=row, column=1).value == table.title
+        written = [[ws.cell(row=row + 2 + i, column=col).value for col in (1, 2)] for i in range(len(table.rows))]
+        assert written == table.rows, table.title
@@ -0,0 +1,35 @@
+# tests/test_settings_store.py - 设置文件的版本与迁移
+
+import json
+
+from core.settings_store import SettingsStore, SETTINGS_VERSION
+from config.settings import SETTINGS_SCHEMA
+
+PAGE = next(iter(SETTINGS_SCHEMA))
+
+
+def _write_legacy_ini(directory):
+    with open(directory / f"{PAGE}.ini", "w", encoding="utf-8") as f:
+        json.dump({'legacy': True}, f)
+
+
+def test_current_file_without_sections_is_not_migrated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_legacy_ini(tmp_path)
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({'version': SETTINGS_VERSION, 'sections': {}}), encoding="utf-8")
+
+    store = SettingsStore(path=str(path), save_delay=60)
+    assert 'legacy' not in store.section(PAGE)
+    assert not store._dirty and store._timer is None  # 不再重写文件
+
+
+def test_missing_file_imports_legacy_ini(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_legacy_ini(tmp_path)
+    path = tmp_path / "settings.json"
+
+    store = SettingsStore(path=str(path), save_delay=60)
+    assert store.section(PAGE)['legacy'] is True
+    store.flush()
+    assert json.loads(path.read_text(encoding="utf-8"))['version'] == SETTINGS_VERSION
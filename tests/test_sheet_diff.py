@@ -0,0 +1,31 @@
+# tests/test_sheet_diff.py - 差异写入的单元格比较
+
+from datetime import datetime
+
+from core.sheet_diff import normalize_cell, diff_rows
+
+
+def test_equal_cells():
+    assert normalize_cell(1) == normalize_cell(1.0) == normalize_cell("1") == normalize_cell(" 1 ")
+    assert normalize_cell("1.5") == normalize_cell(1.5)
+    assert normalize_cell("") is None and normalize_cell(float("nan")) is None
+    assert normalize_cell("2024/01/05") == normalize_cell(datetime(2024, 1, 5))
+    assert normalize_cell(True) == normalize_cell(True)
+
+
+def test_bool_differs_from_number():
+    assert normalize_cell(True) != normalize_cell(1)
+    assert normalize_cell(False) != normalize_cell(0)
+
+
+def test_numeric_text_only_matches_when_it_round_trips():
+    assert normalize_cell("001") != normalize_cell(1)
+    assert normalize_cell("1.0") != normalize_cell(1)
+    assert normalize_cell("001") == "001"
+
+
+def test_bool_to_number_change_is_written():
+    blocks, removed, summary = diff_rows([[1, True], [2, "001"]], [[1, 1], [2, 1]], 2)
+    assert blocks == [(0, [[1, 1], [2, 1]])]
+    assert removed is None
+    assert summary['modified'] == 2
@@ -0,0 +1,35 @@
+# tests/test_template_layout.py - 模板布局缓存的结构哈希
+
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import generate_report_template
+from core.template_layout import structure_key, get_template_layout
+from config.settings import EXCEL_SHEET_NAME_ACCEPTANCE, REPORT_SOURCE_SHEETS
+
+TARGETS = [EXCEL_SHEET_NAME_ACCEPTANCE]
+
+
+def test_key_follows_target_sheet_structure_only(tmp_path):
+    path = generate_report_template(str(tmp_path / "report.xlsx"), 20)
+    key = structure_key(path, TARGETS)
+
+    wb = load_workbook(path)
+    wb[EXCEL_SHEET_NAME_ACCEPTANCE]["D2"] = "已填写"  # 原地填写
+    wb[REPORT_SOURCE_SHEETS[0]].merge_cells("A30:C30")  # 数据表的结构不参与计算
+    wb.save(path)
+    assert structure_key(path, TARGETS) == key
+
+    wb[EXCEL_SHEET_NAME_ACCEPTANCE].merge_cells("D10:E11")
+    wb.save(path)
+    assert structure_key(path, TARGETS) != key
+
+
+def test_layout_resolves_merged_target_cells(tmp_path):
+    path = generate_report_template(str(tmp_path / "report.xlsx"), 5)
+    wb = load_workbook(path)
+    wb[EXCEL_SHEET_NAME_ACCEPTANCE].merge_cells("B20:C21")
+    wb.save(path)
+    layout = get_template_layout(path, wb, targets={EXCEL_SHEET_NAME_ACCEPTANCE: ["C21", "D22"]})
+    assert layout.sheet_names == TARGETS
+    mapping = {'a': "C21", 'b': {'excel_cell': "D22"}, 'c': None}
+    assert layout.resolve_mapping(EXCEL_SHEET_NAME_ACCEPTANCE, mapping) == {'a': "B20", 'b': "D22", 'c': None}
@@ -1,11 +1,16 @@
 import sys
+import os
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton,
-    QVBoxLayout, QHBoxLayout, QFileDialog, QMessageBox
+    QVBoxLayout, QHBoxLayout, QFileDialog, QMessageBox, QInputDialog, QProgressBar
 )
 from PyQt5.QtCore import Qt
-from core.excel_utils import find_row_by_fuzzy_column_value,write_to_target_sheet
-from openpyxl import load_workbook
+from core.fuzzy_match import is_ambiguous
+from core.acceptance_batch import load_batch_entries
+from core.acceptance_worker import LedgerSearchWorker, AcceptanceFillWorker, AcceptanceBatchWorker
+from core.job_scheduler import JOB_SCHEDULER, Job
+from config.settings import ACCEPTANCE_BATCH_KEYWORD_COLUMN, JOB_RESOURCE_LIMITS
+from ui.log_view import LogView
 
 class ExcelTool(QWidget):
     def __init__(self):
@@ -15,6 +20,9 @@ class ExcelTool(QWidget):
 
         self.data_file = ""
         self.template_file = ""
+        self.batch_worker = None
+        self.search_worker = None
+        self.fill_worker = None
 
         # 新增输入字段变量
         self.input_fields = {}
@@ -64,9 +72,23 @@ class ExcelTool(QWidget):
             n+=1
 
         # 提交按钮
-        btn_process = QPushButton("提取并写入")
-        btn_process.clicked.connect(self.process)
-        layout.addWidget(btn_process)
+        self.btn_process = QPushButton("提取并写入")
+        self.btn_process.clicked.connect(self.process)
+        layout.addWidget(self.btn_process)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.btn_batch = QPushButton("批量填写...")
+        self.btn_batch.setToolTip(f"选择清单 (CSV 或 Excel)：每行一个项目，包含“{ACCEPTANCE_BATCH_KEYWORD_COLUMN}”列，"
+                                  f"以及可选的 {'、'.join(extra_fields)} 列；每个项目生成一份新的工作簿")
+        self.btn_batch.clicked.connect(self.process_batch)
+        layout.addWidget(self.btn_batch)
+
+        self.log_view = LogView("excel_tool")
+        layout.addWidget(self.log_view)
 
         self.setLayout(layout)
 
@@ -92,65 +114,121 @@ class ExcelTool(QWidget):
             QMessageBox.warning(self, "错误", "请输入关键词")
             return
 
-        try:
-            # 提取主数据
-            target_fields = ['项目编号', '项目名称', '内部型号', '产品名称', '项目经理', '产品经理', '负责人']
-            cell_mapping = {
-                '项目编号': 'D2',
-                '项目名称': 'H2',
-                '项目经理': 'U2',
-                '内部型号': 'D3',
-                '产品名称': 'H3',
-                '产品经理': 'U3',
-                '负责人': 'U4'
-            }
-
-            result = find_row_by_fuzzy_column_value(
-                file_path=self.data_file,
-                key_column='项目_产品',
-                key_value=keyword,
-                target_columns=target_fields
-            )
-
-            if not result:
-                QMessageBox.warning(self, "未找到", "台账中未找到匹配行")
-                return
-
-            # 提取额外输入内容
-            extra_data = {
-                field: self.input_fields[field].text().strip()
-                for field in self.input_fields
-                if self.input_fields[field].text().strip()
-            }
-
-            extra_cell_mapping = {
-                '测试单号': 'O2',
-                '申请理由': 'D4',
-                '开始时间': 'H4',
-                '结束时间': 'O4',
-                '测试依据': 'E6',
-                '测试范围': 'E7'
-            }
-
-            # 合并数据并写入
-            wb = load_workbook(self.template_file,keep_vba=True)
-            sheet_name = '验收测试结果'
-            if sheet_name not in wb.sheetnames:
-                raise ValueError(f"写入模板缺少工作表：{sheet_name}")
-            sheet = wb[sheet_name]
-
-            # 主数据写入
-            for key, cell in cell_mapping.items():
-                sheet[cell] = result.get(key, "")
-
-            # 附加字段写入（仅填写的才写）
-            for key, cell in extra_cell_mapping.items():
-                if key in extra_data:
-                    sheet[cell] = extra_data[key]
-
-            wb.save(self.template_file)
-
-            QMessageBox.information(self, "成功", "数据已成功写入 Excel 模板！")
+        if self.is_busy():
+            QMessageBox.warning(self, "操作进行中", "写入任务正在运行，请等待其完成。")
+            return
+
+        # 台账查询和模板读写都在后台线程中执行，界面保持响应
+        self.btn_process.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.log(f"正在台账中查找 '{keyword}'...")
+        self.search_worker = LedgerSearchWorker(self.data_file, keyword)
+        self.search_worker.log_signal.connect(self.log_view.log, Qt.DirectConnection)
+        self.search_worker.candidates_signal.connect(lambda candidates: self._candidates_found(keyword, candidates))
+        self.search_worker.finished_signal.connect(self._search_finished)
+        JOB_SCHEDULER.submit(Job(f"台账查找: {keyword}", 'cpu', self.search_worker))
+
+    def is_busy(self):
+        return any(JOB_SCHEDULER.is_active(worker) for worker in (self.search_worker, self.fill_worker))
+
+    def _search_finished(self, success, message):
+        self.search_worker = None
+        if not success:
+            self.btn_process.setEnabled(True)
+            QMessageBox.critical(self, "错误", f"发生错误：\n{message}")
+
+    def _candidates_found(self, keyword, candidates):
+        # 提取主数据
+        result = self.choose_candidate(keyword, candidates)
+        if not result:
+            self.btn_process.setEnabled(True)
+            return
+
+        # 提取额外输入内容
+        extra_data = {
+            field: self.input_fields[field].text().strip()
+            for field in self.input_fields
+            if self.input_fields[field].text().strip()
+        }
+
+        # 合并数据并原地写入模板 (先写临时文件再原子替换)
+        self.log("正在写入 Excel 模板...")
+        self.fill_worker = AcceptanceFillWorker(self.template_file, self.template_file, result, extra_data)
+        self.fill_worker.log_signal.connect(self.log_view.log, Qt.DirectConnection)
+        self.fill_worker.progress_signal.connect(self.progress_bar.setValue)
+        self.fill_worker.finished_signal.connect(self._fill_finished)
+        JOB_SCHEDULER.submit(Job(f"写入台账模板: {os.path.basename(self.template_file)}", 'excel', self.fill_worker))
+
+    def _fill_finished(self, success, message):
+        self.fill_worker = None
+        self.btn_process.setEnabled(True)
+        self.log(message, not success)
+        if success:
+            QMessageBox.information(self, "成功", message)
+        else:
+            QMessageBox.critical(self, "错误", message)
+
+    def process_batch(self):
+        if not self.data_file or not self.template_file:
+            QMessageBox.warning(self, "错误", "请先选择 数据台账 和 写入模板")
+            return
+        if JOB_SCHEDULER.is_active(self.batch_worker):
+            QMessageBox.warning(self, "操作进行中", "批量填写任务正在运行，请等待其完成。")
+            return
 
+        list_path, _ = QFileDialog.getOpenFileName(self, "选择 批量清单 文件", os.path.dirname(self.template_file),
+                                                   "清单文件 (*.csv *.xlsx)")
+        if not list_path:
+            return
+        output_dir = QFileDialog.getExistingDirectory(self, "选择 输出目录", os.path.dirname(self.template_file))
+        if not output_dir:
+            return
+        try:
+            entries = load_batch_entries(list_path)
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"发生错误：\n{str(e)}")
+            QMessageBox.critical(self, "错误", f"读取清单失败：\n{str(e)}")
+            return
+        if not entries:
+            QMessageBox.warning(self, "无项目", f"清单中没有任何项目，请检查“{ACCEPTANCE_BATCH_KEYWORD_COLUMN}”列。")
+            return
+
+        self.log_view.clear()
+        self.btn_batch.setEnabled(False)
+        # 工作簿在进程池中生成，按进程数占用 CPU 资源
+        max_workers = JOB_RESOURCE_LIMITS['cpu']
+        self.batch_worker = AcceptanceBatchWorker(self.data_file, self.template_file, entries, output_dir,
+                                                  max_workers=max_workers)
+        self.batch_worker.log_signal.connect(self.log_view.log, Qt.DirectConnection)
+        self.batch_worker.finished_signal.connect(self._batch_finished)
+        JOB_SCHEDULER.submit(Job(f"批量填写台账模板 ({len(entries)} 个项目)", 'cpu', self.batch_worker,
+                                 resources={'cpu': max_workers}))
+
+    def _batch_finished(self, success, message):
+        self.btn_batch.setEnabled(True)
+        self.batch_worker = None
+        if success:
+            QMessageBox.information(self, "完成", message)
+        else:
+            QMessageBox.critical(self, "失败", message)
+
+    def log(self, message, is_error=False):
+        self.log_view.log(message, is_error)
+
+    def choose_candidate(self, keyword, candidates):
+        """
+        包含关键词且没有歧义的最佳匹配直接使用，否则列出候选 (按匹配度排序) 由用户选择；返回选中行或 None。
+        只有相近但不包含关键词的候选 (即使只有一个) 不会自动使用，视为未找到。
+        """
+        if not any(match.contains for match, _ in candidates):
+            QMessageBox.warning(self, "未找到", "台账中未找到匹配行")
+            return None
+        best_match, best_row = candidates[0]
+        if best_match.contains and not is_ambiguous([m for m, _ in candidates]):
+            return best_row
+
+        items = [f"{match.text}    (匹配度 {match.score:.0%})" for match, _ in candidates]
+        item, ok = QInputDialog.getItem(self, "选择项目",
+                                        f"台账中有多个项目与关键词 '{keyword}' 相近，请选择：", items, 0, False)
+        if not ok:
+            return None
+        return candidates[items.index(item)][1]
@@ -2,22 +2,23 @@ import os
 import json # Only for settings management of nested dict
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QScrollArea, QGroupBox, QTextEdit, QFileDialog, QMessageBox,
-    QGridLayout
+    QLineEdit, QPushButton, QScrollArea, QGroupBox, QFileDialog, QMessageBox,
+    QGridLayout, QProgressBar
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QTextCursor
 
 from config.settings import FIELD_MAPPING_EXCEL_AND_UI, EXCEL_SHEET_NAME_ACCEPTANCE
-from core.settings_manager import SettingsManager
-from core.excel_utils import fill_excel_template_acceptance
+from core.settings_store import SETTINGS_STORE
+from core.acceptance_worker import TemplateFillWorker
+from core.job_scheduler import JOB_SCHEDULER, Job
+from ui.log_view import LogView
 
 class AcceptanceTestFillingPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.excel_template_path = ""
         self.input_widgets = {}
-        self.settings_manager = SettingsManager("acceptance_filling")
+        self.fill_worker = None
 
         self.init_ui()
 
@@ -56,16 +57,20 @@ class AcceptanceTestFillingPage(QWidget):
         clear_button.clicked.connect(self.clear_all_inputs)
         button_layout.addWidget(clear_button)
 
-        confirm_button = QPushButton("确认并填写 Excel")
-        confirm_button.clicked.connect(self.confirm_and_fill_excel)
-        button_layout.addWidget(confirm_button)
+        self.confirm_button = QPushButton("确认并填写 Excel")
+        self.confirm_button.clicked.connect(self.confirm_and_fill_excel)
+        button_layout.addWidget(self.confirm_button)
 
         main_layout.addLayout(button_layout)
 
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
-        self.log_output.setFixedHeight(150)
-        main_layout.addWidget(self.log_output)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        main_layout.addWidget(self.progress_bar)
+
+        self.log_view = LogView("acceptance")
+        self.log_view.setFixedHeight(180)
+        main_layout.addWidget(self.log_view)
 
     def _create_field_widgets(self):
         """Dynamically creates and lays out QLabel and QLineEdit for all fields in QGridLayout"""
@@ -114,6 +119,9 @@ class AcceptanceTestFillingPage(QWidget):
         if not self.excel_template_path:
             self.log("错误: 请先选择一个 Excel 模板文件！", is_error=True, clear_prev=True)
             return
+        if JOB_SCHEDULER.is_active(self.fill_worker):
+            QMessageBox.warning(self, "操作进行中", "Excel 填充任务正在运行，请等待其完成。")
+            return
 
         QMessageBox.information(self, "请注意", "请确保您要填充的 Excel 模板文件当前是关闭状态，否则可能无法保存。",
                                 QMessageBox.Ok)
@@ -124,29 +132,27 @@ class AcceptanceTestFillingPage(QWidget):
         for field_name, line_edit in self.input_widgets.items():
             entered_data[field_name] = line_edit.text().strip()
 
-        success = fill_excel_template_acceptance(
-            self.excel_template_path, entered_data, FIELD_MAPPING_EXCEL_AND_UI,
-            EXCEL_SHEET_NAME_ACCEPTANCE, self.log
+        self.confirm_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.fill_worker = TemplateFillWorker(
+            self.excel_template_path, entered_data, FIELD_MAPPING_EXCEL_AND_UI, EXCEL_SHEET_NAME_ACCEPTANCE
         )
-        if not success:
-            QMessageBox.critical(self, "操作失败", "填充 Excel 失败，请查看日志获取详情。")
+        self.fill_worker.log_signal.connect(self.log_view.log, Qt.DirectConnection)
+        self.fill_worker.progress_signal.connect(self.progress_bar.setValue)
+        self.fill_worker.finished_signal.connect(self._fill_finished)
+        JOB_SCHEDULER.submit(Job(f"填写验收模板: {os.path.basename(self.excel_template_path)}", 'excel',
+                                 self.fill_worker))
         self.save_settings()
 
+    def _fill_finished(self, success, message):
+        self.confirm_button.setEnabled(True)
+        self.fill_worker = None
+        if not success:
+            QMessageBox.critical(self, "操作失败", message)
+
     def log(self, message: str, is_error: bool = False, clear_prev: bool = False):
         """Displays plain text messages in the log output area, without icons"""
-        if clear_prev:
-            self.log_output.clear()
-
-        cursor = self.log_output.textCursor()
-        format = cursor.charFormat()
-        if is_error:
-            format.setForeground(Qt.red)
-        else:
-            format.setForeground(Qt.black)
-        cursor.setCharFormat(format)
-
-        self.log_output.append(message)
-        self.log_output.ensureCursorVisible()
+        self.log_view.log(message, is_error, clear=clear_prev)
 
     def save_settings(self):
         """Saves settings specific to this tab."""
@@ -154,15 +160,11 @@ class AcceptanceTestFillingPage(QWidget):
             "excel_template_path": self.excel_path_input.text(),
             "input_data": {k: v.text() for k, v in self.input_widgets.items()}
         }
-        self.settings_manager.save_settings("acceptance_filling", settings, self.log)
+        SETTINGS_STORE.update("acceptance_filling", settings)
 
     def load_settings(self):
         """Loads settings specific to this tab."""
-        loaded_settings = self.settings_manager.load_settings(
-            "acceptance_filling",
-            default_settings={"excel_template_path": "", "input_data": {}},
-            log_callback=self.log
-        )
+        loaded_settings = SETTINGS_STORE.section("acceptance_filling")
         excel_path = loaded_settings.get("excel_template_path", "")
         self.excel_template_path = excel_path
         self.excel_path_input.setText(excel_path)
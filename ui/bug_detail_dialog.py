@@ -0,0 +1,117 @@
+# ui/bug_detail_dialog.py - BUG 详情对话框
+#
+# 非模态，整个页面共用一个实例：先用列表中已有的字段显示概要，详情 (缓存或后台获取) 到达后再填充各标签页。
+
+import html
+
+from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtGui import QDesktopServices
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QLabel, QTabWidget, QTextBrowser, QListWidget, QListWidgetItem
+)
+
+
+def _size_text(size):
+    if not size:
+        return ""
+    if size < 1024 * 1024:
+        return f" ({size / 1024:.1f} KB)"
+    return f" ({size / 1024 / 1024:.1f} MB)"
+
+
+class BugDetailDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("BUG详情")
+        self.resize(760, 600)
+        self.bug_id = None
+
+        layout = QVBoxLayout(self)
+        self.title_label = QLabel()
+        self.title_label.setWordWrap(True)
+        self.title_label.setStyleSheet("font-weight: bold; font-size: 14px;")
+        self.title_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.title_label)
+
+        self.info_label = QLabel()
+        self.info_label.setWordWrap(True)
+        self.info_label.setStyleSheet("color: #555;")
+        layout.addWidget(self.info_label)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.tabs = QTabWidget()
+        self.steps_view = QTextBrowser()
+        self.tabs.addTab(self.steps_view, "重现步骤")
+        self.history_view = QTextBrowser()
+        self.tabs.addTab(self.history_view, "历史记录")
+        self.comments_view = QTextBrowser()
+        self.tabs.addTab(self.comments_view, "评论")
+        self.files_list = QListWidget()
+        self.files_list.itemDoubleClicked.connect(self._open_file)
+        self.tabs.addTab(self.files_list, "附件")
+        layout.addWidget(self.tabs)
+
+    def _show_summary(self, bug):
+        self.title_label.setText(f"#{bug.get('id', '')} {bug.get('title', '')}")
+        parts = [("状态", bug.get('status')), ("严重程度", bug.get('severity')), ("指派给", bug.get('assigned_to')),
+                 ("创建人", bug.get('opened_by')), ("创建时间", bug.get('opened_date'))]
+        if bug.get('resolution'):
+            parts.append(("解决方案", bug['resolution']))
+        if bug.get('last_edited_date'):
+            parts.append(("最后编辑", bug['last_edited_date']))
+        self.info_label.setText("    ".join(f"{name}: {value}" for name, value in parts if value))
+
+    def show_loading(self, bug):
+        """显示列表中的概要信息，详情到达前清空各标签页"""
+        self.bug_id = str(bug.get('id', ''))
+        self._show_summary(bug)
+        self.status_label.setText("正在加载详情...")
+        for view in (self.steps_view, self.history_view, self.comments_view):
+            view.clear()
+        self.files_list.clear()
+
+    def show_detail(self, detail, note=""):
+        self.bug_id = detail['id']
+        self._show_summary(detail)
+        self.status_label.setText(note)
+        self.steps_view.setHtml(detail.get('steps_html') or "<i>(无)</i>")
+
+        history_lines, comment_lines = [], []
+        for item in detail.get('history', []):
+            head = html.escape(" ".join(part for part in (item['date'], item['actor'], item['action']) if part))
+            line = f"<b>{head}</b>"
+            for field, old, new in item.get('changes', []):
+                line += f"<br>&nbsp;&nbsp;{html.escape(field)}: {html.escape(old)} → {html.escape(new)}"
+            if item.get('comment'):
+                comment = html.escape(item['comment']).replace("\n", "<br>")
+                line += f"<br>{comment}"
+                comment_lines.append(f"<b>{head}</b><br>{comment}")
+            history_lines.append(line)
+        self.history_view.setHtml("<br><br>".join(history_lines) or "<i>(无)</i>")
+        self.comments_view.setHtml("<br><br>".join(comment_lines) or "<i>(无)</i>")
+        self.tabs.setTabText(2, f"评论 ({len(comment_lines)})")
+
+        self.files_list.clear()
+        for file in detail.get('files', []):
+            item = QListWidgetItem(file['title'] + _size_text(file.get('size')))
+            item.setData(Qt.UserRole, file.get('url'))
+            item.setToolTip("双击在浏览器中打开")
+            self.files_list.addItem(item)
+        self.tabs.setTabText(3, f"附件 ({len(detail.get('files', []))})")
+
+    def show_error(self, bug_id, message):
+        if str(bug_id) == self.bug_id:
+            self.status_label.setText(f'<span style="color:red">{html.escape(message)}</span>')
+
+    def _open_file(self, item):
+        url = item.data(Qt.UserRole)
+        if url:
+            QDesktopServices.openUrl(QUrl(url))
+
+    def present(self):
+        if not self.isVisible():
+            self.show()
+        self.raise_()
+        self.activateWindow()
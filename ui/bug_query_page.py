@@ -5,16 +5,25 @@ import json
 from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QComboBox, QDateEdit, QTextEdit, QTableWidget, QTableWidgetItem,
+    QComboBox, QDateEdit, QTableView,
     QGroupBox, QGridLayout, QHeaderView, QMessageBox, QFileDialog,
     QCheckBox, QProgressBar, QSplitter, QTabWidget
 )
-from PyQt5.QtCore import Qt, QDate, pyqtSignal
-from PyQt5.QtGui import QTextCursor
-
-from core.settings_manager import SettingsManager
-from config.settings import BUG_QUERY_STATUS_OPTIONS, BUG_SEVERITY_OPTIONS
-import pandas as pd
+from PyQt5.QtCore import Qt, QDate, QTimer, pyqtSignal
+
+from core.settings_store import SETTINGS_STORE
+from core.export_worker import BugExportWorker
+from core.bug_filter import BugQueryIndex
+from core.query_cache import QueryResultCache
+from core.bug_detail import BugDetailCache
+from core.bug_detail_worker import BugDetailWorker
+from core.job_scheduler import JOB_SCHEDULER, Job, PRIORITY_NORMAL, PRIORITY_LOW
+from ui.bug_table import BugTableModel, BugFilterProxyModel, ActionButtonDelegate
+from ui.bug_detail_dialog import BugDetailDialog
+from ui.log_view import LogView
+from config.settings import (
+    BUG_QUERY_STATUS_OPTIONS, BUG_SEVERITY_OPTIONS, ZEN_TAO_BASE_URL, BUG_DETAIL_PREFETCH_RADIUS
+)
 
 
 class BugQueryPage(QWidget):
@@ -22,9 +31,16 @@ class BugQueryPage(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.settings_manager = SettingsManager("bug_query")
         self.bug_query_worker = None
+        self.export_worker = None
         self.bug_data = []
+        self.query_index = None  # 已加载结果的本地筛选索引
+        self.query_cache = QueryResultCache()
+        self._pending_cache = None  # 正在进行的查询: (缓存键, 已显示的缓存结果摘要 或 None)
+        self.detail_cache = BugDetailCache()
+        self.detail_worker = None  # 常驻的详情获取线程，第一次需要时创建
+        self._retired_workers = []  # 已通知退出、尚未结束的详情获取线程
+        self.detail_dialog = None
         self.user_info = None  # 当前登录用户信息
 
         self.init_ui()
@@ -182,20 +198,69 @@ class BugQueryPage(QWidget):
         self.progress_bar.setVisible(False)
         bug_list_layout.addWidget(self.progress_bar)
 
-        # BUG列表表格
-        self.bug_table = QTableWidget()
-        self.bug_table.setColumnCount(8)
-        self.bug_table.setHorizontalHeaderLabels([
-            "BUG ID", "标题", "状态", "创建人", "创建时间",
-            "严重程度", "指派给", "操作"
-        ])
+        # 本地筛选 (只在已加载的结果中筛选，不重新查询禅道)
+        filter_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索标题...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.apply_local_filter)
+        filter_layout.addWidget(self.search_input, 2)
+
+        self.local_filter_combos = {}
+        for key, label in (('status', "状态"), ('severity', "严重程度"), ('assigned_to', "指派给")):
+            filter_layout.addWidget(QLabel(label + ":"))
+            combo = QComboBox()
+            combo.addItem("全部")
+            combo.currentIndexChanged.connect(self.apply_local_filter)
+            filter_layout.addWidget(combo, 1)
+            self.local_filter_combos[key] = combo
+
+        self.local_date_cb = QCheckBox("创建日期:")
+        self.local_date_cb.toggled.connect(self.apply_local_filter)
+        filter_layout.addWidget(self.local_date_cb)
+        self.local_date_from = QDateEdit()
+        self.local_date_from.setCalendarPopup(True)
+        self.local_date_from.setDate(QDate.currentDate().addDays(-30))
+        self.local_date_from.dateChanged.connect(self.apply_local_filter)
+        filter_layout.addWidget(self.local_date_from)
+        filter_layout.addWidget(QLabel("至"))
+        self.local_date_to = QDateEdit()
+        self.local_date_to.setCalendarPopup(True)
+        self.local_date_to.setDate(QDate.currentDate())
+        self.local_date_to.dateChanged.connect(self.apply_local_filter)
+        filter_layout.addWidget(self.local_date_to)
+        bug_list_layout.addLayout(filter_layout)
+
+        # BUG列表表格 (模型/视图：只绘制可见行，详情按钮由委托绘制)
+        self.bug_model = BugTableModel(self)
+        self.bug_proxy = BugFilterProxyModel(self)
+        self.bug_proxy.setSourceModel(self.bug_model)
+        self.bug_table = QTableView()
+        self.bug_table.setModel(self.bug_proxy)
+        self.action_delegate = ActionButtonDelegate(self.bug_table)
+        self.action_delegate.clicked.connect(lambda row: self.show_bug_detail(self._bug_at(row)))
+        self.bug_table.setItemDelegateForColumn(self.bug_model.action_column, self.action_delegate)
 
         # 设置表格属性
         header = self.bug_table.horizontalHeader()
         header.setStretchLastSection(True)
         header.setSectionResizeMode(1, QHeaderView.Stretch)  # 标题列自适应
+        # 固定行高，避免按内容计算每一行的高度
+        vertical_header = self.bug_table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(26)
+        self.bug_table.setWordWrap(False)
         self.bug_table.setAlternatingRowColors(True)
-        self.bug_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.bug_table.setSelectionBehavior(QTableView.SelectRows)
+        self.bug_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.bug_table.setSortingEnabled(True)
+
+        # 选中行变化后稍等片刻再预取附近行的详情，连续移动选中行时只预取最后停留的位置
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(300)
+        self.prefetch_timer.timeout.connect(self._prefetch_details)
+        self.bug_table.selectionModel().currentRowChanged.connect(lambda *_: self.prefetch_timer.start())
 
         bug_list_layout.addWidget(self.bug_table)
         tab_widget.addTab(bug_list_tab, "BUG列表")
@@ -204,17 +269,15 @@ class BugQueryPage(QWidget):
         log_tab = QWidget()
         log_layout = QVBoxLayout(log_tab)
 
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
-        self.log_output.setMaximumHeight(200)
-        self.log_output.setStyleSheet("""
-            QTextEdit {
+        self.log_view = LogView("bug_query", timestamps=True)
+        self.log_view.text.setStyleSheet("""
+            QPlainTextEdit {
                 background-color: #f5f5f5;
                 font-family: 'Consolas', 'Monaco', monospace;
                 font-size: 12px;
             }
         """)
-        log_layout.addWidget(self.log_output)
+        log_layout.addWidget(self.log_view)
         tab_widget.addTab(log_tab, "操作日志")
 
         layout.addWidget(tab_widget)
@@ -253,6 +316,7 @@ class BugQueryPage(QWidget):
 
         if reply == QMessageBox.Yes:
             self.save_settings()
+            SETTINGS_STORE.flush()  # 用户明确要求保存，立即写入
             QMessageBox.information(self, "保存成功", "管理员配置已保存")
             self.log("管理员配置已保存")
 
@@ -280,10 +344,23 @@ class BugQueryPage(QWidget):
             'include_closed': self.include_closed_cb.isChecked()
         }
 
-
-        self.log("开始查询历史BUG...", clear=True)
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # 不确定进度条
+        # 相同条件的结果先从缓存显示；过期的缓存在后台重新查询，数据变化时才刷新表格
+        cache_key = QueryResultCache.make_key(ZEN_TAO_BASE_URL, self.manager_account_input.text(),
+                                              self.product_name_input.text(), query_params)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            self.log(f"使用缓存的查询结果 ({cached.age:.0f} 秒前查询，{len(cached.bugs)} 条记录)", clear=True)
+            self.display_bug_data(cached.bugs)
+            self.export_btn.setEnabled(len(self.bug_data) > 0)
+            if cached.is_fresh:
+                self.log(self.query_cache.stats_text())
+                return
+            self.log("缓存已过期，正在后台重新查询...")
+        else:
+            self.log("开始查询历史BUG...", clear=True)
+            self.progress_bar.setVisible(True)
+            self.progress_bar.setRange(0, 0)  # 不确定进度条
+        self._pending_cache = (cache_key, cached.digest if cached is not None else None)
         self.query_btn.setEnabled(False)
 
         # 创建查询工作线程
@@ -297,20 +374,43 @@ class BugQueryPage(QWidget):
         )
 
         # 连接信号
-        self.bug_query_worker.log_signal.connect(self.log)
+        self.bug_query_worker.log_signal.connect(self.log_view.log, Qt.DirectConnection)
         self.bug_query_worker.finished_signal.connect(self.query_finished)
         self.bug_query_worker.progress_signal.connect(self.progress_bar.setValue)
-        self.bug_query_worker.bug_data_signal.connect(self.display_bug_data)
-
-        # 启动查询
-        self.bug_query_worker.start()
+        self.bug_query_worker.bug_data_signal.connect(self._query_result_received)
+
+        # 提交查询任务；后台刷新缓存时用户已看到结果，优先级较低
+        JOB_SCHEDULER.submit(Job(f"历史BUG查询: {self.product_name_input.text() or '全部产品'}", 'query',
+                                 self.bug_query_worker,
+                                 priority=PRIORITY_LOW if cached is not None else PRIORITY_NORMAL))
+
+    def _query_result_received(self, bug_list):
+        """保存查询结果到缓存；后台刷新时数据未变化则不重新加载表格"""
+        cache_key, cached_digest = self._pending_cache
+        digest = self.query_cache.put(cache_key, bug_list)
+        if cached_digest is not None:
+            changed = digest != cached_digest
+            self.query_cache.record_refresh(changed)
+            if not changed:
+                self.log("后台刷新完成，数据未变化。")
+                return
+            self.log("后台刷新完成，数据有变化，已更新表格。")
+        self.display_bug_data(bug_list)
 
     def query_finished(self, success, message):
         """查询完成处理"""
         self.progress_bar.setVisible(False)
         self.query_btn.setEnabled(True)
-
-        if success:
+        revalidating = self._pending_cache is not None and self._pending_cache[1] is not None
+        self._pending_cache = None
+        self.log(self.query_cache.stats_text())
+
+        if revalidating:
+            # 后台刷新不弹出提示，表格中已显示缓存结果
+            if not success:
+                self.log(f"后台刷新失败，当前显示的是缓存结果: {message}", is_error=True)
+            self.export_btn.setEnabled(len(self.bug_data) > 0)
+        elif success:
             self.export_btn.setEnabled(len(self.bug_data) > 0)
             self.log(f"查询完成: {message}")
             QMessageBox.information(self, "查询完成", message)
@@ -321,31 +421,121 @@ class BugQueryPage(QWidget):
     def display_bug_data(self, bug_list):
         """显示BUG数据"""
         self.bug_data = bug_list
-        self.result_label.setText(f"查询结果: {len(bug_list)} 条记录")
-
-        # 清空表格
-        self.bug_table.setRowCount(0)
-
-        # 填充数据
-        for i, bug in enumerate(bug_list):
-            self.bug_table.insertRow(i)
-            self.bug_table.setItem(i, 0, QTableWidgetItem(str(bug.get('id', ''))))
-            self.bug_table.setItem(i, 1, QTableWidgetItem(bug.get('title', '')))
-            self.bug_table.setItem(i, 2, QTableWidgetItem(bug.get('status', '')))
-            self.bug_table.setItem(i, 3, QTableWidgetItem(bug.get('opened_by', '')))
-            self.bug_table.setItem(i, 4, QTableWidgetItem(bug.get('opened_date', '')))
-            self.bug_table.setItem(i, 5, QTableWidgetItem(bug.get('severity', '')))
-            self.bug_table.setItem(i, 6, QTableWidgetItem(bug.get('assigned_to', '')))
-
-            # 操作按钮
-            action_btn = QPushButton("详情")
-            action_btn.clicked.connect(lambda checked, bug_id=bug.get('id'): self.show_bug_detail(bug_id))
-            self.bug_table.setCellWidget(i, 7, action_btn)
-
-    def show_bug_detail(self, bug_id):
-        """显示BUG详情"""
-        # 这里可以实现BUG详情显示功能
-        QMessageBox.information(self, "BUG详情", f"BUG ID: {bug_id}\n详情功能待实现")
+        self.bug_model.set_bugs(bug_list)
+        self.query_index = BugQueryIndex(bug_list)
+
+        self._populate_local_filters(self.query_index.categories)
+        self.bug_proxy.set_query_index(self.query_index)
+        self.apply_local_filter()
+
+    def _populate_local_filters(self, categories):
+        """筛选下拉框只列出结果中实际出现的值"""
+        for key, combo in self.local_filter_combos.items():
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem("全部")
+            for value in categories.get(key, []):
+                combo.addItem(value if value else "(空)", value)
+            combo.blockSignals(False)
+
+    def apply_local_filter(self, *_):
+        """按本地筛选条件刷新表格 (见 core.bug_filter)"""
+        filters = {key: combo.currentData() if combo.currentIndex() > 0 else None
+                   for key, combo in self.local_filter_combos.items()}
+        if self.local_date_cb.isChecked():
+            filters['date_from'] = self.local_date_from.date().toString("yyyy-MM-dd")
+            filters['date_to'] = self.local_date_to.date().toString("yyyy-MM-dd")
+        filters['text'] = self.search_input.text()
+        self.bug_proxy.set_filters(**filters)
+
+        shown = self.bug_proxy.rowCount()
+        if shown == len(self.bug_data):
+            self.result_label.setText(f"查询结果: {len(self.bug_data)} 条记录")
+        else:
+            self.result_label.setText(f"查询结果: {len(self.bug_data)} 条记录 (筛选后显示 {shown} 条)")
+
+    def _bug_at(self, proxy_row):
+        return self.bug_data[self.bug_proxy.source_row(proxy_row)]
+
+    def _ensure_detail_worker(self):
+        """返回详情获取线程；未配置管理员账号时返回 None"""
+        account = self.manager_account_input.text()
+        password = self.manager_password_input.text()
+        if not account or not password:
+            return None
+        worker = self.detail_worker
+        if worker and (worker.manager_account, worker.manager_password) == (account, password):
+            return worker
+        self._retire_detail_worker()  # 管理员账号已变更
+        worker = self.detail_worker = BugDetailWorker(account, password, self.detail_cache)
+        worker.log_signal.connect(self.log_view.log, Qt.DirectConnection)
+        worker.detail_signal.connect(self._detail_received)
+        worker.failed_signal.connect(self._detail_failed)
+        worker.start()
+        return worker
+
+    def show_bug_detail(self, bug):
+        """显示BUG详情：有缓存时立即显示，缓存过期或没有缓存时在后台获取"""
+        if self.detail_dialog is None:
+            self.detail_dialog = BugDetailDialog(self)
+        dialog = self.detail_dialog
+        cached = self.detail_cache.get(bug['id'])
+        if cached is not None:
+            dialog.show_detail(cached.detail, "" if cached.is_fresh else "正在检查是否有更新...")
+        else:
+            dialog.show_loading(bug)
+        dialog.present()
+        if cached is not None and cached.is_fresh:
+            return
+
+        worker = self._ensure_detail_worker()
+        if worker is None:
+            dialog.show_error(bug['id'], "请先配置管理员账号，才能获取BUG详情。")
+            return
+        worker.request(bug['id'])
+
+    def _detail_received(self, bug_id, detail):
+        dialog = self.detail_dialog
+        if dialog is not None and dialog.isVisible() and dialog.bug_id == bug_id:
+            dialog.show_detail(detail)
+
+    def _detail_failed(self, bug_id, message):
+        if self.detail_dialog is not None:
+            self.detail_dialog.show_error(bug_id, message)
+
+    def _prefetch_details(self):
+        """在后台获取当前选中行前后若干行的详情 (已缓存的跳过)"""
+        current = self.bug_table.currentIndex()
+        if not current.isValid():
+            return
+        first = max(0, current.row() - BUG_DETAIL_PREFETCH_RADIUS)
+        last = min(self.bug_proxy.rowCount() - 1, current.row() + BUG_DETAIL_PREFETCH_RADIUS)
+        # 由近到远
+        rows = sorted(range(first, last + 1), key=lambda row: abs(row - current.row()))
+        bug_ids = []
+        for row in rows:
+            bug = self._bug_at(row)
+            cached = self.detail_cache.get(bug['id'])
+            if cached is None or not cached.is_fresh:
+                bug_ids.append(bug['id'])
+        if bug_ids:
+            worker = self._ensure_detail_worker()
+            if worker is not None:
+                worker.prefetch(bug_ids)
+
+    def _retire_detail_worker(self):
+        """通知详情获取线程退出；正在请求的一批完成后线程才会结束，此前保留引用"""
+        worker, self.detail_worker = self.detail_worker, None
+        if worker is not None and worker.isRunning():
+            worker.stop()
+            self._retired_workers.append(worker)
+            worker.finished.connect(lambda: self._retired_workers.remove(worker))
+
+    def stop_background_tasks(self):
+        """程序退出时停止详情获取线程"""
+        self._retire_detail_worker()
+        for worker in list(self._retired_workers):
+            worker.wait(3000)
 
     def export_results(self):
         """导出查询结果"""
@@ -359,76 +549,60 @@ class BugQueryPage(QWidget):
             "Excel Files (*.xlsx);;CSV Files (*.csv)"
         )
 
-        if file_name:
-            try:
-                # 准备导出数据
-                export_data = []
-                for bug in self.bug_data:
-                    export_data.append({
-                        'BUG ID': bug.get('id', ''),
-                        '标题': bug.get('title', ''),
-                        '状态': bug.get('status', ''),
-                        '创建人': bug.get('opened_by', ''),
-                        '创建时间': bug.get('opened_date', ''),
-                        '严重程度': bug.get('severity', ''),
-                        '指派给': bug.get('assigned_to', ''),
-                    })
-
-                df = pd.DataFrame(export_data)
-
-                if file_name.endswith('.xlsx'):
-                    with pd.ExcelWriter(file_name, engine='openpyxl') as writer:
-                        df.to_excel(writer, sheet_name='BUG查询结果', index=False)
-
-                        # 添加查询信息到第二个sheet
-                        query_info = {
-                            '查询时间': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-                            '操作人': [self.user_info.real_name if self.user_info else ''],
-                            '产品名称': [self.product_name_input.text()],
-                            '查询状态': [self.status_combo.currentText()],
-                            '严重程度': [self.severity_combo.currentText()],
-                            '开始日期': [self.start_date.date().toString("yyyy-MM-dd")],
-                            '结束日期': [self.end_date.date().toString("yyyy-MM-dd")],
-                            '结果数量': [len(self.bug_data)]
-                        }
-                        query_df = pd.DataFrame(query_info)
-                        query_df.to_excel(writer, sheet_name='查询信息', index=False)
-                else:
-                    df.to_csv(file_name, index=False, encoding='utf-8-sig')
-
-                self.log(f"导出成功: {file_name}")
-                QMessageBox.information(self, "导出成功", f"数据已导出到: {file_name}")
-
-            except Exception as e:
-                self.log(f"导出失败: {e}", is_error=True)
-                QMessageBox.critical(self, "导出失败", f"导出过程中发生错误: {e}")
+        if not file_name:
+            return
+        if JOB_SCHEDULER.is_active(self.export_worker):
+            QMessageBox.warning(self, "操作进行中", "导出任务正在运行，请等待其完成。")
+            return
+
+        # 查询信息写入 xlsx 的第二个工作表
+        query_info = {
+            '查询时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            '操作人': self.user_info.real_name if self.user_info else '',
+            '产品名称': self.product_name_input.text(),
+            '查询状态': self.status_combo.currentText(),
+            '严重程度': self.severity_combo.currentText(),
+            '开始日期': self.start_date.date().toString("yyyy-MM-dd"),
+            '结束日期': self.end_date.date().toString("yyyy-MM-dd"),
+            '结果数量': len(self.bug_data)
+        }
+
+        # 逐行流式写出 (xlsx 使用 write_only 模式)，在后台线程中执行并显示进度
+        self.export_btn.setEnabled(False)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.export_worker = BugExportWorker(file_name, self.bug_data, query_info)
+        self.export_worker.log_signal.connect(self.log_view.log, Qt.DirectConnection)
+        self.export_worker.progress_signal.connect(self.progress_bar.setValue)
+        self.export_worker.finished_signal.connect(self.export_finished)
+        JOB_SCHEDULER.submit(Job(f"导出BUG查询结果: {os.path.basename(file_name)}", 'io', self.export_worker))
+
+    def export_finished(self, success, message):
+        """导出完成处理"""
+        self.export_worker = None
+        self.progress_bar.setVisible(False)
+        self.export_btn.setEnabled(len(self.bug_data) > 0)
+        if success:
+            self.log(f"导出成功: {message}")
+            QMessageBox.information(self, "导出成功", message)
+        else:
+            self.log(f"导出失败: {message}", is_error=True)
+            QMessageBox.critical(self, "导出失败", message)
 
     def clear_results(self):
         """清空查询结果"""
         self.bug_data = []
-        self.bug_table.setRowCount(0)
+        self.query_index = None
+        self.bug_model.clear()
+        self._populate_local_filters({})
         self.result_label.setText("查询结果: 0 条记录")
         self.export_btn.setEnabled(False)
         self.log("查询结果已清空")
 
     def log(self, message, is_error=False, clear=False):
         """添加日志"""
-        if clear:
-            self.log_output.clear()
-
-        timestamp = datetime.now().strftime("[%H:%M:%S]")
-        formatted_message = f"{timestamp} {message}"
-
-        cursor = self.log_output.textCursor()
-        format = cursor.charFormat()
-        if is_error:
-            format.setForeground(Qt.red)
-        else:
-            format.setForeground(Qt.black)
-        cursor.setCharFormat(format)
-
-        self.log_output.append(formatted_message)
-        self.log_output.ensureCursorVisible()
+        self.log_view.log(message, is_error, clear=clear)
 
     def save_settings(self):
         """保存设置"""
@@ -441,23 +615,11 @@ class BugQueryPage(QWidget):
             "include_resolved": self.include_resolved_cb.isChecked(),
             "include_closed": self.include_closed_cb.isChecked()
         }
-        self.settings_manager.save_settings("bug_query", settings, self.log)
+        SETTINGS_STORE.update("bug_query", settings)
 
     def load_settings(self):
         """加载设置"""
-        default_settings = {
-            "manager_account": "",
-            "manager_password": "",
-            "product_name": "",
-            "status_index": 0,
-            "severity_index": 0,
-            "include_resolved": True,
-            "include_closed": False
-        }
-
-        loaded_settings = self.settings_manager.load_settings(
-            "bug_query", default_settings, self.log
-        )
+        loaded_settings = SETTINGS_STORE.section("bug_query")
 
         self.manager_account_input.setText(loaded_settings.get("manager_account", ""))
         self.manager_password_input.setText(loaded_settings.get("manager_password", ""))
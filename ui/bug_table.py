@@ -0,0 +1,213 @@
+# ui/bug_table.py - BUG 列表的模型与视图组件
+#
+# 数据按列存储，表格只为当前可见的单元格请求数据；“详情”列由委托直接绘制按钮，
+# 不为每一行创建控件。十万行结果也能立即显示并流畅滚动。
+# 本地筛选和排序由 BugFilterProxyModel 完成：行映射直接取自 core.bug_filter 的索引结果，
+# 不对每一行回调 Python 过滤函数。
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex, QEvent, pyqtSignal
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+
+from core.bug_export import BUG_EXPORT_COLUMNS
+
+TITLE_COLUMN = 1
+ACTION_TEXT = "详情"
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+class BugColumnStore:
+    """按列存储 BUG 字段：每列一个字符串列表，列内重复的值 (状态、指派人等) 共用同一个字符串对象"""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.columns = [[] for _ in keys]
+        self.row_count = 0
+
+    def load(self, bugs):
+        columns = []
+        for key in self.keys:
+            pool = {}
+            columns.append([pool.setdefault(text, text) for text in (_text(bug.get(key)) for bug in bugs)])
+        self.columns = columns
+        self.row_count = len(bugs)
+
+    def value(self, row, column):
+        return self.columns[column][row]
+
+
+class BugTableModel(QAbstractTableModel):
+    """BUG 查询结果的表格模型，最后一列为“详情”操作列"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._store = BugColumnStore([key for _, key in BUG_EXPORT_COLUMNS])
+        self._headers = [name for name, _ in BUG_EXPORT_COLUMNS] + ["操作"]
+        self.action_column = len(BUG_EXPORT_COLUMNS)
+
+    def set_bugs(self, bugs):
+        self.beginResetModel()
+        self._store.load(bugs)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_bugs([])
+
+    def bug_id(self, row):
+        return self._store.value(row, 0)
+
+    def column_key(self, column):
+        """列对应的 BUG 字段名，操作列为 None"""
+        return BUG_EXPORT_COLUMNS[column][1] if 0 <= column < self.action_column else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._store.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if column == self.action_column:
+            return ACTION_TEXT if role == Qt.DisplayRole else None
+        if role == Qt.DisplayRole or (role == Qt.ToolTipRole and column == TITLE_COLUMN):
+            return self._store.value(index.row(), column)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+
+class BugFilterProxyModel(QAbstractProxyModel):
+    """按 BugQueryIndex (core.bug_filter) 的筛选和排序结果显示源模型中的行"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._query_index = None
+        self._filters = {}
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        self._rows = []  # 代理行号 -> 源行号
+        self._source_to_proxy = None  # 按需生成的反向映射
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        old_model = self.sourceModel()
+        if old_model is not None:
+            old_model.modelAboutToBeReset.disconnect(self.beginResetModel)
+            old_model.modelReset.disconnect(self._source_reset)
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._source_reset)
+        self._query_index = None
+        self._set_rows(list(range(model.rowCount())))
+        self.endResetModel()
+
+    def _source_reset(self):
+        # 源数据已更换，旧索引失效；在 set_query_index 之前按原顺序显示全部行
+        self._query_index = None
+        self._set_rows(list(range(self.sourceModel().rowCount())))
+        self.endResetModel()
+
+    def _set_rows(self, rows):
+        self._rows = rows
+        self._source_to_proxy = None
+
+    def set_query_index(self, query_index):
+        """设置与源模型数据对应的索引，并按当前的筛选条件和排序刷新"""
+        self._query_index = query_index
+        self.refresh()
+
+    def set_filters(self, **filters):
+        """筛选条件见 BugQueryIndex.filter"""
+        self._filters = filters
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        if self._query_index is None:
+            rows = list(range(self.sourceModel().rowCount())) if self.sourceModel() else []
+        else:
+            rows = self._query_index.filter(**self._filters)
+            key = self.sourceModel().column_key(self._sort_column)
+            if key:
+                rows = self._query_index.sort_rows(rows, key, descending=self._sort_order == Qt.DescendingOrder)
+        self._set_rows(rows)
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self.refresh()
+
+    def source_row(self, proxy_row):
+        return self._rows[proxy_row]
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows) and 0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        model = self.sourceModel()
+        return 0 if parent.isValid() or model is None else model.columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._source_to_proxy is None:
+            self._source_to_proxy = {source_row: proxy_row for proxy_row, source_row in enumerate(self._rows)}
+        proxy_row = self._source_to_proxy.get(source_index.row())
+        return QModelIndex() if proxy_row is None else self.createIndex(proxy_row, source_index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and self.sourceModel() is not None:
+            return self.sourceModel().headerData(section, orientation, role)
+        if orientation == Qt.Vertical and role == Qt.DisplayRole:
+            return section + 1
+        return None
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """在单元格中绘制按钮 (不创建 QPushButton 控件)，在按钮上松开鼠标时发出 clicked(行号)"""
+    clicked = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pressed = None  # 按下鼠标时所在的 (行, 列)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data(Qt.DisplayRole) or ""
+        button.state = QStyle.State_Enabled | QStyle.State_Raised
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            self._pressed = (index.row(), index.column())
+            return True
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            pressed, self._pressed = self._pressed, None
+            if pressed == (index.row(), index.column()) and option.rect.contains(event.pos()):
+                self.clicked.emit(index.row())
+            return True
+        return False
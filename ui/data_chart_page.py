@@ -1,19 +1,24 @@
 import os
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QGroupBox, QTextEdit, QFileDialog, QMessageBox,
-    QGridLayout
+    QLineEdit, QPushButton, QGroupBox, QFileDialog, QMessageBox,
+    QGridLayout, QComboBox, QSpinBox
 )
 from PyQt5.QtCore import Qt, QThread
-from PyQt5.QtGui import QTextCursor
 
-from core.settings_manager import SettingsManager
-from core.excel_worker import ExcelWorker # 确保导入了新的worker
+from core.settings_store import SETTINGS_STORE
+from core.excel_worker import ExcelWorker, ExcelBatchWorker # 确保导入了新的worker
+from core.batch_consolidation import discover_jobs
+from core.job_scheduler import JOB_SCHEDULER, Job
+from ui.log_view import LogView
+from config.settings import (
+    CONSOLIDATION_ENGINES, CONSOLIDATION_ENGINE_DEFAULT, CONSOLIDATION_WRITE_MODES, CONSOLIDATION_WRITE_MODE_DEFAULT,
+    BATCH_MAX_WRITERS_DEFAULT
+)
 
 class ZentaoDataChartPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.settings_manager = SettingsManager("data_chart")
         self.excel_worker_thread = None
 
         self.doc1_path_input = QLineEdit()
@@ -21,7 +26,10 @@ class ZentaoDataChartPage(QWidget):
         self.doc3_path_input = QLineEdit()
         self.doc4_path_input = QLineEdit()
         self.target_report_path_input = QLineEdit()
-        self.log_output = QTextEdit()
+        self.engine_combo = QComboBox()
+        self.writers_spin = QSpinBox()
+        self.write_mode_combo = QComboBox()
+        self.log_view = LogView("data_chart")
 
         self.init_ui()
 
@@ -74,6 +82,25 @@ class ZentaoDataChartPage(QWidget):
             lambda: self.select_file(self.target_report_path_input, "Excel Files (*.xlsx *.xlsm)"))
         paths_layout.addWidget(btn_target, 4, 2)
 
+        paths_layout.addWidget(QLabel("汇总引擎:"), 5, 0)
+        self.engine_combo.addItems(CONSOLIDATION_ENGINES)
+        self.engine_combo.setToolTip("xlwings: 使用本机 Microsoft Excel；openpyxl: 纯 Python，无需安装 Excel")
+        self.engine_combo.currentIndexChanged.connect(lambda _: self.save_settings())
+        paths_layout.addWidget(self.engine_combo, 5, 1)
+
+        paths_layout.addWidget(QLabel("并行写入进程数:"), 6, 0)
+        self.writers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.writers_spin.setValue(BATCH_MAX_WRITERS_DEFAULT)
+        self.writers_spin.setToolTip("批量汇总时同时写入报告的进程数 (xlwings 引擎下即同时运行的 Excel 实例数)")
+        self.writers_spin.valueChanged.connect(lambda _: self.save_settings())
+        paths_layout.addWidget(self.writers_spin, 6, 1)
+
+        paths_layout.addWidget(QLabel("写入模式:"), 7, 0)
+        self.write_mode_combo.addItems(CONSOLIDATION_WRITE_MODES)
+        self.write_mode_combo.setToolTip("replace: 清除旧数据后整体写入；diff: 只写入发生变化的行，适合重复汇总")
+        self.write_mode_combo.currentIndexChanged.connect(lambda _: self.save_settings())
+        paths_layout.addWidget(self.write_mode_combo, 7, 1)
+
         paths_group.setLayout(paths_layout)
         main_layout.addWidget(paths_group)
 
@@ -82,15 +109,19 @@ class ZentaoDataChartPage(QWidget):
         btn_consolidate.clicked.connect(self.consolidate_data)
         control_layout.addWidget(btn_consolidate)
 
+        self.btn_batch = QPushButton("批量汇总...")
+        self.btn_batch.setToolTip("选择包含多份报告的文件夹：每个子文件夹一份报告，或在文件夹中放置 manifest.json / manifest.csv")
+        self.btn_batch.clicked.connect(self.consolidate_batch)
+        control_layout.addWidget(self.btn_batch)
+
         btn_clear_paths = QPushButton("清空所有路径")
         btn_clear_paths.clicked.connect(self.clear_all_paths)
         control_layout.addWidget(btn_clear_paths)
 
         main_layout.addLayout(control_layout)
 
-        self.log_output.setReadOnly(True)
-        self.log_output.setFixedHeight(200)
-        main_layout.addWidget(self.log_output)
+        self.log_view.setFixedHeight(230)
+        main_layout.addWidget(self.log_view)
 
     def select_file(self, line_edit_widget: QLineEdit, filter_str: str, is_image: bool = False):
         """Universal file selection method"""
@@ -115,7 +146,6 @@ class ZentaoDataChartPage(QWidget):
         self.doc3_path_input.clear()
         self.doc4_path_input.clear()
         self.target_report_path_input.clear()
-        self.log_output.clear()
         self.log("所有路径已清空。", clear_prev=True)
         self.save_settings()
 
@@ -146,7 +176,7 @@ class ZentaoDataChartPage(QWidget):
                 self.log("用户取消操作。", is_error=False)
                 return
 
-        if self.excel_worker_thread and self.excel_worker_thread.isRunning():
+        if JOB_SCHEDULER.is_active(self.excel_worker_thread):
             QMessageBox.warning(self, "操作进行中", "Excel 处理任务正在运行，请等待其完成。")
             return
 
@@ -158,11 +188,55 @@ class ZentaoDataChartPage(QWidget):
         self.sender().setEnabled(False) # Disable the button to prevent multiple clicks
 
         self.excel_worker_thread = ExcelWorker(
-            doc1_path, doc2_path, doc3_path, doc4_path, target_report_path
+            doc1_path, doc2_path, doc3_path, doc4_path, target_report_path,
+            engine=self.engine_combo.currentText(), write_mode=self.write_mode_combo.currentText()
+        )
+        self.excel_worker_thread.log_signal.connect(self.log_view.log, Qt.DirectConnection)
+        self.excel_worker_thread.finished_signal.connect(self._excel_process_finished)
+        JOB_SCHEDULER.submit(Job(f"数据汇总: {os.path.basename(target_report_path)}", 'excel',
+                                 self.excel_worker_thread))
+
+    def consolidate_batch(self):
+        """批量汇总一个文件夹 (或其中清单) 描述的多份报告"""
+        if JOB_SCHEDULER.is_active(self.excel_worker_thread):
+            QMessageBox.warning(self, "操作进行中", "Excel 处理任务正在运行，请等待其完成。")
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, "选择批量汇总文件夹", os.path.expanduser("~"))
+        if not folder:
+            return
+        try:
+            jobs = discover_jobs(folder)
+        except Exception as e:
+            self.log(f"错误: 读取批量任务失败: {e}", is_error=True, clear_prev=True)
+            QMessageBox.critical(self, "读取失败", f"读取批量任务失败: {e}")
+            return
+        if not jobs:
+            self.log(f"未在 '{folder}' 中找到任何报告任务。", is_error=True, clear_prev=True)
+            QMessageBox.warning(self, "无任务", "未找到任何报告任务。请检查文件夹结构或清单文件。")
+            return
+
+        self.log(f"找到 {len(jobs)} 份报告任务:", clear_prev=True)
+        for job in jobs:
+            self.log(f"  {os.path.basename(job['target_report_path'])}")
+
+        reply = QMessageBox.question(self, "确认批量汇总",
+                                     f"共找到 {len(jobs)} 份报告，是否开始批量汇总？\n请确保这些文件当前是关闭状态。",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.No:
+            self.log("用户取消操作。")
+            return
+
+        self.btn_batch.setEnabled(False)
+        self.excel_worker_thread = ExcelBatchWorker(
+            jobs, engine=self.engine_combo.currentText(), max_writers=self.writers_spin.value(),
+            write_mode=self.write_mode_combo.currentText()
         )
-        self.excel_worker_thread.log_signal.connect(self.log)
+        self.excel_worker_thread.log_signal.connect(self.log_view.log, Qt.DirectConnection)
         self.excel_worker_thread.finished_signal.connect(self._excel_process_finished)
-        self.excel_worker_thread.start()
+        # 每个写入进程各占一个 Excel 实例
+        JOB_SCHEDULER.submit(Job(f"批量汇总 ({len(jobs)} 份报告)", 'excel', self.excel_worker_thread,
+                                 resources={'excel': self.writers_spin.value()}))
 
     def _excel_process_finished(self, success, message):
         """Handles the completion of the Excel processing."""
@@ -177,6 +251,7 @@ class ZentaoDataChartPage(QWidget):
                 if btn.text() == "开始汇总数据":
                     btn.setEnabled(True)
                     break
+        self.btn_batch.setEnabled(True)
 
         self.log(f"\n--- 任务完成: {'成功' if success else '失败'} ---")
         self.log(message)
@@ -188,19 +263,7 @@ class ZentaoDataChartPage(QWidget):
 
     def log(self, message: str, is_error: bool = False, clear_prev: bool = False):
         """Displays plain text messages in the log output area, without icons"""
-        if clear_prev:
-            self.log_output.clear()
-
-        cursor = self.log_output.textCursor()
-        format = cursor.charFormat()
-        if is_error:
-            format.setForeground(Qt.red)
-        else:
-            format.setForeground(Qt.black)
-        cursor.setCharFormat(format)
-
-        self.log_output.append(message)
-        self.log_output.ensureCursorVisible()
+        self.log_view.log(message, is_error, clear=clear_prev)
 
     def save_settings(self):
         """Saves settings specific to this tab."""
@@ -209,22 +272,29 @@ class ZentaoDataChartPage(QWidget):
             "doc2_path": self.doc2_path_input.text(),
             "doc3_path": self.doc3_path_input.text(),
             "doc4_path": self.doc4_path_input.text(),
-            "target_report_path": self.target_report_path_input.text()
+            "target_report_path": self.target_report_path_input.text(),
+            "engine": self.engine_combo.currentText(),
+            "max_writers": self.writers_spin.value(),
+            "write_mode": self.write_mode_combo.currentText()
         }
-        self.settings_manager.save_settings("data_chart", settings, self.log)
+        SETTINGS_STORE.update("data_chart", settings)
 
     def load_settings(self):
         """Loads settings specific to this tab."""
-        loaded_settings = self.settings_manager.load_settings(
-            "data_chart",
-            default_settings={
-                "doc1_path": "", "doc2_path": "", "doc3_path": "",
-                "doc4_path": "", "target_report_path": ""
-            },
-            log_callback=self.log
-        )
+        loaded_settings = SETTINGS_STORE.section("data_chart")
         self.doc1_path_input.setText(loaded_settings.get("doc1_path", ""))
         self.doc2_path_input.setText(loaded_settings.get("doc2_path", ""))
         self.doc3_path_input.setText(loaded_settings.get("doc3_path", ""))
         self.doc4_path_input.setText(loaded_settings.get("doc4_path", ""))
         self.target_report_path_input.setText(loaded_settings.get("target_report_path", ""))
+        engine = loaded_settings.get("engine", CONSOLIDATION_ENGINE_DEFAULT)
+        self.engine_combo.blockSignals(True)  # 加载设置时不触发保存
+        self.engine_combo.setCurrentIndex(max(0, self.engine_combo.findText(engine)))
+        self.engine_combo.blockSignals(False)
+        self.writers_spin.blockSignals(True)
+        self.writers_spin.setValue(loaded_settings.get("max_writers", BATCH_MAX_WRITERS_DEFAULT))
+        self.writers_spin.blockSignals(False)
+        write_mode = loaded_settings.get("write_mode", CONSOLIDATION_WRITE_MODE_DEFAULT)
+        self.write_mode_combo.blockSignals(True)
+        self.write_mode_combo.setCurrentIndex(max(0, self.write_mode_combo.findText(write_mode)))
+        self.write_mode_combo.blockSignals(False)
@@ -0,0 +1,133 @@
+# ui/job_panel.py - 任务列表
+#
+# 显示 JOB_SCHEDULER 中排队、运行和最近结束的任务，可取消所选任务；下方是调度日志 (每个任务的排队和运行耗时)。
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+    QHeaderView, QAbstractItemView, QSplitter
+)
+
+from core.job_scheduler import JOB_SCHEDULER, PRIORITY_NAMES, RUNNING, FAILED, CANCELLED
+from ui.log_view import LogView
+
+COLUMNS = ["任务", "类型", "优先级", "状态", "进度", "等待", "用时", "说明"]
+RESOURCE_NAMES = {'browser': "浏览器", 'excel': "Excel", 'cpu': "CPU 进程"}
+STATE_COLORS = {RUNNING: "#0066cc", FAILED: "#ff0000", CANCELLED: "#808080"}
+
+
+def _seconds_text(seconds):
+    if seconds is None:
+        return ""
+    if seconds < 60:
+        return f"{seconds:.1f} 秒"
+    return f"{int(seconds // 60)} 分 {int(seconds % 60)} 秒"
+
+
+class JobPanel(QWidget):
+    def __init__(self, parent=None, scheduler=JOB_SCHEDULER):
+        super().__init__(parent)
+        self.scheduler = scheduler
+
+        layout = QVBoxLayout(self)
+        toolbar = QHBoxLayout()
+        self.usage_label = QLabel()
+        toolbar.addWidget(self.usage_label)
+        toolbar.addStretch()
+        self.cancel_btn = QPushButton("取消所选")
+        self.cancel_btn.clicked.connect(self.cancel_selected)
+        toolbar.addWidget(self.cancel_btn)
+        clear_btn = QPushButton("清除已结束")
+        clear_btn.clicked.connect(self.clear_finished)
+        toolbar.addWidget(clear_btn)
+        layout.addLayout(toolbar)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(len(COLUMNS) - 1, QHeaderView.Stretch)
+        splitter.addWidget(self.table)
+        self.log_view = LogView("jobs", timestamps=True)
+        splitter.addWidget(self.log_view)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+        layout.addWidget(splitter)
+
+        self._rows = []  # 表格各行对应的任务
+
+        scheduler.job_added.connect(self.refresh)
+        scheduler.job_updated.connect(self._job_updated)
+        # 运行中任务的用时每秒刷新一次
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self._tick)
+        self._timer.start()
+        self.refresh()
+
+    def refresh(self, *_):
+        """按调度器中的任务重建表格 (任务增删时)"""
+        selected = set(id(job) for job in self.selected_jobs())
+        self._rows = list(reversed(self.scheduler.jobs))  # 最新的在上
+        self.table.setRowCount(len(self._rows))
+        for row, job in enumerate(self._rows):
+            self._fill_row(row, job)
+            if id(job) in selected:
+                self.table.selectRow(row)
+        self._update_usage()
+
+    def _fill_row(self, row, job):
+        progress = "" if job.progress is None else f"{job.progress}%"
+        values = [job.title, job.kind_name, PRIORITY_NAMES.get(job.priority, str(job.priority)), job.state_name,
+                  progress, _seconds_text(job.wait_time), _seconds_text(job.run_time), job.message]
+        color = QColor(STATE_COLORS.get(job.state, "#000000"))
+        for column, value in enumerate(values):
+            item = self.table.item(row, column)
+            if item is None:
+                item = QTableWidgetItem()
+                self.table.setItem(row, column, item)
+            item.setText(value)
+            item.setForeground(color)
+            if column == len(values) - 1:
+                item.setToolTip(value)
+
+    def _job_updated(self, job):
+        for row, shown in enumerate(self._rows):
+            if shown is job:
+                self._fill_row(row, job)
+                break
+        else:
+            self.refresh()  # 历史记录已裁剪或任务不在表格中
+            return
+        self._update_usage()
+
+    def _tick(self):
+        if not self.isVisible():
+            return
+        for row, job in enumerate(self._rows):
+            if job.is_active:
+                self._fill_row(row, job)
+
+    def _update_usage(self):
+        parts = [f"{RESOURCE_NAMES.get(name, name)} {used}/{limit}"
+                 for name, (used, limit) in self.scheduler.usage().items()]
+        queued = sum(1 for job in self.scheduler.active_jobs() if job.state != RUNNING)
+        self.usage_label.setText("资源占用: " + "，".join(parts) + f"    排队: {queued}")
+
+    def selected_jobs(self):
+        rows = sorted(set(index.row() for index in self.table.selectionModel().selectedRows()))
+        return [self._rows[row] for row in rows if row < len(self._rows)]
+
+    def cancel_selected(self):
+        for job in self.selected_jobs():
+            self.scheduler.cancel(job)
+
+    def clear_finished(self):
+        self.scheduler.clear_finished()
+        self.refresh()
@@ -0,0 +1,137 @@
+# ui/log_view.py - 页面日志视图
+#
+# log() 只把记录交给 core.log_bus 的日志队列，可在任意线程直接调用 (后台任务的 log_signal 用
+# Qt.DirectConnection 连接)，不经过界面线程的事件队列，也不会等待界面刷新。
+# 视图按 LOG_VIEW_FLUSH_MS 定时从环形缓冲区取出本通道的新记录，一次插入；页面不可见时只记录，显示时再绘制。
+
+import html
+import logging
+import collections
+from datetime import datetime
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QComboBox, QLabel, QPushButton
+
+from core.log_bus import LOG_BUS, ROOT_LOGGER, RingReader, get_channel_logger, classify_level, is_clear_marker
+from config.settings import LOG_VIEW_FLUSH_MS, LOG_VIEW_MAX_LINES
+
+LEVEL_OPTIONS = [("全部", logging.DEBUG), ("信息", logging.INFO), ("警告", logging.WARNING), ("错误", logging.ERROR)]
+LEVEL_COLORS = {logging.DEBUG: "#808080", logging.INFO: "#000000", logging.WARNING: "#b36b00", logging.ERROR: "#ff0000"}
+
+
+class LogView(QWidget):
+    def __init__(self, channel, timestamps=False, parent=None):
+        super().__init__(parent)
+        self.channel = channel
+        self.timestamps = timestamps
+        self.logger = get_channel_logger(channel)
+        self._reader = RingReader(LOG_BUS.ring, f"{ROOT_LOGGER}.{channel}")
+        self._history = collections.deque(maxlen=LOG_VIEW_MAX_LINES)  # (级别, HTML 行)，切换级别时重新绘制
+        self._pending = []  # 已读取但尚未绘制的 (级别, HTML 行)
+        self._redraw = False
+        self._min_level = logging.DEBUG
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+
+        toolbar = QHBoxLayout()
+        toolbar.addStretch()
+        toolbar.addWidget(QLabel("显示:"))
+        self.level_combo = QComboBox()
+        for text, level in LEVEL_OPTIONS:
+            self.level_combo.addItem(text, level)
+        self.level_combo.currentIndexChanged.connect(self._level_changed)
+        toolbar.addWidget(self.level_combo)
+        clear_button = QPushButton("清空")
+        clear_button.clicked.connect(self.clear)
+        toolbar.addWidget(clear_button)
+        layout.addLayout(toolbar)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setMaximumBlockCount(LOG_VIEW_MAX_LINES)
+        self.text.setUndoRedoEnabled(False)
+        layout.addWidget(self.text)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(LOG_VIEW_FLUSH_MS)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def log(self, message, is_error=False, clear=False):
+        """记录一条日志 (线程安全)；clear=True 时先清空视图"""
+        if clear:
+            self.logger.info("", extra={'clear': True})  # 与其他记录一起排队，保证顺序
+        self.logger.log(classify_level(message, is_error), message)
+
+    def clear(self):
+        self.logger.info("", extra={'clear': True})
+
+    def _format(self, record):
+        text = html.escape(record.getMessage()).replace("\n", "<br>")
+        if self.timestamps:
+            text = datetime.fromtimestamp(record.created).strftime("[%H:%M:%S] ") + text
+        color = LEVEL_COLORS.get(record.levelno, "#000000")
+        return f'<span style="color:{color}; white-space:pre-wrap">{text}</span>'
+
+    def flush(self):
+        """读取本通道的新记录并一次性插入"""
+        records, dropped = self._reader.read()
+        if dropped:  # 只在本通道的记录被挤出缓冲区时提示，其他通道丢失记录与本视图无关
+            self._pending.append((logging.WARNING, self._format(logging.makeLogRecord(
+                {'msg': f"警告: 日志过多，有 {dropped} 条记录未能显示，完整内容见日志文件。", 'levelno': logging.WARNING}))))
+        for record in records:
+            if is_clear_marker(record):
+                self._history.clear()
+                self._pending = []
+                self._redraw = True
+                continue
+            self._pending.append((record.levelno, self._format(record)))
+
+        if not self._pending and not self._redraw:
+            return
+        self._history.extend(self._pending)
+        if self._redraw:
+            self._pending = []
+            if self.isVisible():
+                self._render_all()
+            return
+        if self.isVisible():
+            self._append([line for level, line in self._pending if level >= self._min_level])
+            self._pending = []
+        else:
+            # 不可见时不绘制，显示时按历史记录重新绘制
+            self._pending = []
+            self._redraw = True
+
+    def _append(self, lines):
+        if not lines:
+            return
+        scroll_bar = self.text.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 2
+        cursor = QTextCursor(self.text.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for line in lines:
+            if not self.text.document().isEmpty():
+                cursor.insertBlock()
+            cursor.insertHtml(line)
+        cursor.endEditBlock()
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def _render_all(self):
+        self._redraw = False
+        self.text.clear()
+        self._append([line for level, line in self._history if level >= self._min_level])
+
+    def _level_changed(self, index):
+        self._min_level = self.level_combo.itemData(index)
+        self._render_all()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._redraw:
+            self._render_all()
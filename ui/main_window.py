@@ -9,7 +9,9 @@ from ui.ExcelTool import ExcelTool
 from ui.data_chart_page import ZentaoDataChartPage
 from ui.user_info_widget import UserInfoWidget
 from ui.bug_query_page import BugQueryPage
-from core.settings_manager import SettingsManager
+from ui.job_panel import JobPanel
+from core.session_broker import SESSION_BROKER
+from core.job_scheduler import JOB_SCHEDULER
 
 
 class MainApplication(QWidget):
@@ -18,7 +20,6 @@ class MainApplication(QWidget):
         self.setWindowTitle("XD_自动化报告生成_V2.0")
         self.setGeometry(100, 100, 1200, 950)  # 增加宽度以适应用户信息面板
 
-        self.settings_manager = SettingsManager()
         self.current_user_info = None  # 当前登录用户信息
 
         self._init_ui_components()
@@ -47,6 +48,9 @@ class MainApplication(QWidget):
         # 历史BUG查询页面默认隐藏，登录后显示
         self.bug_query_tab_index = self.tabs.addTab(self.bug_query_page, "历史BUG查询")
         self.tabs.setTabEnabled(self.bug_query_tab_index, False)  # 默认禁用
+        # 各页面提交的后台任务 (排队、运行、取消)
+        self.job_panel = JobPanel(self)
+        self.tabs.addTab(self.job_panel, "任务列表")
 
     def _setup_layout(self):
         """设置布局"""
@@ -101,7 +105,7 @@ class MainApplication(QWidget):
     def _refresh_user_info(self):
         """刷新用户信息"""
         if self.current_user_info:
-            # 重新获取用户信息
+            # 重新获取用户信息 (复用已登录的会话，不会重新登录)
             self.zentao_export_page.refresh_user_info()
         else:
             QMessageBox.information(self, "提示", "请先登录禅道系统")
@@ -113,44 +117,19 @@ class MainApplication(QWidget):
         self.bug_query_page.load_settings()
 
     def closeEvent(self, event):
-        """处理窗口关闭事件"""
-        is_zentao_running = self.zentao_export_page and \
-                            self.zentao_export_page.worker_thread and \
-                            self.zentao_export_page.worker_thread.isRunning()
-
-        is_excel_running = self.data_chart_page and \
-                           self.data_chart_page.excel_worker_thread and \
-                           self.data_chart_page.excel_worker_thread.isRunning()
-
-        is_bug_query_running = self.bug_query_page and \
-                               self.bug_query_page.bug_query_worker and \
-                               self.bug_query_page.bug_query_worker.isRunning()
-
-        if is_zentao_running or is_excel_running or is_bug_query_running:
-            running_tasks = []
-            if is_zentao_running:
-                running_tasks.append("禅道自动化导出")
-            if is_excel_running:
-                running_tasks.append("Excel 处理")
-            if is_bug_query_running:
-                running_tasks.append("BUG查询")
-
-            task_name = "、".join(running_tasks)
-
+        """处理窗口关闭事件：有排队或运行中的任务时先确认"""
+        active_jobs = JOB_SCHEDULER.active_jobs()
+        if active_jobs:
+            task_names = "\n".join(f"  {job.title} ({job.state_name})" for job in active_jobs)
             reply = QMessageBox.question(self, '退出确认',
-                                         f"{task_name} 任务正在运行，确定要退出并停止任务吗？",
+                                         f"以下任务尚未完成，确定要退出并停止这些任务吗？\n{task_names}",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-            if reply == QMessageBox.Yes:
-                if is_zentao_running:
-                    self.zentao_export_page._cancel_export()
-                if is_excel_running:
-                    # Excel处理任务强制结束
-                    pass
-                if is_bug_query_running:
-                    # BUG查询任务强制结束
-                    pass
-                event.accept()
-            else:
+            if reply != QMessageBox.Yes:
                 event.ignore()
-        else:
-            event.accept()
+                return
+            JOB_SCHEDULER.shutdown()
+
+        if self.bug_query_page:
+            self.bug_query_page.stop_background_tasks()
+        SESSION_BROKER.shutdown()
+        event.accept()
@@ -3,14 +3,15 @@
 import os
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QTextEdit, QFileDialog, QMessageBox, QProgressDialog, QGroupBox, QCheckBox
+    QLineEdit, QPushButton, QFileDialog, QMessageBox, QProgressDialog, QGroupBox, QCheckBox
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QTextCursor
 
 from core.selenium_worker import SeleniumWorker
-from core.settings_manager import SettingsManager
+from core.settings_store import SETTINGS_STORE
+from core.job_scheduler import JOB_SCHEDULER, Job, PRIORITY_HIGH
 from config.settings import DOWNLOAD_DIR, HEADLESS_MODE_DEFAULT, TEST_REPORT_ID_DEFAULT
+from ui.log_view import LogView
 
 
 class ZentaoExportPage(QWidget):
@@ -21,7 +22,6 @@ class ZentaoExportPage(QWidget):
         super().__init__(parent)
         self.worker_thread = None
         self.progress_dialog = None
-        self.settings_manager = SettingsManager("zentao_export")
         self.current_user_info = None  # 存储当前用户信息
 
         self.init_ui()
@@ -110,10 +110,9 @@ class ZentaoExportPage(QWidget):
         main_layout.addLayout(button_layout)
 
         # 日志输出区域
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
-        self.log_output.setStyleSheet("background-color: #f0f0f0; color: #333; font-family: 'Consolas', 'Monospace';")
-        main_layout.addWidget(self.log_output)
+        self.log_view = LogView("zentao_export")
+        self.log_view.text.setStyleSheet("background-color: #f0f0f0; color: #333; font-family: 'Consolas', 'Monospace';")
+        main_layout.addWidget(self.log_view)
 
     def _create_input_field(self, layout, label_text, default_text="", is_password=False):
         """Helper to create labeled input fields."""
@@ -154,7 +153,7 @@ class ZentaoExportPage(QWidget):
             QMessageBox.warning(self, "输入错误", "请填写账号和密码")
             return
 
-        self.log_output.clear()
+        self.log_view.clear()
         self.update_log("--- 开始测试登录 ---", False)
         self.test_login_btn.setEnabled(False)
 
@@ -174,13 +173,14 @@ class ZentaoExportPage(QWidget):
         )
 
         # 连接信号
-        self.worker_thread.log_signal.connect(self.update_log)
+        self.worker_thread.log_signal.connect(self.log_view.log, Qt.DirectConnection)
         self.worker_thread.finished_signal.connect(self._login_test_finished)
         self.worker_thread.progress_signal.connect(self.progress_dialog.setValue)
         self.worker_thread.user_info_signal.connect(self._on_user_info_received)
         self.progress_dialog.canceled.connect(self._cancel_login_test)
 
-        self.worker_thread.start()
+        # 登录测试很快且用户在等待结果，优先于其他排队的浏览器任务
+        JOB_SCHEDULER.submit(Job(f"登录测试: {account}", 'selenium', self.worker_thread, priority=PRIORITY_HIGH))
 
     def _login_test_finished(self, success, message):
         """登录测试完成处理"""
@@ -209,11 +209,12 @@ class ZentaoExportPage(QWidget):
 
     def _cancel_login_test(self):
         """取消登录测试"""
-        if self.worker_thread and self.worker_thread.isRunning():
+        job = JOB_SCHEDULER.job_for(self.worker_thread) if self.worker_thread else None
+        if job is not None and job.is_active:
             self.update_log("用户取消登录测试...", True)
             if self.progress_dialog:
                 self.progress_dialog.hide()
-            self.test_login_btn.setEnabled(True)
+            JOB_SCHEDULER.cancel(job)  # 按钮在任务结束 (_login_test_finished) 后恢复
 
     def refresh_user_info(self):
         """刷新用户信息"""
@@ -221,7 +222,7 @@ class ZentaoExportPage(QWidget):
             QMessageBox.information(self, "提示", "请先测试登录")
             return
 
-        # 重新执行登录测试来刷新用户信息
+        # 会话代理中已有登录会话，这里只会重新读取个人信息页
         self._test_login()
 
     def _start_export(self):
@@ -253,7 +254,7 @@ class ZentaoExportPage(QWidget):
 
         self.save_settings()
 
-        self.log_output.clear()
+        self.log_view.clear()
         self.update_log("--- 开始执行自动化任务 ---", False)
         self.export_button.setEnabled(False)
 
@@ -271,14 +272,14 @@ class ZentaoExportPage(QWidget):
         self.worker_thread = SeleniumWorker(
             account, password, product_name, test_report_id, download_dir, headless_mode, "export"
         )
-        self.worker_thread.log_signal.connect(self.update_log)
+        self.worker_thread.log_signal.connect(self.log_view.log, Qt.DirectConnection)
         self.worker_thread.status_signal.connect(self.progress_dialog.setLabelText)
         self.worker_thread.finished_signal.connect(self._export_finished)
         self.worker_thread.progress_signal.connect(self.progress_dialog.setValue)
         self.worker_thread.user_info_signal.connect(self._on_user_info_received)  # 也监听用户信息
         self.progress_dialog.canceled.connect(self._cancel_export)
 
-        self.worker_thread.start()
+        JOB_SCHEDULER.submit(Job(f"禅道导出: {product_name}", 'selenium', self.worker_thread))
 
     def _export_finished(self, success, message):
         """Handles the completion of the export process."""
@@ -296,30 +297,21 @@ class ZentaoExportPage(QWidget):
 
     def _cancel_export(self):
         """Handles cancellation of the export process."""
-        if self.worker_thread and self.worker_thread.isRunning():
-            self.update_log("用户请求取消任务 (此版本暂不支持中断正在进行的Selenium操作)...", True)
+        job = JOB_SCHEDULER.job_for(self.worker_thread) if self.worker_thread else None
+        if job is not None and job.is_active:
+            self.update_log("用户请求取消任务，当前步骤完成后停止...", True)
 
             if self.progress_dialog:
                 self.progress_dialog.hide()
 
-            self.export_button.setEnabled(True)
-            QMessageBox.information(self, "任务取消", "导出任务已请求取消。请等待当前Selenium操作结束。")
+            # 排队中的任务立即取消；运行中的任务在当前 Selenium 步骤结束后停止，按钮在 _export_finished 中恢复
+            JOB_SCHEDULER.cancel(job)
         else:
             self.update_log("没有正在运行的任务可以取消。", False)
 
     def update_log(self, message, is_error=False):
-        """Appends a message to the log QTextEdit."""
-        cursor = self.log_output.textCursor()
-        format = cursor.charFormat()
-        if is_error:
-            format.setForeground(Qt.red)
-        else:
-            format.setForeground(Qt.black)
-        cursor.setCharFormat(format)
-        self.log_output.append(message)
-        cursor = self.log_output.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_output.setTextCursor(cursor)
+        """Appends a message to the page log (thread-safe)."""
+        self.log_view.log(message, is_error)
 
     def save_settings(self):
         """Saves settings specific to this tab."""
@@ -331,23 +323,11 @@ class ZentaoExportPage(QWidget):
             "download_dir": self.download_dir_display.text(),
             "headless_mode": self.headless_checkbox.isChecked()
         }
-        self.settings_manager.save_settings("zentao_export", settings, self.update_log)
+        SETTINGS_STORE.update("zentao_export", settings)
 
     def load_settings(self):
         """Loads settings specific to this tab."""
-        default_settings = {
-            "account": "",
-            "password": "",
-            "product_name": "",
-            "test_report_id": TEST_REPORT_ID_DEFAULT,
-            "download_dir": DOWNLOAD_DIR,
-            "headless_mode": HEADLESS_MODE_DEFAULT
-        }
-        loaded_settings = self.settings_manager.load_settings(
-            "zentao_export",
-            default_settings=default_settings,
-            log_callback=self.update_log
-        )
+        loaded_settings = SETTINGS_STORE.section("zentao_export")
         self.product_name_input.setText(loaded_settings.get("product_name", ""))
         self.test_report_id_input.setText(loaded_settings.get("test_report_id", TEST_REPORT_ID_DEFAULT))
         self.download_dir_display.setText(loaded_settings.get("download_dir", DOWNLOAD_DIR))